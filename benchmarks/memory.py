@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Reports the memory used by parsed KExpressions: the size of a single node of
+each type, and the total size of a generated program's tree. Each is compared
+with the same nodes laid out as they were before KExpressions had __slots__ and
+interned primitives: every attribute, `raw` and `type` included, held in a
+__dict__, and every occurrence of a node an object of its own.
+
+Usage: python benchmarks/memory.py [EXPRESSIONS]
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from kelpy import parse
+from kelpy.cache import children, estimate_size
+from kelpy.types import *
+
+SAMPLES = [
+    ('KNumber',             lambda: parse('42')),
+    ('KSymbol',             lambda: parse("'x")),
+    ('KBoolean',            lambda: parse('#t')),
+    ('KList (3 items)',     lambda: parse('{list 1 2 3}')),
+    ('KFunctionExpression', lambda: parse('{+ 1 2}')),
+    ('KIf',                 lambda: parse('{if #t 1 2}')),
+    ('KLet',                lambda: parse("{let {'x 1} 'x}")),
+]
+
+def node_size(kexp):
+    """
+    The size of a node alone, without its raw text or sub-expressions.
+    """
+    size = sys.getsizeof(kexp)
+    if hasattr(kexp, '__dict__'):
+        size += sys.getsizeof(kexp.__dict__)
+    if isinstance(kexp, KList):
+        size += len(kexp) * sys.getsizeof((None, None))
+    return size
+
+class DictNode(object):
+    """
+    A node with its attributes in a __dict__, as KExpressions had.
+    """
+
+def dict_node_size(kexp):
+    """
+    The size of a node alone, were its attributes held in a __dict__.
+    """
+    node = DictNode()
+    for cls in type(kexp).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if name == '__weakref__' or not hasattr(kexp, name):
+                continue
+            setattr(node, 'raw' if name == '_raw' else name, getattr(kexp, name))
+    node.type = kexp.type
+    size = sys.getsizeof(node) + sys.getsizeof(node.__dict__)
+    if isinstance(kexp, KList):
+        size += len(kexp) * sys.getsizeof((None, None))
+    return size
+
+def tree_sizes(kexp):
+    """
+    The total size of the nodes of a tree, with shared nodes counted once, and
+    were each occurrence of a node a dict-based object of its own.
+    """
+    slotted = 0
+    unshared = 0
+    seen = set()
+    stack = [kexp]
+    while stack:
+        node = stack.pop()
+        unshared += dict_node_size(node)
+        if id(node) not in seen:
+            seen.add(id(node))
+            slotted += node_size(node)
+        stack.extend(children(node))
+    return slotted, unshared
+
+def program(count, seed=0):
+    random.seed(seed)
+    def expression(depth):
+        choice = random.random()
+        if depth == 0 or choice < 0.3:
+            return random.choice(["'x", "'y", "'total", '#t', '#f', '0', '1', str(random.randint(0, 500))])
+        elif choice < 0.5:
+            return '{if ' + ' '.join(expression(depth - 1) for _ in range(3)) + '}'
+        elif choice < 0.6:
+            return '{list ' + ' '.join(expression(depth - 1) for _ in range(3)) + '}'
+        return '{+ ' + ' '.join(expression(depth - 1) for _ in range(3)) + '}'
+    return '{list ' + ' '.join(expression(5) for _ in xrange(count)) + '}'
+
+def main(count):
+    print('{:<24}{:>8}{:>8}'.format('Node', 'Before', 'After'))
+    for name, build in SAMPLES:
+        kexp = build()
+        print('{:<24}{:>8}{:>8}'.format(name, dict_node_size(kexp), node_size(kexp)))
+    kexp = parse(program(count))
+    slotted, unshared = tree_sizes(kexp)
+    print('')
+    print('{} expressions: nodes {} bytes before, {} bytes after'.format(count, unshared, slotted))
+    print('{} expressions: {} bytes in all'.format(count, estimate_size(kexp)))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -18,22 +18,94 @@ def print_welcome():
         "Type 'help' for more information on how to use Kelpy.\n"
     ).format(version=kelpy.__version__)
 
-@atexit.register
 def goodbye():
     print("\nThank you for using Kelpy!")
 
-def get_parsed_input(user_input, show_raw=False, suppress_output=False):
+def get_parsed_input(user_input, document=None, show_raw=False, suppress_output=False):
     """
-    :return: input from the user
+    Parses the user's input. If the document for the previous input is given,
+    only the parts of the input that differ from it are parsed again.
+
+    :return: the document for the input from the user
     """
-    kexp = kelpy.parse(user_input)
+    if document is None:
+        document = kelpy.parse_document(user_input)
+    else:
+        document = document.update(user_input)
+    show_parsed(document.kexp, show_raw, suppress_output)
+    return document
+
+def show_parsed(kexp, show_raw=False, suppress_output=False):
     if show_raw:
         output = repr(kexp)
     else:
         output = str(kexp)
     if not suppress_output:
         print("~ {}".format(output))
-    return kexp
+
+def run_files(paths, args, cache=None):
+    """
+    Evaluates every expression in the given files in order. A path of '-'
+    reads from standard input. If a compiled cache is given, files are loaded
+    through it instead of being parsed every time.
+    """
+    for path in paths:
+        if cache is not None and path != '-':
+            for kexp in cache.load(path):
+                run_expression(kexp, args)
+            continue
+        stream = sys.stdin if path == '-' else open(path)
+        try:
+            for kexp, line, column in kelpy.parse_stream(stream):
+                run_expression(kexp, args)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+def evaluate(kexp, args):
+    """
+    Optimizes an expression and eliminates its common subexpressions if asked
+    to, then resolves it and evaluates it with the chosen engine: 'interpret'
+    to walk the tree with the interpreter, 'stack' to walk it without
+    recursion, 'compile' to compile it into closures and run those, or 'vm' to
+    compile it into bytecode and run that.
+
+    :return: the value of the expression
+    """
+    if args.optimize:
+        kexp, eliminated = kelpy.optimize(kexp)
+        if not args.quiet:
+            print("~ optimized ({} nodes eliminated): {}".format(eliminated, kexp))
+    if args.cse:
+        kexp, shared = kelpy.eliminate_common_subexpressions(kexp)
+        if not args.quiet:
+            print("~ shared ({} subexpressions): {}".format(shared, kexp))
+    engine = args.engine
+    kexp = kelpy.resolve(kexp)
+    if engine == 'compile':
+        return kelpy.compile_expression(kexp)(kelpy.types.empty_env)
+    elif engine == 'vm':
+        return kelpy.compile_bytecode(kexp)(kelpy.types.empty_env)
+    elif engine == 'stack':
+        return kelpy.interpret_iteratively(kexp, kelpy.types.empty_env)
+    return kelpy.interpret(kexp, kelpy.types.empty_env)
+
+def run_expression(kexp, args):
+    show_parsed(kexp, args.raw, args.quiet)
+    if not args.parse_only:
+        print(evaluate(kexp, args))
+
+def run_cache_commands(cache, args):
+    """
+    Carries out the --warm and --prune options.
+    """
+    if args.prune is not None:
+        max_age = None if args.prune < 0 else args.prune * 24 * 60 * 60
+        removed = cache.prune(max_age)
+        print("Removed {} compiled file(s) from {}".format(removed, cache.directory))
+    if args.warm:
+        compiled = cache.warm(args.files)
+        print("Compiled {} of {} file(s) into {}".format(compiled, len(args.files), cache.directory))
 
 def kelp_help(message):
     if not message:
@@ -63,8 +135,35 @@ if __name__ == '__main__':
     parser.add_argument('--raw', action='store_true')
     parser.add_argument('-q', '--quiet', action='store_true')
     parser.add_argument('-p', '--parse-only', action='store_true')
+    parser.add_argument('-O', '--optimize', action='store_true')
+    parser.add_argument('--cse', action='store_true')
+    parser.add_argument('--engine', choices=('interpret', 'stack', 'compile', 'vm'), default='interpret')
+    parser.add_argument('-c', '--cache', action='store_true')
+    parser.add_argument('--cache-dir')
+    parser.add_argument('--warm', action='store_true')
+    parser.add_argument('--prune', type=float, nargs='?', const=-1, metavar='DAYS')
+    parser.add_argument('files', nargs='*')
     args = parser.parse_args()
+    cache = None
+    if args.cache or args.cache_dir or args.warm or args.prune is not None:
+        cache = kelpy.CompiledCache(args.cache_dir)
+    if args.warm or args.prune is not None:
+        try:
+            run_cache_commands(cache, args)
+        except kelpy.KelpyException as e:
+            print(e.message)
+            sys.exit(1)
+        sys.exit(0)
+    if args.files:
+        try:
+            run_files(args.files, args, cache)
+        except kelpy.KelpyException as e:
+            print(e.message)
+            sys.exit(1)
+        sys.exit(0)
+    atexit.register(goodbye)
     print_welcome()
+    document = None
     while(True):
         try:
             user_input = raw_input('>>> ')
@@ -73,9 +172,10 @@ if __name__ == '__main__':
             if user_input.split()[0].lower() in BUILTINS:
                 builtin_delegate(user_input.lower())
                 continue
-            kexp = get_parsed_input(user_input, args.raw, args.quiet)
+            document = get_parsed_input(user_input, document, args.raw, args.quiet)
+            kexp = document.kexp
             if not args.parse_only:
-                result = kelpy.interpret(kexp, kelpy.types.empty_env)
+                result = evaluate(kexp, args)
                 print(result)
         except KeyboardInterrupt:
             break
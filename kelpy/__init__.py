@@ -1,6 +1,16 @@
 from parser import parse
-from interpreter import interpret
+from reader import parse_stream
+from incremental import parse_document, reparse
+from interpreter import interpret, interpret_iteratively
+from resolver import resolve
+from optimizer import optimize
+from cse import eliminate_common_subexpressions
+from compiler import compile_expression
+from vm import compile_bytecode, Bytecode
+from memo import Memo
+from engine import Engine
+from cache import ParseCache, HashConsTable
+from kelpc import CompiledCache
 from exceptions import KelpyException
 import helpdocs
-
-__version__ = '0.13.5'
+from version import __version__
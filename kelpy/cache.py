@@ -0,0 +1,273 @@
+################################################################################
+#
+# cache.py
+#
+# This module provides an opt-in cache for parsed expressions, along with a
+# hash-consing table which lets structurally identical subtrees share a single
+# KExpression object.
+#
+################################################################################
+
+import re
+import sys
+import weakref
+from collections import OrderedDict
+from types import *
+from parser import parse
+from tokenizer import tokenize
+
+################################################################################
+# Hash-consing
+####
+
+def children(kexp):
+    """
+    Gets the sub-expressions of a KExpression in a fixed order.
+
+    :param kexp: A KExpression.
+    :return: A tuple of the KExpressions directly within `kexp`.
+    """
+    if isinstance(kexp, KFunctionExpression):
+        return tuple(kexp.args)
+    elif isinstance(kexp, KIf):
+        return (kexp.test, kexp.true, kexp.false)
+    elif isinstance(kexp, KLet):
+        return (kexp.name, kexp.value, kexp.body)
+    elif isinstance(kexp, KLambda):
+        name = () if kexp.name is None else (kexp.name,)
+        return name + kexp.params + (kexp.body,)
+    elif isinstance(kexp, KApply):
+        return (kexp.function,) + tuple(kexp.args)
+    elif isinstance(kexp, KRange):
+        # The numbers of a range are not made until they are needed.
+        return ()
+    elif isinstance(kexp, KList):
+        return tuple(kexp)
+    return ()
+
+def rebuild(kexp, kids):
+    """
+    Creates a copy of a KExpression with its sub-expressions replaced.
+
+    :param kexp: The KExpression to copy.
+    :param kids: The new sub-expressions, ordered as by `children`.
+    :return: The new KExpression.
+    """
+    raw = kexp.span or kexp.raw
+    if isinstance(kexp, KFunctionExpression):
+        return KFunctionExpression(raw, kexp.function, *kids)
+    elif isinstance(kexp, KIf):
+        return KIf(raw, *kids)
+    elif isinstance(kexp, KLet):
+        return KLet(raw, *kids)
+    elif isinstance(kexp, KLambda):
+        name = None if kexp.name is None else kids[0]
+        start = 0 if kexp.name is None else 1
+        return KLambda(raw, kids[start:-1], kids[-1], name, kexp.captures, kexp.size)
+    elif isinstance(kexp, KApply):
+        return KApply(raw, *kids)
+    elif isinstance(kexp, KList):
+        return KList(list(kids))
+    return kexp
+
+def structural_key(kexp, kids):
+    """
+    Computes the key under which a KExpression is shared. Sub-expressions are
+    identified by object identity, so they must already be shared.
+
+    :param kexp: The KExpression.
+    :param kids: The shared sub-expressions of `kexp`.
+    :return: A hashable key, or None if the KExpression cannot be shared.
+    """
+    identities = tuple(id(kid) for kid in kids)
+    if isinstance(kexp, KRange):
+        return (KRange, kexp.start, len(kexp), kexp.step)
+    elif isinstance(kexp, KFunctionExpression):
+        return (KFunctionExpression, kexp.function) + identities
+    elif isinstance(kexp, (KIf, KLet, KApply, KList)):
+        return (type(kexp),) + identities
+    elif isinstance(kexp, KLambda) and kexp.captures is None:
+        return (KLambda, kexp.name is not None) + identities
+    elif isinstance(kexp, (KNumber, KSymbol)):
+        return (type(kexp), kexp.raw)
+    elif isinstance(kexp, KBoolean):
+        return (KBoolean, kexp.value, str(kexp.raw))
+    return None
+
+class HashConsTable(object):
+    """
+    Maps the structure of KExpressions to a single shared instance. Entries are
+    held weakly, so a node lives only as long as some tree still uses it.
+
+    The raw text of a shared node is that of its first occurrence.
+    """
+    def __init__(self):
+        self.nodes   = weakref.WeakValueDictionary()
+        self.members = weakref.WeakValueDictionary()
+    def __len__(self):
+        return len(self.nodes)
+    def share(self, kexp):
+        """
+        Replaces every subtree of a KExpression with its shared instance.
+
+        :param kexp: The KExpression to share.
+        :return: An equivalent KExpression built from shared nodes.
+        """
+        shared = {}
+        stack  = [(kexp, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in shared:
+                continue
+            if id(node) in self.members:
+                shared[id(node)] = node
+                continue
+            kids = children(node)
+            if kids and not expanded:
+                stack.append((node, True))
+                stack.extend((kid, False) for kid in kids)
+                continue
+            new_kids = [shared[id(kid)] for kid in kids]
+            original = node
+            if any(new is not old for new, old in zip(new_kids, kids)):
+                node = rebuild(node, new_kids)
+            key = structural_key(node, new_kids)
+            if key is not None:
+                node = self.nodes.setdefault(key, node)
+                self.members[id(node)] = node
+            shared[id(original)] = node
+        return shared[id(kexp)]
+
+################################################################################
+# ParseCache
+####
+
+WHITESPACE_PATTERN  = re.compile(r"\s+")
+OPEN_SPACE_PATTERN  = re.compile(r"\{ ")
+CLOSE_SPACE_PATTERN = re.compile(r" \}")
+
+def normalize(text):
+    """
+    Normalizes the whitespace in KL text so that equivalent inputs share a
+    cache key.
+
+    :param text: The raw text.
+    :return: The text with whitespace collapsed and removed around braces.
+    """
+    if "'{" in text:
+        # Whitespace inside a quoted brace symbol is part of the symbol, so the
+        # text must be normalized token by token, with only the braces which
+        # are tokens of their own losing the space beside them.
+        parts = []
+        previous = None
+        for token in tokenize(text):
+            if parts and previous != '{' and token.text != '}':
+                parts.append(' ')
+            parts.append(token.text)
+            previous = token.text
+        return ''.join(parts)
+    normal = ' '.join(WHITESPACE_PATTERN.split(text.strip()))
+    return CLOSE_SPACE_PATTERN.sub('}', OPEN_SPACE_PATTERN.sub('{', normal))
+
+CELL_SIZE = sys.getsizeof((None, None))
+
+def estimate_size(kexp):
+    """
+    Estimates the memory used by a parsed tree, counting shared nodes and
+    source texts once.
+
+    :param kexp: The root of the tree.
+    :return: An approximate size in bytes.
+    """
+    size  = 0
+    seen  = set()
+    stack = [kexp]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        size += sys.getsizeof(node)
+        if hasattr(node, '__dict__'):
+            size += sys.getsizeof(node.__dict__)
+        span = node.span
+        if isinstance(node, KRange):
+            # A range holds only an xrange, unless the chain of its items has
+            # been built. Its raw text is made only when it is asked for.
+            size += sys.getsizeof(node.values)
+            if node._front is not None:
+                size += len(node) * CELL_SIZE
+        elif isinstance(node, KList):
+            # Each item of a list is held in an (item, next) pair. Its raw text
+            # is made from its items only when it is asked for.
+            size += len(node) * CELL_SIZE
+        elif span is not None:
+            if id(span.source) not in seen:
+                seen.add(id(span.source))
+                size += sys.getsizeof(span.source)
+            size += sys.getsizeof(span)
+        elif isinstance(node.raw, basestring):
+            size += sys.getsizeof(node.raw)
+        stack.extend(children(node))
+    return size
+
+class ParseCache(object):
+    """
+    A least-recently-used cache of parsed expressions, keyed by normalized
+    source text.
+    """
+    def __init__(self, max_entries=1024, max_bytes=None, hashcons=False):
+        """
+        :param max_entries: The most expressions to keep.
+        :param max_bytes: The approximate memory budget for the cached trees,
+            or None for no budget.
+        :param hashcons: Whether structurally identical subtrees of the cached
+            trees should be shared.
+        """
+        self.max_entries    = max_entries
+        self.max_bytes      = max_bytes
+        self.table          = HashConsTable() if hashcons else None
+        self.entries        = OrderedDict()
+        self.size           = 0
+        self.hits           = 0
+        self.misses         = 0
+    def __len__(self):
+        return len(self.entries)
+    def __contains__(self, text):
+        return normalize(text) in self.entries
+    def parse(self, text):
+        """
+        Parses text, reusing the cached tree when the same expression has been
+        parsed before.
+
+        :param text: The raw text to parse.
+        :return: The KExpression described by the text.
+        """
+        key = normalize(text)
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.hits += 1
+            self.entries[key] = entry
+            return entry[0]
+        self.misses += 1
+        kexp = parse(text)
+        if self.table is not None:
+            kexp = self.table.share(kexp)
+        size = sys.getsizeof(key) + estimate_size(kexp)
+        self.entries[key] = (kexp, size)
+        self.size += size
+        self.evict()
+        return kexp
+    def evict(self):
+        """
+        Discards the least recently used entries until the cache is within its
+        limits. The most recent entry is always kept.
+        """
+        while len(self.entries) > 1 and (
+                len(self.entries) > self.max_entries or
+                (self.max_bytes is not None and self.size > self.max_bytes)):
+            _, (_, size) = self.entries.popitem(last=False)
+            self.size -= size
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
@@ -0,0 +1,204 @@
+################################################################################
+#
+# compiler.py
+#
+# This module provides a second execution engine alongside the interpreter. An
+# expression is compiled once into a tree of nested Python closures, one for
+# each node, so that the kind of each node and the definition of each function
+# are worked out ahead of time. Running the compiled expression then does no
+# dispatch on the types of nodes at all.
+#
+# The interpreter remains the reference engine: a compiled expression gives
+# the same result, and raises the same exceptions, as interpreting it.
+#
+# The body of a lambda is compiled with its tail positions marked. A call of a
+# closure in tail position returns a TailCall instead of making the call, and
+# the loop in `trampoline` makes it, so calls in tail position take no more of
+# the Python stack however many follow one another.
+#
+################################################################################
+
+from exceptions import *
+from types import *
+from interpreter import close, enter
+
+def compile_expression(kexp, tail=False):
+    """
+    Compiles a KExpression, which may have been resolved, into a function.
+
+    :param kexp: The KExpression to compile.
+    :param tail: Whether the expression is in tail position in the body of a
+        lambda, so that a call of a closure may return a TailCall.
+    :return: A function taking the environment to evaluate the expression in,
+        as `interpret` does, and returning the expression's value.
+    """
+    if not isinstance(kexp, KExpression):
+        raise InterpretException("Not a parsed expression: {}".format(kexp))
+    if isinstance(kexp, KLocal):
+        return compile_local(kexp)
+    elif isinstance(kexp, KSymbol):
+        return compile_symbol(kexp)
+    elif isinstance(kexp, KFunctionExpression):
+        return compile_function(kexp)
+    elif isinstance(kexp, KIf):
+        return compile_if(kexp, tail)
+    elif isinstance(kexp, KLet):
+        return compile_let(kexp, tail)
+    elif isinstance(kexp, KScope):
+        return compile_scope(kexp, tail)
+    elif isinstance(kexp, KLambda):
+        return compile_lambda(kexp)
+    elif isinstance(kexp, KApply):
+        return compile_apply(kexp, tail)
+    elif isinstance(kexp, KPrimitive):
+        return compile_constant(kexp)
+    else:
+        raise ImplementationException(
+            "Cannot compile expression: {}".format(repr(kexp)))
+
+################################################################################
+# Compilers
+#   - one for each kind of node, each returning a function of the environment
+####
+
+def compile_constant(kexp):
+    def constant(env):
+        return kexp
+    return constant
+
+def compile_symbol(symbol):
+    def symbol_lookup(env):
+        return lookup(symbol, env)
+    return symbol_lookup
+
+def compile_local(local):
+    slot = local.slot
+    depth = local.depth
+    if depth == 0:
+        def local_fetch(frame):
+            return frame.values[slot]
+    else:
+        def local_fetch(frame):
+            return frame.fetch(depth, slot)
+    return local_fetch
+
+def compile_function(kfunction):
+    builtin = kfunction.builtin
+    function = builtin.function
+    args = [compile_expression(arg) for arg in kfunction.args]
+    # The common arities are unrolled, to save building a list on every call.
+    # Two arguments are given to the builtin's two-argument kernel, if it has
+    # one.
+    if len(args) == 1:
+        one, = args
+        def call(env):
+            return function((one(env),))
+    elif len(args) == 2 and builtin.binary is not None:
+        one, two = args
+        binary = builtin.binary
+        def call(env):
+            return binary(one(env), two(env))
+    elif len(args) == 2:
+        one, two = args
+        def call(env):
+            return function((one(env), two(env)))
+    elif len(args) == 3:
+        one, two, three = args
+        def call(env):
+            return function((one(env), two(env), three(env)))
+    else:
+        def call(env):
+            return function(tuple([arg(env) for arg in args]))
+    return call
+
+def compile_if(kif, tail=False):
+    test = compile_expression(kif.test)
+    true = compile_expression(kif.true, tail)
+    false = compile_expression(kif.false, tail)
+    def branch(env):
+        if KBoolean(test(env)):
+            return true(env)
+        return false(env)
+    return branch
+
+def compile_let(klet, tail=False):
+    value = compile_expression(klet.value)
+    body = compile_expression(klet.body, tail)
+    if isinstance(klet.name, KLocal):
+        slot = klet.name.slot
+        def let(frame):
+            frame.values[slot] = value(frame)
+            return body(frame)
+    else:
+        name = klet.name
+        def let(env):
+            return body(env + KBinding(name, value(env)))
+    return let
+
+def compile_scope(kscope, tail=False):
+    size = kscope.size
+    body = compile_expression(kscope.body, tail)
+    def scope(env):
+        return body(KFrame(size, env))
+    return scope
+
+################################################################################
+# Closures
+#   - lambdas, and calls of them in and out of tail position
+####
+
+class TailCall(object):
+    """
+    A call of a closure in tail position, returned to be made by `trampoline`.
+    """
+    __slots__ = ('closure', 'arguments')
+    def __init__(self, closure, arguments):
+        self.closure    = closure
+        self.arguments  = arguments
+
+class CompiledBody(object):
+    """
+    The compiled body of a lambda, which evaluates it for the closures made
+    from the lambda. Called as a closure's `evaluate`, it makes any calls its
+    body returns in tail position before returning.
+    """
+    __slots__ = ('code',)
+    def __init__(self, code):
+        self.code = code
+    def __call__(self, body, env):
+        return trampoline(self.code(env))
+
+def trampoline(result):
+    """
+    Makes the calls in tail position returned by compiled bodies, one after
+    another, until one returns a value.
+    """
+    while type(result) is TailCall:
+        closure = result.closure
+        body, env = enter(closure, result.arguments)
+        evaluate = closure.evaluate
+        if type(evaluate) is not CompiledBody:
+            # The closure was made by another engine, which makes the call in
+            # its own way.
+            return evaluate(body, env)
+        result = evaluate.code(env)
+    return result
+
+def compile_lambda(klambda):
+    body = CompiledBody(compile_expression(klambda.body, tail=True))
+    def make_closure(env):
+        return close(klambda, env, body)
+    return make_closure
+
+def compile_apply(kapply, tail=False):
+    function = compile_expression(kapply.function)
+    args = [compile_expression(arg) for arg in kapply.args]
+    if tail:
+        def apply(env):
+            closure = function(env)
+            return TailCall(closure, [arg(env) for arg in args])
+    else:
+        def apply(env):
+            closure = function(env)
+            return trampoline(TailCall(closure, [arg(env) for arg in args]))
+    return apply
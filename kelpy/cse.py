@@ -0,0 +1,240 @@
+################################################################################
+#
+# cse.py
+#
+# This module eliminates common subexpressions. Subtrees which are repeated
+# within an expression, and which mean the same thing wherever they appear,
+# are bound once to a hidden let and replaced by references to it, so that
+# each is evaluated once per evaluation of the expression.
+#
+# Two subtrees mean the same thing when they have the same structure and each
+# of their symbols refers to the same binding: `{+ 'x 1}` inside a let of 'x is
+# not the same as `{+ 'x 1}` outside it. A repeated subtree is bound at the
+# innermost node enclosing all of its occurrences, and only if it would be
+# evaluated on every evaluation of that node. A subtree guarded by an `if` is
+# therefore never evaluated where it would not have been before.
+#
+################################################################################
+
+from exceptions import *
+from types import *
+from hamt import HashMap
+
+# Hidden symbols are made from this prefix and a number. A symbol's text
+# cannot contain whitespace, so these can never clash with symbols in KL.
+HIDDEN_PREFIX = "' cse"
+
+def parts(kexp):
+    """
+    Gets the sub-expressions of a KExpression which are evaluated as part of
+    it: not the name of a let, nor the items of a list, nor the body of a
+    lambda, which is evaluated only when the lambda is called.
+    """
+    if isinstance(kexp, KFunctionExpression):
+        return kexp.args
+    elif isinstance(kexp, KApply):
+        return (kexp.function,) + kexp.args
+    elif isinstance(kexp, KIf):
+        return (kexp.test, kexp.true, kexp.false)
+    elif isinstance(kexp, KLet):
+        return (kexp.value, kexp.body)
+    return ()
+
+def rebuild(kexp, kids):
+    raw = kexp.span or kexp.raw
+    if isinstance(kexp, KFunctionExpression):
+        return KFunctionExpression(raw, kexp.function, *kids)
+    elif isinstance(kexp, KIf):
+        return KIf(raw, *kids)
+    elif isinstance(kexp, KLet):
+        return KLet(raw, kexp.name, *kids)
+    elif isinstance(kexp, KApply):
+        return KApply(raw, *kids)
+    return kexp
+
+def eliminate_common_subexpressions(kexp):
+    """
+    Eliminates the common subexpressions of an expression which has not been
+    resolved.
+
+    :param kexp: The KExpression.
+    :return: A tuple of the new KExpression and the number of subtrees which
+        were bound to hidden lets.
+    """
+    shared = 0
+    tree = Tree(kexp)
+    # Hidden symbols already in the expression, from an earlier elimination,
+    # must not be captured by new ones.
+    number = tree.hidden_count()
+    while True:
+        # Subtrees are hoisted together as long as the nodes they are bound at
+        # are disjoint, since hoisting one cannot then change the others.
+        hoists = []
+        for key in tree.candidates():
+            positions = tree.occurrences[key]
+            ancestor = tree.common_ancestor(positions)
+            if (not any(tree.overlaps(ancestor, other) for _, other, _ in hoists) and
+                    tree.anticipates(ancestor, key)):
+                symbol = KSymbol(HIDDEN_PREFIX + str(number + shared))
+                hoists.append((positions, ancestor, symbol))
+                shared += 1
+        if not hoists:
+            return kexp, shared
+        kexp = tree.hoist(hoists)
+        tree = Tree(kexp)
+
+class Tree(object):
+    """
+    The positions of an expression's nodes, numbered in pre-order. A node which
+    appears in more than one place has a position for each.
+    """
+    def __init__(self, kexp):
+        self.nodes          = []    # The node at each position.
+        self.parents        = []    # The position of each node's parent.
+        self.depths         = []
+        self.keys           = []    # The structural key of each node.
+        self.sizes          = []    # The number of nodes in each subtree.
+        self.kids           = []    # The positions of each node's parts.
+        self.occurrences    = {}    # The positions of each shareable key.
+        self.table          = {}    # Numbers standing for structural keys.
+        stack = [(kexp, None, HashMap())]
+        while stack:
+            node, parent, binders = stack.pop()
+            position = len(self.nodes)
+            self.nodes.append(node)
+            self.parents.append(parent)
+            self.depths.append(0 if parent is None else self.depths[parent] + 1)
+            self.keys.append(None)
+            self.sizes.append(1)
+            self.kids.append([])
+            if parent is not None:
+                self.kids[parent].append(position)
+            if isinstance(node, KSymbol):
+                self.keys[position] = self.number(('symbol', node, binders.get(node)))
+            elif isinstance(node, KLet):
+                stack.append((node.body, position, binders.set(node.name, id(node))))
+                stack.append((node.value, position, binders))
+            else:
+                stack.extend((kid, position, binders) for kid in reversed(parts(node)))
+        # Keys and sizes are worked out from the leaves up.
+        for position in reversed(xrange(len(self.nodes))):
+            node = self.nodes[position]
+            kids = self.kids[position]
+            self.sizes[position] += sum(self.sizes[kid] for kid in kids)
+            if isinstance(node, (KFunctionExpression, KIf)):
+                label = node.function if isinstance(node, KFunctionExpression) else 'if'
+                key = self.number((label,) + tuple(self.keys[kid] for kid in kids))
+                self.keys[position] = key
+                self.occurrences.setdefault(key, []).append(position)
+            elif isinstance(node, KLet):
+                # Each let is distinct, since its body refers to its own binding.
+                self.keys[position] = self.number(('let', id(node)))
+            elif isinstance(node, (KNumber, KBoolean)):
+                self.keys[position] = self.number((type(node), type(node.value), node.value))
+            elif self.keys[position] is None:
+                # Anything else, such as a call of a lambda, which might never
+                # return, is never shared. Nor is a subtree holding it.
+                self.keys[position] = self.number(('node', position))
+    def hidden_count(self):
+        """
+        :return: One more than the largest number of a hidden symbol bound in
+            the expression, or 0 if there are none.
+        """
+        count = 0
+        for node in self.nodes:
+            if isinstance(node, KLet) and node.name.raw.startswith(HIDDEN_PREFIX):
+                suffix = node.name.raw[len(HIDDEN_PREFIX):]
+                if suffix.isdigit():
+                    count = max(count, int(suffix) + 1)
+        return count
+    def number(self, key):
+        return self.table.setdefault(key, len(self.table))
+    def candidates(self):
+        """
+        :return: The keys of the repeated subtrees, largest first.
+        """
+        repeated = [key for key, positions in self.occurrences.iteritems()
+                    if len(positions) > 1]
+        return sorted(repeated, key=lambda key: (-self.sizes[self.occurrences[key][0]], key))
+    def common_ancestor(self, positions):
+        """
+        :return: The position of the innermost node enclosing all of the
+            given positions.
+        """
+        ancestor = positions[0]
+        for position in positions[1:]:
+            while self.depths[position] > self.depths[ancestor]:
+                position = self.parents[position]
+            while self.depths[ancestor] > self.depths[position]:
+                ancestor = self.parents[ancestor]
+            while position != ancestor:
+                position = self.parents[position]
+                ancestor = self.parents[ancestor]
+        return ancestor
+    def anticipates(self, position, key):
+        """
+        Determines whether a subtree is evaluated on every evaluation of the
+        node at a position: that is, whether it is the node itself, or part of
+        an argument, a test, a let's value or body, or both branches of an if.
+
+        Only the nodes on the paths between the position and the occurrences
+        of the subtree can hold it, so only those are examined.
+        """
+        results = {}
+        for occurrence in self.occurrences[key]:
+            results[occurrence] = True
+            current = occurrence
+            while current != position:
+                current = self.parents[current]
+                if current in results:
+                    break
+                results[current] = None
+        # Children are numbered after their parents, so working from the
+        # highest position down settles every child before its parent.
+        for current in sorted(results, reverse=True):
+            if results[current]:
+                continue
+            held = [results.get(kid) or False for kid in self.kids[current]]
+            if isinstance(self.nodes[current], KIf):
+                test, true, false = held
+                results[current] = test or (true and false)
+            else:
+                results[current] = any(held)
+        return results[position]
+    def overlaps(self, one, two):
+        """
+        Determines whether the subtrees at two positions share any nodes.
+        """
+        if one > two:
+            one, two = two, one
+        return two < one + self.sizes[one]
+    def hoist(self, hoists):
+        """
+        Binds subtrees to symbols in lets, and replaces each occurrence of them
+        with their symbol.
+
+        :param hoists: A list of tuples of the positions of a subtree, the
+            position of the node wrapped in the let binding it, and its symbol.
+        :return: The new root of the expression.
+        """
+        replaced = {}
+        wrapped = {}
+        for positions, ancestor, symbol in hoists:
+            replaced.update(dict.fromkeys(positions, symbol))
+            wrapped[ancestor] = (symbol, self.nodes[positions[0]])
+        built = {}
+        for position in reversed(xrange(len(self.nodes))):
+            node = self.nodes[position]
+            if position in replaced:
+                new = replaced[position]
+            else:
+                kids = [built[kid] for kid in self.kids[position]]
+                if all(new is old for new, old in zip(kids, parts(node))):
+                    new = node
+                else:
+                    new = rebuild(node, kids)
+            if position in wrapped:
+                symbol, value = wrapped[position]
+                new = KLet(node.span or node.raw, symbol, value, new)
+            built[position] = new
+        return built[0]
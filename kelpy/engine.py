@@ -0,0 +1,245 @@
+################################################################################
+#
+# engine.py
+#
+# This module provides Engine, the interface for embedding Kelpy in a Python
+# program. An Engine compiles KL text into CompiledExpressions, which can be
+# evaluated any number of times, from any number of threads at once, with
+# their free symbols bound to plain Python values.
+#
+################################################################################
+
+import threading
+from fractions import Fraction
+from exceptions import *
+from types import *
+from parser import parse
+from resolver import resolve, free_symbols
+from optimizer import optimize
+from cse import eliminate_common_subexpressions
+from interpreter import interpret, interpret_iteratively
+from compiler import compile_expression
+from vm import compile_bytecode
+import vectorize
+
+################################################################################
+# Conversion
+#   - between plain Python values and KExpressions
+####
+
+def to_kexp(value):
+    """
+    Converts a Python value into a KExpression.
+
+    :param value: A bool, int, long, float, Fraction, list or tuple of these,
+        or a KExpression (which is returned as it is).
+    :return: The KExpression.
+    """
+    if isinstance(value, KExpression):
+        return value
+    elif isinstance(value, bool):
+        return KBoolean(value)
+    elif isinstance(value, (int, long, float, Fraction)):
+        return KNumber(value)
+    elif isinstance(value, (list, tuple)):
+        return KList([to_kexp(item) for item in value])
+    raise BadBindingValueException(value)
+
+def to_python(kexp):
+    """
+    Converts a KExpression into a Python value: numbers into their int, long,
+    float or Fraction values, booleans into bools, lists into lists, and
+    symbols into their text.
+    """
+    if isinstance(kexp, KNumber):
+        return kexp.value
+    elif isinstance(kexp, KBoolean):
+        return kexp.value
+    elif isinstance(kexp, KRange):
+        return range(kexp.start, kexp.start + len(kexp) * kexp.step, kexp.step)
+    elif isinstance(kexp, KList):
+        return [to_python(item) for item in kexp]
+    elif isinstance(kexp, KSymbol):
+        return kexp.raw
+    return kexp
+
+def symbol_for(name):
+    """
+    Gets the KSymbol for a binding name, which may be given with or without
+    its leading quote.
+    """
+    if not isinstance(name, basestring) or not name:
+        raise BadBindingNameException(name)
+    if name[0] != "'":
+        name = "'" + name
+    return KSymbol(name)
+
+################################################################################
+# Engine
+####
+
+# The ways a CompiledExpression can be run, each a function compiling a
+# resolved KExpression into a function of an environment.
+BACKENDS = {
+    'interpret':    lambda kexp: lambda env: interpret(kexp, env),
+    'stack':        lambda kexp: lambda env: interpret_iteratively(kexp, env),
+    'compile':      compile_expression,
+    'vm':           compile_bytecode,
+}
+
+class Engine(object):
+    """
+    Compiles KL text for evaluation from Python.
+    """
+    def __init__(self, backend='compile', optimize=True, share=True, memo=None):
+        """
+        :param backend: How compiled expressions are run: 'compile' to compile
+            them into closures, 'vm' to compile them into bytecode,
+            'interpret' to walk them with the interpreter, or 'stack' to walk
+            them with the interpreter's explicit stack.
+        :param optimize: Whether expressions are simplified by the optimizer
+            before they are compiled.
+        :param share: Whether repeated subexpressions are bound to hidden lets,
+            so that each is evaluated only once.
+        :param memo: A Memo to cache the values of pure subtrees in, or None.
+            Given one, expressions are run by the memo's interpreter, whatever
+            the backend.
+        """
+        if backend not in BACKENDS:
+            raise ImplementationException("Unknown engine backend: {}".format(backend))
+        self.backend = backend
+        self.optimize = optimize
+        self.share = share
+        self.memo = memo
+        self.lock = threading.Lock()
+    def __repr__(self):
+        return "<engine: {backend}>".format(backend=self.backend)
+    def compile(self, text):
+        """
+        Parses, resolves and compiles a single expression.
+
+        :param text: The KL text of the expression.
+        :return: A CompiledExpression.
+        """
+        with self.lock:
+            kexp = parse(text)
+            eliminated = 0
+            if self.optimize:
+                kexp, eliminated = optimize(kexp)
+            if self.share:
+                kexp, _ = eliminate_common_subexpressions(kexp)
+            free = free_symbols(kexp)
+            resolved = resolve(kexp, free)
+            if self.memo is not None:
+                run = memoized(self.memo, resolved)
+            else:
+                run = BACKENDS[self.backend](resolved)
+        return CompiledExpression(text, kexp, free, run, eliminated)
+
+def memoized(memo, kexp):
+    def run(env):
+        return memo.interpret(kexp, env)
+    return run
+
+class CompiledExpression(object):
+    """
+    A compiled expression. It is never changed once it is made, and evaluating
+    it keeps all of its state local to the call, so a single instance may be
+    evaluated from many threads at once.
+    """
+    __slots__ = ('text', 'kexp', 'symbols', 'run', 'eliminated')
+    def __init__(self, text, kexp, symbols, run, eliminated=0):
+        """
+        :param text: The KL text the expression was compiled from.
+        :param kexp: The KExpression, after any optimization.
+        :param symbols: A frozenset of the expression's free KSymbols.
+        :param run: A function of an environment, evaluating the expression.
+        :param eliminated: The number of nodes removed by the optimizer.
+        """
+        set_attribute = super(CompiledExpression, self).__setattr__
+        set_attribute('text', text)
+        set_attribute('kexp', kexp)
+        set_attribute('symbols', symbols)
+        set_attribute('run', run)
+        set_attribute('eliminated', eliminated)
+    def __setattr__(self, name, value):
+        raise AttributeError("CompiledExpression is immutable")
+    def __repr__(self):
+        return "<compiled: {text}>".format(text=self.text)
+    @property
+    def free_symbols(self):
+        """
+        The names of the symbols which must be bound when evaluating, without
+        their leading quotes.
+        """
+        return frozenset(symbol.raw[1:] for symbol in self.symbols)
+    def evaluate(self, bindings=None, **kwargs):
+        """
+        Evaluates the expression.
+
+        :param bindings: A dictionary of the values of the free symbols, keyed
+            by name. Keyword arguments may be given as well or instead.
+        :return: The value of the expression, as a plain Python value.
+        """
+        values = dict(bindings or {}, **kwargs)
+        env = KEnvironment(*[KBinding(symbol_for(name), to_kexp(value))
+                             for name, value in values.iteritems()])
+        for symbol in self.symbols:
+            if symbol not in env:
+                raise UnboundSymbolException(symbol)
+        return to_python(self.run(env))
+    def evaluate_columns(self, columns=None, **kwargs):
+        """
+        Evaluates the expression for every row of a table of bindings.
+
+        If NumPy is installed and the expression is built only from numbers,
+        booleans, lets, ifs, and arithmetic and comparison functions, it is
+        evaluated once, with each symbol bound to a whole column. Otherwise,
+        or if the array operations fail (for instance by dividing by zero in
+        some row), it is evaluated row by row, with the same results as
+        `evaluate`. Expressions whose array operations would give different
+        values, such as dividing integers (which gives exact fractions), are
+        evaluated row by row as well.
+
+        :param columns: A dictionary of sequences of values, keyed by the name
+            of the symbol bound to them. Every sequence must be the same
+            length. Keyword arguments may be given as well or instead.
+        :return: A NumPy array of the results if NumPy is installed, and a
+            list of them otherwise.
+        """
+        columns = dict(columns or {}, **kwargs)
+        lengths = set(len(column) for column in columns.itervalues())
+        if len(lengths) > 1:
+            raise InterpretException("Columns of bindings differ in length.")
+        count = lengths.pop() if lengths else 1
+        arrays = dict((symbol_for(name), column) for name, column in columns.iteritems())
+        for symbol in self.symbols:
+            if symbol not in arrays:
+                raise UnboundSymbolException(symbol)
+        if vectorize.available() and vectorize.vectorizable(self.kexp):
+            arrays = dict((symbol, vectorize.numpy.asarray(column))
+                          for symbol, column in arrays.iteritems())
+            try:
+                if vectorize.vectorizable(self.kexp, arrays):
+                    result = vectorize.evaluate_arrays(self.kexp, arrays)
+                    return vectorize.numpy.broadcast_to(result, (count,)).copy()
+            except (FloatingPointError, ZeroDivisionError):
+                pass
+        names = columns.keys()
+        rows = zip(*[as_list(columns[name]) for name in names]) or [()] * count
+        results = [self.evaluate(dict(zip(names, row))) for row in rows]
+        if not vectorize.available():
+            return results
+        elif any(isinstance(result, list) for result in results):
+            array = vectorize.numpy.empty(len(results), dtype=object)
+            array[:] = results
+            return array
+        return vectorize.numpy.array(results)
+
+def as_list(column):
+    """
+    Converts a column into a list of plain Python values.
+    """
+    if hasattr(column, 'tolist'):
+        return column.tolist()
+    return list(column)
@@ -54,112 +54,164 @@ class TooFewArgumentsException(InterpretException):
         message = "Function: {}. Too few ({}) arguments given: {}".format(function, len(arguments), arguments)
         super(TooFewArgumentsException, self).__init__(message)
 
+class BadBindingNameException(InterpretException):
+    def __init__(self, name):
+        message = "Only symbols can be bound, not: {}".format(name)
+        super(BadBindingNameException, self).__init__(message)
+
+class BadBindingValueException(InterpretException):
+    def __init__(self, value):
+        message = "Only expressions can be bound, not: {}".format(value)
+        super(BadBindingValueException, self).__init__(message)
+
+class BadEnvironmentBindingException(InterpretException):
+    def __init__(self, binding):
+        message = "Environments hold only bindings, not: {}".format(binding)
+        super(BadEnvironmentBindingException, self).__init__(message)
+
+class UnboundSymbolException(InterpretException):
+    def __init__(self, symbol):
+        message = "Symbol is not bound: {}".format(symbol)
+        super(UnboundSymbolException, self).__init__(message)
+
+class NotAFunctionException(InterpretException):
+    def __init__(self, value):
+        message = "Only lambdas can be called, not: {}".format(value)
+        super(NotAFunctionException, self).__init__(message)
+
+class ArityException(InterpretException):
+    def __init__(self, function, arguments):
+        message = "Function: {}. Takes {} arguments, but {} given: {}".format(
+            function.raw, len(function.params), len(arguments), arguments)
+        super(ArityException, self).__init__(message)
+
+################################################################################
+# Cache Exceptions
+####
+
+class CacheException(KelpyException):
+    def __init__(self, message):
+        super(CacheException, self).__init__("Cache Error: {}".format(message))
+
+class InvalidCacheFileException(CacheException):
+    def __init__(self, path):
+        message = "Not a valid compiled expression file: '{}'".format(path)
+        super(InvalidCacheFileException, self).__init__(message)
+
 ################################################################################
 # Parser Exceptions
 ####
 
 class ParseException(KelpyException):
-    def __init__(self, message, expression=None):
+    def __init__(self, message, expression=None, offset=None):
         if expression is not None:
             message = message[:-1] + ": '{}'".format(expression)
+        if offset is not None:
+            message = "{} (at offset {})".format(message, offset)
+        self.offset = offset
         super(ParseException, self).__init__("Parse Error: {}".format(message))
 
 class BadRepeatTypeException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Attempted to use repeat type without a previous type."
-        super(BadRepeatTypeException, self).__init__(message, expression)
+        super(BadRepeatTypeException, self).__init__(message, expression, offset)
 
 class UnbalancedBracesException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Unbalanced Braces in parsed expression."
-        super(UnbalancedBracesException, self).__init__(message, expression)
+        super(UnbalancedBracesException, self).__init__(message, expression, offset)
 
 class SuperfluousDataException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Extra characters outside braces in expression."
-        super(SuperfluousDataException, self).__init__(message, expression)
+        super(SuperfluousDataException, self).__init__(message, expression, offset)
 
 class NoExpressionException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "No expression found in text."
-        super(NoExpressionException, self).__init__(message, expression)
+        super(NoExpressionException, self).__init__(message, expression, offset)
 
 class FunctionlessExpressionException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "No valid leading function in expression."
-        super(FunctionlessExpressionException, self).__init__(message, expression)
+        super(FunctionlessExpressionException, self).__init__(message, expression, offset)
 
 class NoArgumentsException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Cannot create empty expression."
-        super(NoArgumentsException, self).__init__(message, expression)
+        super(NoArgumentsException, self).__init__(message, expression, offset)
+
+class InvalidFormException(ParseException):
+    def __init__(self, expression=None, offset=None):
+        message = "Invalid arguments given to form."
+        super(InvalidFormException, self).__init__(message, expression, offset)
 
 class RawPrimitiveException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Cannot create a raw KPrimitive."
-        super(RawPrimitiveException, self).__init__(message, expression)
+        super(RawPrimitiveException, self).__init__(message, expression, offset)
 
 class InvalidListException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Invalid list creation."
-        super(InvalidListException, self).__init__(message, expression)
+        super(InvalidListException, self).__init__(message, expression, offset)
 
 class BadListIndexException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Cannot access index of list."
-        super(BadListIndexException, self).__init__(message, expression)
+        super(BadListIndexException, self).__init__(message, expression, offset)
 
 class InvalidFirstException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Could not get 'first' from expression."
-        super(InvalidFirstException, self).__init__(message, expression)
+        super(InvalidFirstException, self).__init__(message, expression, offset)
 
 class InvalidRestException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Could not get 'rest' from expression."
-        super(InvalidRestException, self).__init__(message, expression)
+        super(InvalidRestException, self).__init__(message, expression, offset)
 
 class InvalidReverseException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Could not get 'reverse' from expression."
-        super(InvalidReverseException, self).__init__(message, expression)
+        super(InvalidReverseException, self).__init__(message, expression, offset)
 
 class InvalidPrependException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Could not prepend value to list."
-        super(InvalidPrependException, self).__init__(message, expression)
+        super(InvalidPrependException, self).__init__(message, expression, offset)
 
 class InvalidAppendException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Could not append value to list."
-        super(InvalidAppendException, self).__init__(message, expression)
+        super(InvalidAppendException, self).__init__(message, expression, offset)
 
 class BadLookupException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Could not find symbol in environment."
-        super(BadLookupException, self).__init__(message, expression)
+        super(BadLookupException, self).__init__(message, expression, offset)
 
 class InvalidFunctionException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Invalid function name given."
-        super(InvalidFunctionException, self).__init__(message, expression)
+        super(InvalidFunctionException, self).__init__(message, expression, offset)
 
 class InvalidNumberException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Invalid number format given."
-        super(InvalidNumberException, self).__init__(message, expression)
+        super(InvalidNumberException, self).__init__(message, expression, offset)
 
 class InvalidSymbolException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Invalid symbol format given."
-        super(InvalidSymbolException, self).__init__(message, expression)
+        super(InvalidSymbolException, self).__init__(message, expression, offset)
 
 class InvalidBooleanException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Invalid boolean format given."
-        super(InvalidBooleanException, self).__init__(message, expression)
+        super(InvalidBooleanException, self).__init__(message, expression, offset)
 
 class InvalidExpressionTypeException(ParseException):
-    def __init__(self, expression=None):
+    def __init__(self, expression=None, offset=None):
         message = "Invalid expression type given to parser."
-        super(InvalidExpressionTypeException, self).__init__(message, expression)
+        super(InvalidExpressionTypeException, self).__init__(message, expression, offset)
@@ -0,0 +1,261 @@
+################################################################################
+#
+# forms.py
+#
+# This module defines the forms recognized by the parser. Each form registers
+# the keyword found at the head of its braces, the number of arguments it
+# accepts, and a builder which turns those arguments into a KExpression.
+#
+################################################################################
+
+from collections import namedtuple
+from exceptions import *
+from types import *
+from functions import BUILTINS
+from tokenizer import Token
+
+BOOLEAN_WORDS = ('true', '#t', 'false', '#f')
+
+# A brace group that is part of a form's syntax rather than an expression in
+# its own right, such as the `{'x 3}` binding in `{let {'x 3} 'x}`.
+Group = namedtuple('Group', ['items', 'offset'])
+
+################################################################################
+# Form
+#   - a keyword and the builder for the expressions it heads
+####
+
+class Form(object):
+    def __init__(self, keyword, builder, min_args, max_args=None, bindings=()):
+        """
+        :param keyword: The text at the head of the form, e.g. 'if'.
+        :param builder: A function taking (args, raw, offset) and returning the
+            KExpression for the form. The raw text is given as a Span.
+        :param min_args: The fewest arguments the form accepts.
+        :param max_args: The most arguments the form accepts, or None if there
+            is no limit.
+        :param bindings: The argument positions holding brace groups which are
+            syntax rather than expressions. These are given to the builder as
+            Groups instead of being built.
+        """
+        self.keyword    = keyword
+        self.builder    = builder
+        self.min_args   = min_args
+        self.max_args   = max_args
+        self.bindings   = frozenset(bindings)
+    def __repr__(self):
+        return "<form: {keyword}>".format(keyword=self.keyword)
+    def build(self, args, raw, offset):
+        if (len(args) < self.min_args or
+                (self.max_args is not None and len(args) > self.max_args)):
+            raise InvalidFormException(raw, offset)
+        return self.builder(args, raw, offset)
+
+FORM_MAP = {}
+
+def register_form(keyword, min_args, max_args=None, bindings=()):
+    """
+    Decorator which registers a builder function as the form for a keyword.
+
+    :param keyword: The text at the head of the form.
+    :param min_args: The fewest arguments the form accepts.
+    :param max_args: The most arguments the form accepts, or None.
+    :param bindings: The argument positions to be given to the builder as
+        unbuilt Groups.
+    :return: The decorator.
+    """
+    def decorator(builder):
+        FORM_MAP[keyword] = Form(keyword, builder, min_args, max_args, bindings)
+        return builder
+    return decorator
+
+################################################################################
+# Arguments
+#   - conversion of parsed items into KExpressions
+####
+
+def expression(item):
+    """
+    Converts an item collected by the parser into a KExpression.
+
+    :param item: A Token, a Group, or an already-built KExpression.
+    :return: The corresponding KExpression.
+    """
+    if isinstance(item, KExpression):
+        return item
+    elif isinstance(item, Token):
+        return parse_atom(item)
+    else:
+        raise InvalidFormException(item.items, item.offset)
+
+def parse_atom(token):
+    """
+    Converts a single atom token into a primitive KExpression.
+
+    :param token: The atom Token.
+    :return: The KNumber, KSymbol, KBoolean, or KList described by the token.
+    """
+    text = token.text
+    if is_number(text):
+        return KNumber(text)
+    elif text[0] == "'":
+        return KSymbol(text)
+    elif text.lower() in BOOLEAN_WORDS:
+        return KBoolean(text)
+    elif text == 'empty':
+        return KList()
+    else:
+        raise ParseException("Invalid input.", text, token.offset)
+
+def is_symbol_token(item):
+    return isinstance(item, Token) and item.text[0] == "'"
+
+################################################################################
+# List forms
+####
+
+@register_form('list', 0)
+def build_list(args, raw, offset):
+    """
+    Builds a KList, including the exclusive (`->`) and inclusive (`=>`) range
+    forms. Ranges are built as KRanges, whose numbers are made only as they
+    are needed.
+    """
+    if (len(args) == 3 and
+            isinstance(args[1], Token) and
+            args[1].text in ('->', '=>') and
+            isinstance(args[0], Token) and is_number(args[0].text) and
+            isinstance(args[2], Token) and is_number(args[2].text)):
+        low  = KNumber(args[0].text)
+        high = KNumber(args[2].text)
+        if args[1].text == '->':
+            if not low.integer or not high.integer:
+                raise ParseException("Bad exclusive list definition.", raw, offset)
+            return KRange(low.value, high.value)
+        else:
+            if not low.integer or not high.integer:
+                raise ParseException("Bad inclusive list definition.", raw, offset)
+            return KRange(low.value, high.value + 1)
+    elif not args:
+        return KList()
+    return KList([expression(arg) for arg in args])
+
+@register_form('empty?', 1, 1)
+def build_empty(args, raw, offset):
+    return KBoolean(KList() == expression(args[0]))
+
+@register_form('first', 1, 1)
+def build_first(args, raw, offset):
+    return first(expression(args[0]))
+
+@register_form('second', 1, 1)
+def build_second(args, raw, offset):
+    return first(rest(expression(args[0])))
+
+@register_form('rest', 1, 1)
+def build_rest(args, raw, offset):
+    return rest(expression(args[0]))
+
+@register_form('reverse', 1, 1)
+def build_reverse(args, raw, offset):
+    return reverse(expression(args[0]))
+
+@register_form('prepend', 2, 2)
+def build_prepend(args, raw, offset):
+    return prepend(expression(args[0]), expression(args[1]))
+
+@register_form('append', 2, 2)
+def build_append(args, raw, offset):
+    return append(expression(args[0]), expression(args[1]))
+
+################################################################################
+# Control forms
+####
+
+@register_form('if', 3, 3)
+def build_if(args, raw, offset):
+    return KIf(
+        raw,
+        expression(args[0]),
+        expression(args[1]),
+        expression(args[2])
+    )
+
+@register_form('let', 2, 2, bindings=(0,))
+def build_let(args, raw, offset):
+    binding = args[0]
+    if (not isinstance(binding, Group) or
+            len(binding.items) != 2 or
+            not is_symbol_token(binding.items[0])):
+        raise InvalidFormException(raw, offset)
+    return KLet(
+        raw,
+        KSymbol(binding.items[0].text),
+        expression(binding.items[1]),
+        expression(args[1])
+    )
+
+################################################################################
+# Lambda forms
+####
+
+def parameters(group, raw, offset):
+    """
+    Converts the group of a lambda's parameters into distinct KSymbols.
+    """
+    if (not isinstance(group, Group) or
+            not all(is_symbol_token(item) for item in group.items)):
+        raise InvalidFormException(raw, offset)
+    params = [KSymbol(item.text) for item in group.items]
+    if len(set(params)) != len(params):
+        raise InvalidFormException(raw, offset)
+    return params
+
+@register_form('lambda', 2, 2, bindings=(0,))
+def build_lambda(args, raw, offset):
+    return KLambda(raw, parameters(args[0], raw, offset), expression(args[1]))
+
+@register_form('rec', 3, 3, bindings=(1,))
+def build_rec(args, raw, offset):
+    if not is_symbol_token(args[0]):
+        raise InvalidFormException(raw, offset)
+    name = KSymbol(args[0].text)
+    params = parameters(args[1], raw, offset)
+    if name in params:
+        raise InvalidFormException(raw, offset)
+    return KLambda(raw, params, expression(args[2]), name)
+
+@register_form('call', 1)
+def build_call(args, raw, offset):
+    return KApply(raw, *[expression(arg) for arg in args])
+
+################################################################################
+# Function forms
+#   - every builtin is a form producing a KFunctionExpression
+####
+
+def function_builder(function):
+    """
+    Creates the builder for a function form.
+
+    :param function: The name of the function's Builtin.
+    :return: A builder producing KFunctionExpressions for the function.
+    """
+    def build_function(args, raw, offset):
+        return KFunctionExpression(raw, function, *[expression(arg) for arg in args])
+    return build_function
+
+def register_functions(builtins):
+    """
+    Registers a form for each builtin function, accepting as many arguments as
+    the builtin does, so that a call with too few or too many is rejected when
+    it is parsed rather than when it is evaluated.
+
+    :param builtins: A dictionary of Builtins keyed by function name, such as
+        BUILTINS.
+    """
+    for function, builtin in builtins.iteritems():
+        FORM_MAP[function] = Form(function, function_builder(function),
+                                  builtin.min_args, builtin.max_args)
+
+register_functions(BUILTINS)
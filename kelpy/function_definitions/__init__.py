@@ -1,2 +1,3 @@
 import arithmetic
 import comparison
+import lists
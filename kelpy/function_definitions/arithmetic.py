@@ -1,42 +1,72 @@
+import math
+import operator
+import kelpy.types
+from kelpy.function_definitions.builtin import Builtin
+
+def native(arguments):
+    """
+    Unwraps the arguments of a function into their native values, if every
+    one of them is a KNumber.
+
+    :return: A list of the values, or None if any argument is not a KNumber.
+    """
+    number = kelpy.types.KNumber
+    for argument in arguments:
+        if type(argument) is not number:
+            return None
+    return [argument.value for argument in arguments]
+
+def fold(operation, arguments, native_operation=None):
+    """
+    Applies a binary operation across the arguments from left to right. When
+    every argument is a KNumber, the work is done on their native values (with
+    `native_operation`, if it is given) and only the result is made into a
+    KNumber.
+    """
+    values = native(arguments)
+    if values is not None:
+        return kelpy.types.KNumber(reduce(native_operation or operation, values))
+    return reduce(operation, arguments)
+
 def add(arguments):
-    result = arguments[0]
-    if len(arguments) > 1:
-        for argument in arguments[1:]:
-            result += argument
-    return result
+    values = native(arguments)
+    if values is None:
+        return reduce(operator.add, arguments)
+    total = sum(values[1:], values[0])
+    if type(total) is float and len(values) > 2:
+        # A float sum of more than two numbers is worked out again exactly, and
+        # rounded once. Sums which fsum cannot give, such as of opposite
+        # infinities, are left as they are.
+        try:
+            total = math.fsum(values)
+        except (ValueError, OverflowError):
+            pass
+    return kelpy.types.KNumber(total)
 
 def multiply(arguments):
-    result = arguments[0]
-    if len(arguments) > 1:
-        for argument in arguments[1:]:
-            result *= argument
-    return result
+    return fold(operator.mul, arguments)
 
 def subtract(arguments):
-    result = arguments[0]
-    if len(arguments) > 1:
-        for argument in arguments[1:]:
-            result -= argument
-    return result
+    return fold(operator.sub, arguments)
 
 def divide(arguments):
-    result = arguments[0]
-    if len(arguments) > 1:
-        for argument in arguments[1:]:
-            result /= argument
-    return result
+    return fold(operator.div, arguments, kelpy.types.quotient)
 
 def modulo(arguments):
-    result = arguments[0]
-    if len(arguments) > 1:
-        for argument in arguments[1:]:
-            result %= argument
-    return result
-
-FUNCTION_MAP = {
-    '+': ('Add',        add),
-    '*': ('Multiply',   multiply),
-    '-': ('Subtract',   subtract),
-    '/': ('Divide',     divide),
-    '%': ('Modulo',     modulo),
-}
+    return fold(operator.mod, arguments)
+
+NUMBERS = ('number',)
+
+BUILTINS = [
+    Builtin('+', 'Add',         add,        argument_types=('number', 'list'),
+            integer=operator.add),
+    Builtin('*', 'Multiply',    multiply,   argument_types=NUMBERS, result_type='number',
+            integer=operator.mul),
+    Builtin('-', 'Subtract',    subtract,   argument_types=NUMBERS, result_type='number',
+            integer=operator.sub),
+    Builtin('/', 'Divide',      divide,     argument_types=NUMBERS, result_type='number'),
+    Builtin('%', 'Modulo',      modulo,     argument_types=NUMBERS, result_type='number',
+            integer=operator.mod),
+]
+
+FUNCTION_MAP = dict((builtin.name, (builtin.title, builtin.function)) for builtin in BUILTINS)
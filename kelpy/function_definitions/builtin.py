@@ -0,0 +1,83 @@
+import kelpy.types
+
+class Builtin(object):
+    """
+    A builtin function, with what is known about it before it is called: how
+    many arguments it takes, whether it is pure, the types of its arguments
+    and result, and any faster ways of calling it in common cases.
+
+    Types are given by the `type` names of the KExpression classes, such as
+    'number' or 'boolean', since the classes themselves are defined only after
+    the builtins are.
+    """
+    __slots__ = ('name', 'title', 'function', 'min_args', 'max_args', 'pure',
+                 'argument_types', 'result_type', 'binary', 'integer')
+    def __init__(self, name, title, function, min_args=1, max_args=None, pure=True,
+                 argument_types=None, result_type=None, binary=None, integer=None):
+        """
+        :param name: The keyword calling the function, e.g. '+'.
+        :param title: The name used in the type of its KFunctionExpressions.
+        :param function: A function taking a tuple of evaluated arguments and
+            returning a KExpression.
+        :param min_args: The fewest arguments the function accepts.
+        :param max_args: The most arguments the function accepts, or None if
+            there is no limit.
+        :param pure: Whether the function only computes its result from its
+            arguments, with no side effects, so that calls of it can be folded
+            and cached.
+        :param argument_types: The type names every argument may have, or None
+            if it may have any type.
+        :param result_type: The type name of every result, or None if it may
+            be of any type.
+        :param binary: A function of exactly two evaluated arguments, giving
+            the same result as `function` given both of them. If it is not
+            given, one is made from `integer`, if that is.
+        :param integer: A function of two Python ints or longs, giving the
+            value of the result when both arguments are integers.
+        """
+        self.name           = name
+        self.title          = title
+        self.function       = function
+        self.min_args       = min_args
+        self.max_args       = max_args
+        self.pure           = pure
+        self.argument_types = argument_types
+        self.result_type    = result_type
+        self.integer        = integer
+        if binary is None and integer is not None:
+            binary = integer_kernel(integer, function, result_type)
+        self.binary         = binary
+    def __repr__(self):
+        return "<builtin: {name}>".format(name=self.name)
+    def accepts(self, count):
+        """
+        Determines whether the function can be called with a number of
+        arguments.
+        """
+        return count >= self.min_args and (self.max_args is None or count <= self.max_args)
+
+def integer_kernel(integer, function, result_type):
+    """
+    Creates the two-argument kernel for a function with an integer fast path.
+    Arguments which are not both integers are given to the function itself.
+
+    :param integer: The function of two integer values.
+    :param function: The function of a tuple of arguments.
+    :param result_type: 'boolean' if the integer function gives a bool to be
+        made into a KBoolean, and 'number' if it gives a number.
+    """
+    if result_type == 'boolean':
+        def binary(one, two):
+            number = kelpy.types.KNumber
+            if type(one) is number and type(two) is number and one.integer and two.integer:
+                if integer(one.value, two.value):
+                    return kelpy.types.KBoolean.TRUE
+                return kelpy.types.KBoolean.FALSE
+            return function((one, two))
+    else:
+        def binary(one, two):
+            number = kelpy.types.KNumber
+            if type(one) is number and type(two) is number and one.integer and two.integer:
+                return number(integer(one.value, two.value))
+            return function((one, two))
+    return binary
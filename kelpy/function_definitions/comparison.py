@@ -1,60 +1,104 @@
+import operator
 import kelpy.types
 from kelpy.exceptions import TooFewArgumentsException
-from itertools import combinations
+from kelpy.function_definitions.arithmetic import native
+from kelpy.function_definitions.builtin import Builtin
+
+# Each comparison of more than two KNumbers works on their native values,
+# rather than comparing KNumbers pair by pair. Either way the arguments are
+# walked once, and a shared KBoolean is returned.
 
 def equality(arguments):
     if len(arguments) < 2:
         raise TooFewArgumentsException('==', arguments)
-    for argument in arguments[1:]:
-        if arguments[0] != argument:
+    values = native(arguments) or arguments if len(arguments) > 2 else arguments
+    first = values[0]
+    for value in values[1:]:
+        if first != value:
             return kelpy.types.KBoolean(False)
     return kelpy.types.KBoolean(True)
 
 def inequality(arguments):
     if len(arguments) < 2:
         raise TooFewArgumentsException('!=', arguments)
-    for pair in [p for p in combinations(arguments, 2)]:
-        if pair[0] == pair[1]:
-            return kelpy.types.KBoolean(False)
+    if len(arguments) == 2:
+        return kelpy.types.KBoolean(not arguments[0] == arguments[1])
+    values = native(arguments)
+    if values is None:
+        return pairwise_inequality(arguments)
+    # Numbers are distinct if no two are equal, which a set finds in linear
+    # time. A NaN equals nothing, not even itself, so it is always distinct.
+    seen = set()
+    for value in values:
+        if value == value:
+            if value in seen:
+                return kelpy.types.KBoolean(False)
+            seen.add(value)
+    return kelpy.types.KBoolean(True)
+
+def pairwise_inequality(arguments):
+    """
+    Compares every pair of arguments, for arguments which are not all numbers.
+    Equality between expressions of different types need not agree with their
+    hashes, so these cannot be put in a set.
+    """
+    for index, argument in enumerate(arguments):
+        for other in arguments[index + 1:]:
+            if argument == other:
+                return kelpy.types.KBoolean(False)
     return kelpy.types.KBoolean(True)
 
 def less_than(arguments):
     if len(arguments) < 2:
         raise TooFewArgumentsException('<', arguments)
-    for i in xrange(len(arguments) - 1):
-        if arguments[i] >= arguments[i + 1]:
+    values = native(arguments) or arguments if len(arguments) > 2 else arguments
+    for i in xrange(len(values) - 1):
+        if values[i] >= values[i + 1]:
             return kelpy.types.KBoolean(False)
     return kelpy.types.KBoolean(True)
 
 def greater_than(arguments):
     if len(arguments) < 2:
         raise TooFewArgumentsException('>', arguments)
-    for i in xrange(len(arguments) - 1):
-        if arguments[i] <= arguments[i + 1]:
+    values = native(arguments) or arguments if len(arguments) > 2 else arguments
+    for i in xrange(len(values) - 1):
+        if values[i] <= values[i + 1]:
             return kelpy.types.KBoolean(False)
     return kelpy.types.KBoolean(True)
 
 def less_than_or_equal(arguments):
     if len(arguments) < 2:
         raise TooFewArgumentsException('<=', arguments)
-    for i in xrange(len(arguments) - 1):
-        if arguments[i] > arguments[i + 1]:
+    values = native(arguments) or arguments if len(arguments) > 2 else arguments
+    for i in xrange(len(values) - 1):
+        if values[i] > values[i + 1]:
             return kelpy.types.KBoolean(False)
     return kelpy.types.KBoolean(True)
 
 def greater_than_or_equal(arguments):
     if len(arguments) < 2:
         raise TooFewArgumentsException('>=', arguments)
-    for i in xrange(len(arguments) - 1):
-        if arguments[i] < arguments[i + 1]:
+    values = native(arguments) or arguments if len(arguments) > 2 else arguments
+    for i in xrange(len(values) - 1):
+        if values[i] < values[i + 1]:
             return kelpy.types.KBoolean(False)
     return kelpy.types.KBoolean(True)
 
-FUNCTION_MAP = {
-    '==': ('Equality',          equality),
-    '!=': ('Inequality',        inequality),
-    '<':  ('LessThan',          less_than),
-    '>':  ('GreaterThan',       greater_than),
-    '<=': ('LessThanEqual',     less_than_or_equal),
-    '>=': ('GreaterThanEqual',  greater_than_or_equal),
-}
+NUMBERS = ('number',)
+
+BUILTINS = [
+    Builtin('==', 'Equality',           equality,               min_args=2,
+            result_type='boolean', integer=operator.eq),
+    Builtin('!=', 'Inequality',         inequality,             min_args=2,
+            result_type='boolean', integer=operator.ne),
+    Builtin('<',  'LessThan',           less_than,              min_args=2,
+            argument_types=NUMBERS, result_type='boolean', integer=operator.lt),
+    Builtin('>',  'GreaterThan',        greater_than,           min_args=2,
+            argument_types=NUMBERS, result_type='boolean', integer=operator.gt),
+    Builtin('<=', 'LessThanEqual',      less_than_or_equal,     min_args=2,
+            argument_types=NUMBERS, result_type='boolean', integer=operator.le),
+    Builtin('>=', 'GreaterThanEqual',   greater_than_or_equal,  min_args=2,
+            argument_types=NUMBERS, result_type='boolean', integer=operator.ge),
+]
+
+FUNCTION_MAP = dict((builtin.name, (builtin.title, builtin.function)) for builtin in BUILTINS)
@@ -0,0 +1,179 @@
+import operator
+from itertools import islice
+import kelpy.types
+from kelpy.exceptions import InvalidArgumentsException, BadListIndexException
+from kelpy.function_definitions.arithmetic import native, add
+from kelpy.function_definitions.builtin import Builtin
+
+# Each builtin here walks the whole of a list in a single loop over its items,
+# rather than taking it apart with `rest`, which would make a new list at each
+# step. Lists are taken last, as with `prepend` and `append`.
+
+def klist(function, arguments):
+    """
+    Gets the list given as the last of a function's arguments.
+    """
+    items = arguments[-1]
+    if not isinstance(items, kelpy.types.KList):
+        raise InvalidArgumentsException(function, arguments)
+    return items
+
+def count(function, arguments):
+    """
+    Gets the count given as the first of a function's arguments, which must be
+    a non-negative integer.
+    """
+    number = arguments[0]
+    if not isinstance(number, kelpy.types.KNumber) or not number.integer or number.value < 0:
+        raise InvalidArgumentsException(function, arguments)
+    return number.value
+
+def numbers(function, arguments):
+    """
+    Gets the items of the list given as a function's argument, along with
+    their native values, which they must all be KNumbers to have.
+    """
+    items = list(klist(function, arguments))
+    values = native(items)
+    if values is None:
+        raise InvalidArgumentsException(function, arguments)
+    return items, values
+
+def call(closure, *arguments):
+    """
+    Calls a closure on evaluated arguments, as `{call ...}` does, with the
+    engine which made the closure.
+    """
+    # The interpreter is imported here, since it depends on the types, which
+    # are defined after the builtins.
+    import kelpy.interpreter
+    return kelpy.interpreter.apply(closure, arguments)
+
+################################################################################
+# Access
+####
+
+def length(arguments):
+    return kelpy.types.KNumber(len(klist('length', arguments)))
+
+def nth(arguments):
+    index = count('nth', arguments)
+    items = klist('nth', arguments)
+    if index >= len(items):
+        raise BadListIndexException(str(index))
+    return items[index]
+
+def take(arguments):
+    number = count('take', arguments)
+    items = klist('take', arguments)
+    if number >= len(items):
+        return items
+    if isinstance(items, kelpy.types.KRange):
+        return kelpy.types.KRange(items.start, items.start + number * items.step, items.step)
+    return kelpy.types.KList(list(islice(items, number)))
+
+def drop(arguments):
+    number = count('drop', arguments)
+    items = klist('drop', arguments)
+    if not number:
+        return items
+    if number >= len(items):
+        return kelpy.types.KList()
+    if isinstance(items, kelpy.types.KRange):
+        stop = items.start + len(items) * items.step
+        return kelpy.types.KRange(items.start + number * items.step, stop, items.step)
+    # The rest of the list is shared rather than copied, if the items to drop
+    # are all in its front chain.
+    cell = items.front
+    for _ in xrange(number):
+        if cell is None:
+            return kelpy.types.KList(list(islice(items, number, None)))
+        cell = cell[1]
+    return kelpy.types.KList.linked(cell, items.rear, len(items) - number)
+
+################################################################################
+# Reductions
+####
+
+def sum_list(arguments):
+    items = klist('sum', arguments)
+    if isinstance(items, kelpy.types.KRange):
+        return kelpy.types.KNumber(sum(items.values))
+    if not items:
+        return kelpy.types.KNumber(0)
+    return add(tuple(items))
+
+def extreme(function, arguments, choose):
+    """
+    Finds the least or greatest number in a list, with `choose` being `min` or
+    `max`. The item itself is returned, not a new KNumber of the same value.
+    """
+    items, values = numbers(function, arguments)
+    if not items:
+        raise InvalidArgumentsException(function, arguments)
+    return items[values.index(choose(values))]
+
+def min_list(arguments):
+    return extreme('min', arguments, min)
+
+def max_list(arguments):
+    return extreme('max', arguments, max)
+
+def sort(arguments):
+    items = klist('sort', arguments)
+    if isinstance(items, kelpy.types.KRange) and items.step > 0:
+        return items
+    items, _ = numbers('sort', arguments)
+    return kelpy.types.KList(sorted(items, key=operator.attrgetter('value')))
+
+################################################################################
+# Higher-order functions
+#   - each calls a closure, made by `lambda` or `rec`, on the items of a list
+####
+
+def map_list(arguments):
+    function = arguments[0]
+    return kelpy.types.KList([call(function, item) for item in klist('map', arguments)])
+
+def filter_list(arguments):
+    function = arguments[0]
+    return kelpy.types.KList([item for item in klist('filter', arguments)
+                              if kelpy.types.KBoolean(call(function, item))])
+
+def foldl(arguments):
+    function, result = arguments[0], arguments[1]
+    for item in klist('foldl', arguments):
+        result = call(function, result, item)
+    return result
+
+LISTS = ('list',)
+
+# The higher-order functions are pure, as every closure is: KL has no side
+# effects, so a closure's value depends only on its arguments and the values
+# it captured. Their calls are never folded, since a closure is not a constant,
+# and whether they are worth caching is left to the Memo's `min_cost`.
+BUILTINS = [
+    Builtin('length',   'Length',   length,         min_args=1, max_args=1,
+            argument_types=LISTS, result_type='number'),
+    Builtin('nth',      'Nth',      nth,            min_args=2, max_args=2,
+            argument_types=('number', 'list')),
+    Builtin('take',     'Take',     take,           min_args=2, max_args=2,
+            argument_types=('number', 'list'), result_type='list'),
+    Builtin('drop',     'Drop',     drop,           min_args=2, max_args=2,
+            argument_types=('number', 'list'), result_type='list'),
+    Builtin('sum',      'Sum',      sum_list,       min_args=1, max_args=1,
+            argument_types=LISTS),
+    Builtin('min',      'Min',      min_list,       min_args=1, max_args=1,
+            argument_types=LISTS, result_type='number'),
+    Builtin('max',      'Max',      max_list,       min_args=1, max_args=1,
+            argument_types=LISTS, result_type='number'),
+    Builtin('sort',     'Sort',     sort,           min_args=1, max_args=1,
+            argument_types=LISTS, result_type='list'),
+    Builtin('map',      'Map',      map_list,       min_args=2, max_args=2,
+            result_type='list'),
+    Builtin('filter',   'Filter',   filter_list,    min_args=2, max_args=2,
+            result_type='list'),
+    Builtin('foldl',    'Foldl',    foldl,          min_args=3, max_args=3),
+]
+
+FUNCTION_MAP = dict((builtin.name, (builtin.title, builtin.function)) for builtin in BUILTINS)
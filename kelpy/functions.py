@@ -1,11 +1,28 @@
+from exceptions import *
 from function_definitions import *
+from function_definitions.builtin import Builtin
 
-FUNCTION_MAP = {}
-FUNCTION_MAP.update(arithmetic.FUNCTION_MAP)
-FUNCTION_MAP.update(comparison.FUNCTION_MAP)
+# The registry of builtin functions: the Builtin for each, by name.
+BUILTINS = {}
+for module in (arithmetic, comparison, lists):
+    BUILTINS.update((builtin.name, builtin) for builtin in module.BUILTINS)
+del module
 
-def handle_function(kfunction):
+FUNCTION_MAP = dict((name, (builtin.title, builtin.function))
+                    for name, builtin in BUILTINS.iteritems())
+
+PURE_FUNCTIONS = frozenset(name for name, builtin in BUILTINS.iteritems() if builtin.pure)
+
+def builtin_for(name):
+    """
+    Gets the Builtin registered under a name.
+
+    :raises InvalidFunctionException: If there is no such builtin.
+    """
     try:
-        return FUNCTION_MAP[kfunction.function][1](kfunction.args)
+        return BUILTINS[name]
     except KeyError:
-        raise InvalidFunctionException(kfunction.function)
+        raise InvalidFunctionException(name)
+
+def handle_function(kfunction):
+    return kfunction.builtin.function(kfunction.args)
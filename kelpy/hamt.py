@@ -0,0 +1,180 @@
+################################################################################
+#
+# hamt.py
+#
+# This module provides HashMap, a persistent hash array mapped trie. Adding a
+# key to a HashMap produces a new map which shares all but O(log n) of its
+# nodes with the old one, and both lookups and additions take O(log n) time
+# with a base of 32 (so in practice, at most a handful of steps).
+#
+################################################################################
+
+BITS    = 5
+MASK    = (1 << BITS) - 1
+HASH    = (1 << 64) - 1     # Hashes are taken as unsigned 64-bit values.
+
+# The number of set bits in each 16-bit value, used to find the position of an
+# entry within a node.
+POPCOUNT = [0] * (1 << 16)
+for value in xrange(1, 1 << 16):
+    POPCOUNT[value] = POPCOUNT[value >> 1] + (value & 1)
+del value
+
+def popcount(bits):
+    return POPCOUNT[bits & 0xFFFF] + POPCOUNT[bits >> 16]
+
+################################################################################
+# Nodes
+####
+
+# Stands in place of a key in front of each child node.
+CHILD = object()
+
+class BitmapNode(object):
+    """
+    A node of the trie. Each set bit of the bitmap stands for one entry, and
+    `entries` holds two items per entry: either a key and its value, or CHILD
+    and the child node holding the keys which share that part of their hash.
+    """
+    __slots__ = ('bitmap', 'entries')
+    def __init__(self, bitmap, entries):
+        self.bitmap     = bitmap
+        self.entries    = entries
+
+class CollisionNode(object):
+    """
+    A node holding keys whose hashes are entirely equal, as (key, value) pairs.
+    """
+    __slots__ = ('hash', 'pairs')
+    def __init__(self, hash_, pairs):
+        self.hash   = hash_
+        self.pairs  = pairs
+
+def key_hash(key):
+    return hash(key) & HASH
+
+def find(node, key, hash_, default):
+    """
+    Finds the value of a key in the trie below a node.
+    """
+    shift = 0
+    while node is not None:
+        if type(node) is CollisionNode:
+            for other, value in node.pairs:
+                if other is key or other == key:
+                    return value
+            return default
+        bit = 1 << ((hash_ >> shift) & MASK)
+        if not node.bitmap & bit:
+            return default
+        index = 2 * popcount(node.bitmap & (bit - 1))
+        other = node.entries[index]
+        if other is CHILD:
+            node = node.entries[index + 1]
+            shift += BITS
+        elif other is key or other == key:
+            return node.entries[index + 1]
+        else:
+            return default
+    return default
+
+def assoc(node, shift, key, hash_, value):
+    """
+    Adds a key to the trie below a node, without changing the node.
+
+    :return: A tuple of the new node and whether the key was not already
+        present.
+    """
+    if node is None:
+        return BitmapNode(1 << ((hash_ >> shift) & MASK), (key, value)), True
+    if type(node) is CollisionNode:
+        if hash_ == node.hash:
+            for index, (other, _) in enumerate(node.pairs):
+                if other is key or other == key:
+                    pairs = node.pairs[:index] + ((key, value),) + node.pairs[index + 1:]
+                    return CollisionNode(hash_, pairs), False
+            return CollisionNode(hash_, node.pairs + ((key, value),)), True
+        # Move the collision node below a node which tells the hashes apart.
+        wrapper = BitmapNode(1 << ((node.hash >> shift) & MASK), (CHILD, node))
+        return assoc(wrapper, shift, key, hash_, value)
+    bit = 1 << ((hash_ >> shift) & MASK)
+    index = 2 * popcount(node.bitmap & (bit - 1))
+    entries = node.entries
+    if not node.bitmap & bit:
+        entries = entries[:index] + (key, value) + entries[index:]
+        return BitmapNode(node.bitmap | bit, entries), True
+    other, current = entries[index], entries[index + 1]
+    if other is CHILD:
+        child, added = assoc(current, shift + BITS, key, hash_, value)
+        replacement = (CHILD, child)
+    elif other is key or other == key:
+        if current is value:
+            return node, False
+        replacement, added = (key, value), False
+    else:
+        child = branch(shift + BITS, other, key_hash(other), current, key, hash_, value)
+        replacement, added = (CHILD, child), True
+    entries = entries[:index] + replacement + entries[index + 2:]
+    return BitmapNode(node.bitmap, entries), added
+
+def branch(shift, one, one_hash, one_value, two, two_hash, two_value):
+    """
+    Creates a node holding two keys which share the hash bits above `shift`.
+    """
+    if one_hash == two_hash:
+        return CollisionNode(one_hash, ((one, one_value), (two, two_value)))
+    node, _ = assoc(None, shift, one, one_hash, one_value)
+    node, _ = assoc(node, shift, two, two_hash, two_value)
+    return node
+
+def walk(node):
+    """
+    Generates the (key, value) pairs in the trie below a node.
+    """
+    stack = [node] if node is not None else []
+    while stack:
+        node = stack.pop()
+        if type(node) is CollisionNode:
+            for pair in node.pairs:
+                yield pair
+            continue
+        entries = node.entries
+        for index in xrange(0, len(entries), 2):
+            if entries[index] is CHILD:
+                stack.append(entries[index + 1])
+            else:
+                yield entries[index], entries[index + 1]
+
+################################################################################
+# HashMap
+####
+
+class HashMap(object):
+    """
+    A persistent map. Maps are never changed: `set` returns a new map.
+    """
+    __slots__ = ('root', 'size')
+    def __init__(self, root=None, size=0):
+        self.root = root
+        self.size = size
+    def __len__(self):
+        return self.size
+    def __iter__(self):
+        return (key for key, _ in walk(self.root))
+    def __contains__(self, key):
+        return find(self.root, key, key_hash(key), MISSING) is not MISSING
+    def get(self, key, default=None):
+        return find(self.root, key, key_hash(key), default)
+    def set(self, key, value):
+        """
+        :return: A map with `key` bound to `value`, replacing any earlier value
+            of the key.
+        """
+        root, added = assoc(self.root, 0, key, key_hash(key), value)
+        if root is self.root:
+            return self
+        return HashMap(root, self.size + 1 if added else self.size)
+    def items(self):
+        return walk(self.root)
+
+MISSING = object()
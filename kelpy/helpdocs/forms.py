@@ -20,8 +20,29 @@ Using a 'let' allows you to create a sort of shortcut for a long expression that
 you may want to use multiple times within a single expression. The syntax is:
     {let {SYMBOL EXPRESSION} BODY}
 Throughout the evaluation of BODY, any instance of SYMBOl will be replaced with
-EXPRESSION. Neat!
+the value of EXPRESSION, which is worked out only once. A 'let' inside BODY may
+bind the same symbol again, which hides the outer binding within its own body.
+Neat!
 
 Example:
     {let {'x 3} {+ x 10}} -> 13
 '''
+
+lambda_form = '''\
+LAMBDA
+A 'lambda' makes a function which can be called with 'call'. The syntax is:
+    {lambda {SYMBOL ...} BODY}
+    {call FUNCTION EXPRESSION ...}
+When the function is called, BODY is evaluated with each SYMBOL bound to the
+value of the matching EXPRESSION. A function remembers the values of any other
+symbols its BODY uses from where it was made. To let a function call itself,
+give it a name with 'rec':
+    {rec NAME {SYMBOL ...} BODY}
+A call made as the very last step of a function (such as in either branch of
+an 'if') does not use up any more room, so such a function can call itself as
+many times as you like.
+
+Example:
+    {call {lambda {'x} {* 'x 'x}} 4} -> 16
+    {call {rec 'loop {'n} {if {== 'n 0} 0 {call 'loop {- 'n 1}}}} 100000} -> 0
+'''
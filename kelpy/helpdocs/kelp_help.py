@@ -22,6 +22,7 @@ TOPICS_LIST = {
     'comparison'        : (2, concepts.comparison),
     'if'                : (3, forms.if_form),
     'let'               : (3, forms.let),
+    'lambda'            : (3, forms.lambda_form),
 }
 
 TOPICS = (
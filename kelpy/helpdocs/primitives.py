@@ -3,6 +3,10 @@ NUMBERS
 Kelpy has a pretty advanced idea of what a 'number' is. Unlike most languages
 where there is a difference between integers (2, 3, 1929, ...) and fractional
 numbers (0.83, 1929.0, -.29), Kelpy treats these all as just 'numbers'.
+
+Fractions such as 3/4 are kept exact, and so is arithmetic on integers and
+fractions: {/ 7 2} is 7/2, and {+ 1/3 1/6} is 1/2. Once a decimal number such as
+0.5 is involved, the result is a decimal number too.
 '''
 
 booleans = '''\
@@ -66,4 +70,27 @@ List Operations:
       - returns a list with the given element added to the front
     {append 4 {list 1 2 3}} == {list 1 2 3 4}
       - returns a list with the given element added to the back
+    {length {list 1 2 3}} == 3
+      - returns the number of elements in a list
+    {nth 1 {list 1 2 3}} == 2
+      - returns the element at a position, counting from 0
+    {take 2 {list 1 2 3}} == {list 1 2}
+      - returns the first elements of a list
+    {drop 2 {list 1 2 3}} == {list 3}
+      - returns the list without its first elements
+    {sum {list 1 2 3}} == 6
+      - adds up the elements of a list
+    {min {list 3 1 2}} == 1
+    {max {list 3 1 2}} == 3
+      - return the least or greatest number in a list
+    {sort {list 3 1 2}} == {list 1 2 3}
+      - returns the numbers of a list from least to greatest
+    {map {lambda {'x} {* 'x 'x}} {list 1 2 3}} == {list 1 4 9}
+      - calls a function on each element, returning the list of the results
+    {filter {lambda {'x} {> 'x 1}} {list 1 2 3}} == {list 2 3}
+      - returns the elements for which a function gives a true value
+    {foldl {lambda {'total 'x} {+ 'total 'x}} 0 {list 1 2 3}} == 6
+      - calls a function on a running value and each element in turn
+Unlike the operations above, these work on lists bound to symbols as well as on
+lists written out, and go through a list once however long it is.
 '''
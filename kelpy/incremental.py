@@ -0,0 +1,338 @@
+################################################################################
+#
+# incremental.py
+#
+# This module parses KL text into Documents, which remember the brace groups
+# each KExpression was built from. When the text of a Document is edited, only
+# the brace groups enclosing the edit are rebuilt; every other subtree of the
+# previous KExpression is reused as-is.
+#
+################################################################################
+
+from exceptions import *
+from types import Span
+from forms import FORM_MAP, Group, parse_atom
+from parser import build, is_binding_position
+from tokenizer import tokenize, Token, ATOM, OPEN, CLOSE
+
+################################################################################
+# SyntaxNode
+#   - a brace group and the KExpression built from it
+####
+
+class SyntaxNode(object):
+    def __init__(self, offset, length, items, kexp, binding=False):
+        """
+        :param offset: The offset of the opening brace, relative to the start
+            of the enclosing group (or of the text, for the outermost group).
+        :param length: The length of the group's text, including its braces.
+        :param items: The contents of the group: atom Tokens, with offsets
+            relative to this group's start, and nested SyntaxNodes.
+        :param kexp: The KExpression built from the group, or a Group if the
+            group is the binding of its enclosing form.
+        :param binding: Whether the group is the binding of its enclosing form.
+        """
+        self.offset     = offset
+        self.length     = length
+        self.items      = items
+        self.kexp       = kexp
+        self.binding    = binding
+    def __repr__(self):
+        return "<syntax: {kexp!r}>".format(kexp=self.kexp)
+    def moved(self, offset):
+        return SyntaxNode(offset, self.length, self.items, self.kexp, self.binding)
+
+def item_length(item):
+    if isinstance(item, SyntaxNode):
+        return item.length
+    return len(item.text)
+
+def item_moved(item, offset):
+    if isinstance(item, SyntaxNode):
+        return item.moved(offset)
+    return Token(ATOM, item.text, offset)
+
+def builder_items(items, start):
+    """
+    Converts the items of a SyntaxNode into the items expected by a form's
+    builder.
+
+    :param items: The items of a SyntaxNode.
+    :param start: The absolute offset of the SyntaxNode.
+    :return: A list of Tokens with absolute offsets and built KExpressions.
+    """
+    converted = []
+    for item in items:
+        if isinstance(item, SyntaxNode):
+            converted.append(item.kexp)
+        else:
+            converted.append(Token(ATOM, item.text, start + item.offset))
+    return converted
+
+def close_group(text, start, length, items, nodes, binding):
+    """
+    Builds the SyntaxNode for a complete brace group.
+
+    :param text: The full text being parsed.
+    :param start: The absolute offset of the group's opening brace.
+    :param length: The length of the group's text.
+    :param items: The builder items of the group.
+    :param nodes: The SyntaxNode items of the group.
+    :param binding: Whether the group is the binding of its enclosing form.
+    :return: A SyntaxNode, with its offset still absolute.
+    """
+    if binding:
+        kexp = Group(items, start)
+    else:
+        kexp = build(items, Span(text, start, start + length), start)
+    return SyntaxNode(start, length, nodes, kexp, binding)
+
+def read(text, start, end, stack, roots):
+    """
+    Tokenizes and builds the text between two offsets. Complete groups and
+    atoms are added to the innermost open group on the stack, or to `roots`
+    if the stack is empty.
+
+    :param text: The full text being parsed.
+    :param start: The offset at which to begin.
+    :param end: The offset at which to stop.
+    :param stack: The open groups, each a list of (absolute offset, builder
+        items, SyntaxNode items, binding).
+    :param roots: The list collecting complete top-level items.
+    """
+    if start == 0 and end == len(text):
+        tokens = tokenize(text)
+    else:
+        tokens = tokenize(text[start:end])
+    for token in tokens:
+        offset = start + token.offset
+        if roots and not stack:
+            raise SuperfluousDataException(text[offset:], offset)
+        if token.kind == OPEN:
+            stack.append([offset, [], [], is_binding_position(stack)])
+            continue
+        elif token.kind == CLOSE:
+            group_start, items, nodes, binding = stack.pop()
+            node = close_group(text, group_start, offset + 1 - group_start,
+                               items, nodes, binding)
+            item = node.kexp
+        else:
+            node = item = Token(ATOM, token.text, offset)
+        if stack:
+            # Builder items keep absolute offsets, while the offsets of
+            # SyntaxNode items are made relative to their parent.
+            parent = stack[-1]
+            parent[1].append(item)
+            parent[2].append(item_moved(node, node.offset - parent[0]))
+        else:
+            roots.append(node)
+
+################################################################################
+# Document
+####
+
+def parse_document(text):
+    """
+    Parses a single KExpression from text, remembering how it was built so that
+    it can be reparsed incrementally.
+
+    :param text: The raw text to parse.
+    :return: A Document.
+    """
+    roots = []
+    read(text, 0, len(text), [], roots)
+    if not roots:
+        raise NoExpressionException(text, 0)
+    root = roots[0]
+    if isinstance(root, SyntaxNode):
+        kexp = root.kexp
+    else:
+        kexp = parse_atom(root)
+    return Document(text, root, kexp)
+
+def reparse(document, offset, deleted, inserted):
+    """
+    Applies a text edit to a Document and reparses it.
+
+    :param document: The Document to edit.
+    :param offset: The offset at which the edit begins.
+    :param deleted: The number of characters removed at `offset`.
+    :param inserted: The text inserted at `offset`.
+    :return: A new Document for the edited text.
+    """
+    return document.edit(offset, deleted, inserted)
+
+class Document(object):
+    """
+    A parsed expression together with its text and syntax tree. Documents are
+    never changed; editing one produces a new Document which shares every
+    unaffected subtree with the old one.
+    """
+    def __init__(self, text, root, kexp):
+        self.text   = text
+        self.root   = root
+        self.kexp   = kexp
+    def __repr__(self):
+        return "<document: {kexp!r}>".format(kexp=self.kexp)
+    def edit(self, offset, deleted, inserted):
+        """
+        Replaces `deleted` characters at `offset` with the `inserted` text.
+
+        Only the brace groups which enclose the edit are rebuilt. Within the
+        innermost of those, only the items touched by the edit are read again.
+        If the edit cannot be confined to a group (for instance if it changes
+        the outermost braces), the whole text is reparsed.
+
+        :return: A new Document for the edited text.
+        """
+        if offset < 0 or deleted < 0 or offset + deleted > len(self.text):
+            raise ImplementationException("Edit outside of document text.")
+        text = self.text[:offset] + inserted + self.text[offset + deleted:]
+        try:
+            root = self.rebuild(text, offset, deleted, len(inserted) - deleted)
+        except ParseException:
+            root = None
+        if root is None:
+            return parse_document(text)
+        return Document(text, root, root.kexp)
+    def update(self, text):
+        """
+        Reparses the Document with new text, treating the difference between
+        the old and new text as a single edit.
+
+        :param text: The complete new text.
+        :return: A new Document for the text.
+        """
+        prefix = common_prefix_length(self.text, text)
+        limit  = min(len(self.text), len(text)) - prefix
+        suffix = common_suffix_length(self.text, text, limit)
+        deleted = len(self.text) - prefix - suffix
+        return self.edit(prefix, deleted, text[prefix:len(text) - suffix])
+    def rebuild(self, text, offset, deleted, delta):
+        """
+        Rebuilds the syntax tree after an edit.
+
+        :return: The new root SyntaxNode, or None if the edit is not confined
+            to a brace group and the text must be parsed again in full.
+        """
+        root = self.root
+        if (not isinstance(root, SyntaxNode) or
+                not encloses(root.offset, root.length, offset, deleted)):
+            return None
+        # Find the innermost group enclosing the edit, recording each group's
+        # absolute offset and its index within its parent.
+        path = [(root, root.offset, None)]
+        while True:
+            node, start, _ = path[-1]
+            for index, item in enumerate(node.items):
+                if (isinstance(item, SyntaxNode) and
+                        encloses(start + item.offset, item.length, offset, deleted)):
+                    path.append((item, start + item.offset, index))
+                    break
+            else:
+                break
+        node, start, _ = path[-1]
+        new = self.rebuild_group(text, node, start, offset, deleted, delta)
+        if new is None:
+            return None
+        # Rebuild each enclosing group with its new child.
+        for (parent, parent_start, _), (_, _, index) in zip(reversed(path[:-1]),
+                                                            reversed(path[1:])):
+            nodes = parent.items[:index] + [new]
+            nodes.extend(item_moved(item, item.offset + delta)
+                         for item in parent.items[index + 1:])
+            if not binding_positions_hold(nodes):
+                return None
+            new = close_group(text, parent_start, parent.length + delta,
+                              builder_items(nodes, parent_start), nodes,
+                              parent.binding)
+            new.offset = parent.offset
+        return new
+    def rebuild_group(self, text, node, start, offset, deleted, delta):
+        """
+        Rebuilds the innermost group enclosing an edit, reading again only the
+        items which the edit touches.
+
+        :return: The new SyntaxNode, or None if the group must be reparsed as
+            part of its parent.
+        """
+        before = []
+        after  = []
+        region_start = start + 1
+        region_end   = start + node.length - 1
+        for item in node.items:
+            item_start = start + item.offset
+            item_end   = item_start + item_length(item)
+            if item_end < offset:
+                before.append(item)
+                region_start = item_end
+            elif item_start > offset + deleted:
+                if not after:
+                    region_end = item_start
+                after.append(item)
+        stack = [[start, builder_items(before, start), list(before), node.binding]]
+        roots = []
+        read(text, region_start, region_end + delta, stack, roots)
+        if roots or len(stack) != 1:
+            return None
+        _, items, nodes, binding = stack[0]
+        for item in after:
+            moved = item_moved(item, item.offset + delta)
+            nodes.append(moved)
+            items.append(builder_items([moved], start)[0])
+        if not binding_positions_hold(nodes):
+            return None
+        new = close_group(text, start, node.length + delta, items, nodes, binding)
+        new.offset = node.offset
+        return new
+
+def encloses(start, length, offset, deleted):
+    """
+    Determines whether an edit lies strictly within the braces of a group.
+    """
+    return start < offset and offset + deleted < start + length
+
+def binding_positions_hold(nodes):
+    """
+    Checks that every reused group is still a binding exactly when its position
+    in the (possibly edited) group calls for one.
+    """
+    if not nodes or not isinstance(nodes[0], Token):
+        return not any(isinstance(node, SyntaxNode) and node.binding
+                       for node in nodes)
+    form = FORM_MAP.get(nodes[0].text)
+    for index, node in enumerate(nodes[1:]):
+        if isinstance(node, SyntaxNode):
+            expected = form is not None and index in form.bindings
+            if node.binding != expected:
+                return False
+    return True
+
+def common_prefix_length(one, two):
+    """
+    Finds the length of the longest common prefix of two strings, comparing
+    slices so that the work is done by string comparison rather than a loop
+    over characters.
+    """
+    low, high = 0, min(len(one), len(two))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if one[low:middle] == two[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+def common_suffix_length(one, two, limit):
+    """
+    Finds the length of the longest common suffix of two strings, up to
+    `limit` characters.
+    """
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if one[len(one) - middle:len(one) - low] == two[len(two) - middle:len(two) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
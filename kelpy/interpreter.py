@@ -1,35 +1,237 @@
 from exceptions import *
 from types import *
-from functions import handle_function
+from resolver import free_symbols
 
 def interpret(kexp, env):
     """
     Takes an inputted KExpression and evaluates its contents.
+
+    An expression in tail position (a branch of an if, the body of a let or
+    scope, or the body of a lambda being called) is evaluated by the same call
+    instead of a recursive one, so calls in tail position, however many follow
+    one another, take no more of the Python stack.
     """
-    if not isinstance(kexp, KExpression):
-        raise InterpretException("Not a parsed expression: {}".format(kexp))
-    if isinstance(kexp, KSymbol):
-        return lookup(kexp, env)
-    elif isinstance(kexp, KFunctionExpression):
-        return handle_function(interpret_arguments(kexp, env))
-    elif isinstance(kexp, KIf):
-        if KBoolean(interpret(kexp.test, env)):
-            return interpret(kexp.true, env)
-        return interpret(kexp.false, env)
-    elif isinstance(kexp, KLet):
-        return interpret(
-            kexp.body,
-            (env + KBinding(kexp.name, kexp.value))
-        )
-    elif isinstance(kexp, KPrimitive):
-        return kexp
-    else:
-        raise RuntimeError()
+    while True:
+        if not isinstance(kexp, KExpression):
+            raise InterpretException("Not a parsed expression: {}".format(kexp))
+        if isinstance(kexp, KLocal):
+            return env.fetch(kexp.depth, kexp.slot)
+        elif isinstance(kexp, KSymbol):
+            return lookup(kexp, env)
+        elif isinstance(kexp, KFunctionExpression):
+            return kexp.builtin.function(interpret_arguments(kexp, env))
+        elif isinstance(kexp, KIf):
+            if KBoolean(interpret(kexp.test, env)):
+                kexp = kexp.true
+            else:
+                kexp = kexp.false
+        elif isinstance(kexp, KLet) and isinstance(kexp.name, KLocal):
+            env.values[kexp.name.slot] = interpret(kexp.value, env)
+            kexp = kexp.body
+        elif isinstance(kexp, KLet):
+            # The value is interpreted in the enclosing environment, so a
+            # binding can refer to an outer binding of the same symbol.
+            env = env + KBinding(kexp.name, interpret(kexp.value, env))
+            kexp = kexp.body
+        elif isinstance(kexp, KScope):
+            env = KFrame(kexp.size, env)
+            kexp = kexp.body
+        elif isinstance(kexp, KLambda):
+            return close(kexp, env)
+        elif isinstance(kexp, KApply):
+            closure = interpret(kexp.function, env)
+            arguments = [interpret(argument, env) for argument in kexp.args]
+            kexp, env = enter(closure, arguments)
+        elif isinstance(kexp, KPrimitive):
+            return kexp
+        else:
+            raise RuntimeError()
 
 def interpret_arguments(kfunction, env):
-    arguments = kfunction.args
+    """
+    Evaluates the arguments of a function expression. The expression itself is
+    left untouched, so that a parsed tree can be interpreted more than once.
+
+    :return: A tuple of the evaluated arguments, as the function's Builtin
+        takes them.
+    """
     interpreted = []
-    for argument in arguments:
+    for argument in kfunction.args:
         interpreted.append(interpret(argument, env))
-    kfunction.args = tuple(interpreted)
-    return kfunction
+    return tuple(interpreted)
+
+################################################################################
+# Closures
+#   - the values of lambdas, and calls of them
+####
+
+def close(klambda, env, evaluate=interpret):
+    """
+    Makes the closure of a lambda, capturing the values its free symbols have
+    in an environment.
+
+    :param klambda: The KLambda.
+    :param env: The environment (or, if the lambda has been resolved, the
+        frame) the lambda is evaluated in.
+    :param evaluate: The function evaluating the closure's body when it is
+        called, given the body and the environment or frame from `enter`.
+    :return: The KClosure.
+    """
+    if klambda.captures is not None:
+        captured = tuple([capture(address, env) for address in klambda.captures])
+        return KClosure(klambda, captured, evaluate)
+    if klambda.free is None:
+        klambda.free = free_symbols(klambda)
+    bindings = []
+    for symbol in klambda.free:
+        value = lookup(symbol, env)
+        if value is None:
+            raise UnboundSymbolException(symbol)
+        bindings.append(KBinding(symbol, value))
+    return KClosure(klambda, KEnvironment(*bindings), evaluate)
+
+def capture(address, env):
+    if isinstance(address, KLocal):
+        return env.fetch(address.depth, address.slot)
+    return lookup(address, env)
+
+def enter(closure, arguments):
+    """
+    Prepares to call a closure.
+
+    :param closure: The value being called.
+    :param arguments: The values of the arguments.
+    :return: A tuple of the body of the closure's lambda and the environment
+        or frame to evaluate it in, binding the parameters to the arguments.
+    """
+    if not isinstance(closure, KClosure):
+        raise NotAFunctionException(closure)
+    function = closure.function
+    if len(arguments) != len(function.params):
+        raise ArityException(function, arguments)
+    if function.captures is None:
+        env = closure.captured
+        if function.name is not None:
+            env = env + KBinding(function.name, closure)
+        for param, argument in zip(function.params, arguments):
+            env = env + KBinding(param, argument)
+        return function.body, env
+    frame = KFrame(function.size, empty_env)
+    values = frame.values
+    count = len(arguments)
+    values[:count] = arguments
+    if function.name is not None:
+        values[count] = closure
+        count += 1
+    values[count:count + len(closure.captured)] = closure.captured
+    return function.body, frame
+
+def apply(closure, arguments):
+    """
+    Calls a closure on evaluated arguments, evaluating its body with the
+    engine which made it.
+
+    :return: The value of the call.
+    """
+    body, env = enter(closure, arguments)
+    return closure.evaluate(body, env)
+
+################################################################################
+# Explicit-stack interpreter
+#   - evaluates expressions without recursion, however deeply they are nested
+####
+
+# The kinds of work on the work stack of `interpret_iteratively`. Each piece of
+# work is a tuple of its kind and one operand.
+EVALUATE    = 0     # Evaluates an expression, pushing its value.
+CALL        = 1     # Calls a function expression's function on its arguments.
+BRANCH      = 2     # Evaluates the branch of an if chosen by its test.
+STORE       = 3     # Stores a value in a slot of the current frame.
+BIND        = 4     # Binds a value to a symbol in a new environment.
+RESTORE     = 5     # Returns to an enclosing environment or frame.
+APPLY       = 6     # Calls a closure on its arguments.
+
+def interpret_iteratively(kexp, env):
+    """
+    Evaluates a KExpression just as `interpret` does, but with a stack of work
+    to be done instead of Python recursion, so that expressions can be nested
+    as deeply as you like.
+
+    An environment is only saved to be restored if there is work left to do
+    in it. In tail position, the work that follows is already the restoring
+    of an enclosing environment, so a call in tail position leaves the work
+    stack no larger than it found it.
+    """
+    work    = [(EVALUATE, kexp)]
+    values  = []
+    push    = values.append
+    pop     = values.pop
+    while work:
+        kind, operand = work.pop()
+        if kind == EVALUATE:
+            if isinstance(operand, KLocal):
+                push(env.fetch(operand.depth, operand.slot))
+            elif isinstance(operand, KSymbol):
+                push(lookup(operand, env))
+            elif isinstance(operand, KFunctionExpression):
+                work.append((CALL, operand))
+                work.extend([(EVALUATE, argument) for argument in reversed(operand.args)])
+            elif isinstance(operand, KIf):
+                work.append((BRANCH, operand))
+                work.append((EVALUATE, operand.test))
+            elif isinstance(operand, KLet):
+                if isinstance(operand.name, KLocal):
+                    work.append((EVALUATE, operand.body))
+                    work.append((STORE, operand.name.slot))
+                else:
+                    # The value is interpreted in the enclosing environment,
+                    # so a binding can refer to an outer binding of the same
+                    # symbol.
+                    if work and work[-1][0] != RESTORE:
+                        work.append((RESTORE, env))
+                    work.append((EVALUATE, operand.body))
+                    work.append((BIND, operand.name))
+                work.append((EVALUATE, operand.value))
+            elif isinstance(operand, KScope):
+                if work and work[-1][0] != RESTORE:
+                    work.append((RESTORE, env))
+                work.append((EVALUATE, operand.body))
+                env = KFrame(operand.size, env)
+            elif isinstance(operand, KLambda):
+                push(close(operand, env, interpret_iteratively))
+            elif isinstance(operand, KApply):
+                work.append((APPLY, operand))
+                work.extend([(EVALUATE, argument) for argument in reversed(operand.args)])
+                work.append((EVALUATE, operand.function))
+            elif isinstance(operand, KPrimitive):
+                push(operand)
+            elif not isinstance(operand, KExpression):
+                raise InterpretException("Not a parsed expression: {}".format(operand))
+            else:
+                raise RuntimeError()
+        elif kind == CALL:
+            count = len(operand.args)
+            arguments = tuple(values[len(values) - count:])
+            del values[len(values) - count:]
+            push(operand.builtin.function(arguments))
+        elif kind == BRANCH:
+            if KBoolean(pop()):
+                work.append((EVALUATE, operand.true))
+            else:
+                work.append((EVALUATE, operand.false))
+        elif kind == STORE:
+            env.values[operand] = pop()
+        elif kind == BIND:
+            env = env + KBinding(operand, pop())
+        elif kind == APPLY:
+            count = len(operand.args)
+            arguments = values[len(values) - count:]
+            del values[len(values) - count:]
+            body, inner = enter(pop(), arguments)
+            if work and work[-1][0] != RESTORE:
+                work.append((RESTORE, env))
+            env = inner
+            work.append((EVALUATE, body))
+        else:
+            env = operand
+    return pop()
@@ -0,0 +1,436 @@
+################################################################################
+#
+# kelpc.py
+#
+# This module stores parsed KExpressions on disk in a compact binary format, so
+# that a KL file which has not changed since it was last read can be loaded
+# without being parsed again. Compiled files are kept in a cache directory and
+# named by a hash of the source text and the Kelpy version.
+#
+################################################################################
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+from StringIO import StringIO
+from exceptions import *
+from types import *
+from cache import children
+from reader import parse_stream
+from version import __version__
+
+################################################################################
+# Format
+#
+# A compiled file holds a header, a table of strings, and a list of fixed-size
+# node records. The records describe the expressions in post-order, so that the
+# loader can rebuild them with a stack: each compound node takes its children
+# from the top of the stack, and the top-level expressions are left on the
+# stack at the end.
+####
+
+MAGIC           = 'KELPC\0'
+FORMAT_VERSION  = 3
+EXTENSION       = '.kelpc'
+
+HEADER  = struct.Struct('<6sHH')    # magic, format version, version length
+COUNTS  = struct.Struct('<II')      # string count, node count
+LENGTH  = struct.Struct('<I')
+RECORD  = struct.Struct('<BIII')    # tag, then up to three operands
+
+# Node records.
+NUMBER      = 0     # (string, whether it is the repr of a float)
+SYMBOL      = 1     # (string)
+BOOLEAN     = 2     # (string)
+LIST        = 3     # (child count)
+FUNCTION    = 4     # (child count, function name)
+IF          = 5     # ()
+LET         = 6     # ()
+# Records giving the raw text of the compound node which follows them.
+SPAN        = 7     # (source string, start, end)
+TEXT        = 8     # (string)
+RANGE       = 9     # (start, stop, step), each as a string
+LAMBDA      = 10    # (child count, flags, frame size)
+APPLY       = 11    # (child count)
+# Records of resolved expressions, as held in compiled bytecode.
+LOCAL       = 12    # (symbol string, depth, slot)
+SCOPE       = 13    # (frame size)
+
+# The flags of a lambda record: whether the lambda has a name, and whether it
+# has been resolved. The number of its captures is held in the bits above.
+NAMED       = 1
+RESOLVED    = 2
+CAPTURES    = 2     # The shift of the capture count.
+
+# A computed float has no text of its own, and the `str` of it may round it or
+# not be the text of a number at all (such as '1e+20'), so it is stored by its
+# repr, which gives back the very same float.
+FLOAT       = 1
+
+ATOMS = {NUMBER: KNumber, SYMBOL: KSymbol, BOOLEAN: KBoolean}
+
+def encode(text):
+    if isinstance(text, unicode):
+        return text.encode('utf-8')
+    return str(text)
+
+def stored_children(kexp):
+    """
+    Gets the sub-expressions of a KExpression which are stored as its children:
+    those given by `children`, along with the body of a scope and the captures
+    of a resolved lambda.
+    """
+    if isinstance(kexp, KScope):
+        return (kexp.body,)
+    elif isinstance(kexp, KLambda) and kexp.captures is not None:
+        return children(kexp) + tuple(kexp.captures)
+    return children(kexp)
+
+def dumps(kexps):
+    """
+    Serializes a sequence of KExpressions.
+
+    :param kexps: The KExpressions to serialize.
+    :return: A string in the compiled format.
+    """
+    strings = []
+    indices = {}
+    def string_index(text):
+        text = encode(text)
+        index = indices.get(text)
+        if index is None:
+            index = indices[text] = len(strings)
+            strings.append(text)
+        return index
+    records = []
+    for kexp in kexps:
+        stack = [(kexp, False)]
+        while stack:
+            node, expanded = stack.pop()
+            kids = stored_children(node)
+            if kids and not expanded:
+                stack.append((node, True))
+                stack.extend((kid, False) for kid in reversed(kids))
+                continue
+            if isinstance(node, (KFunctionExpression, KIf, KLet, KLambda, KApply, KScope)):
+                span = node.span
+                if span is not None:
+                    records.append((SPAN, string_index(span.source), span.start, span.end))
+                else:
+                    records.append((TEXT, string_index(node.raw), 0, 0))
+            if isinstance(node, KNumber):
+                if node._raw is None and type(node.value) is float:
+                    records.append((NUMBER, string_index(repr(node.value)), FLOAT, 0))
+                else:
+                    records.append((NUMBER, string_index(node.raw), 0, 0))
+            elif isinstance(node, KSymbol):
+                records.append((SYMBOL, string_index(node.raw), 0, 0))
+            elif isinstance(node, KBoolean):
+                # Booleans made from other values have no text of their own.
+                raw = node.raw if isinstance(node.raw, basestring) else str(node.value)
+                records.append((BOOLEAN, string_index(raw), 0, 0))
+            elif isinstance(node, KRange):
+                stop = node.start + len(node) * node.step
+                records.append((RANGE, string_index(str(node.start)),
+                                string_index(str(stop)), string_index(str(node.step))))
+            elif isinstance(node, KList):
+                records.append((LIST, len(kids), 0, 0))
+            elif isinstance(node, KFunctionExpression):
+                records.append((FUNCTION, len(kids), string_index(node.function), 0))
+            elif isinstance(node, KIf):
+                records.append((IF, 0, 0, 0))
+            elif isinstance(node, KLet):
+                records.append((LET, 0, 0, 0))
+            elif isinstance(node, KLambda):
+                flags = NAMED if node.name is not None else 0
+                if node.captures is not None:
+                    flags |= RESOLVED | (len(node.captures) << CAPTURES)
+                records.append((LAMBDA, len(kids), flags, node.size or 0))
+            elif isinstance(node, KApply):
+                records.append((APPLY, len(kids), 0, 0))
+            elif isinstance(node, KLocal):
+                records.append((LOCAL, string_index(node.raw), node.depth, node.slot))
+            elif isinstance(node, KScope):
+                records.append((SCOPE, node.size, 0, 0))
+            else:
+                raise ImplementationException(
+                    "Cannot compile expression: {}".format(repr(node)))
+    version = encode(__version__)
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, len(version)), version,
+             COUNTS.pack(len(strings), len(records))]
+    for text in strings:
+        parts.append(LENGTH.pack(len(text)))
+        parts.append(text)
+    parts.extend(RECORD.pack(*record) for record in records)
+    return ''.join(parts)
+
+def loads(data, name='<string>'):
+    """
+    Rebuilds the KExpressions serialized in compiled data.
+
+    :param data: A string or buffer, such as an mmap, in the compiled format.
+    :param name: The name of the data's source, used in error messages.
+    :return: A list of the KExpressions.
+    """
+    try:
+        magic, format_version, length = HEADER.unpack_from(data, 0)
+        offset = HEADER.size
+        version = data[offset:offset + length]
+        offset += length
+        if (magic != MAGIC or format_version != FORMAT_VERSION or
+                version != encode(__version__)):
+            raise InvalidCacheFileException(name)
+        string_count, node_count = COUNTS.unpack_from(data, offset)
+        offset += COUNTS.size
+        strings = []
+        for _ in xrange(string_count):
+            length, = LENGTH.unpack_from(data, offset)
+            offset += LENGTH.size
+            strings.append(data[offset:offset + length])
+            offset += length
+        if offset + node_count * RECORD.size != len(data):
+            raise InvalidCacheFileException(name)
+        stack = []
+        raw = None
+        atoms = {}      # Primitives are shared between all nodes of the same text.
+        unpack = RECORD.unpack_from
+        for offset in xrange(offset, len(data), RECORD.size):
+            tag, a, b, c = unpack(data, offset)
+            if tag == SPAN:
+                raw = Span(strings[a], b, c)
+                continue
+            elif tag == TEXT:
+                raw = strings[a]
+                continue
+            elif tag in ATOMS:
+                node = atoms.get((tag, a, b))
+                if node is None:
+                    text = strings[a]
+                    if tag == NUMBER and b == FLOAT:
+                        node = KNumber(float(text))
+                    else:
+                        node = ATOMS[tag](text)
+                    atoms[(tag, a, b)] = node
+            elif tag == RANGE:
+                node = KRange(int(strings[a]), int(strings[b]), int(strings[c]))
+            elif tag == LIST:
+                node = KList(take(stack, a))
+            elif tag == FUNCTION:
+                node = KFunctionExpression(raw, strings[b], *take(stack, a))
+            elif tag == IF:
+                node = KIf(raw, *take(stack, 3))
+            elif tag == LET:
+                node = KLet(raw, *take(stack, 3))
+            elif tag == LAMBDA:
+                kids = take(stack, a)
+                name = kids.pop(0) if b & NAMED else None
+                captures, size = None, None
+                if b & RESOLVED:
+                    count = b >> CAPTURES
+                    captures = tuple(kids[len(kids) - count:])
+                    del kids[len(kids) - count:]
+                    size = c
+                node = KLambda(raw, kids[:-1], kids[-1], name, captures, size)
+            elif tag == APPLY:
+                node = KApply(raw, *take(stack, a))
+            elif tag == LOCAL:
+                node = KLocal(KSymbol(strings[a]), b, c)
+            elif tag == SCOPE:
+                node = KScope(raw, take(stack, 1)[0], a)
+            else:
+                raise InvalidCacheFileException(name)
+            stack.append(node)
+        return stack
+    except (struct.error, IndexError, TypeError, KeyError, ValueError, ParseException):
+        raise InvalidCacheFileException(name)
+
+def take(stack, count):
+    """
+    Removes the top `count` items from a stack, returning them in order.
+    """
+    if count == 0:
+        return []
+    if count > len(stack):
+        raise IndexError(count)
+    items = stack[-count:]
+    del stack[-count:]
+    return items
+
+def dump(kexps, path):
+    """
+    Writes KExpressions to a compiled file. The file is written under a
+    temporary name and then moved into place, so a reader never sees a
+    partially written file.
+    """
+    directory = os.path.dirname(path) or '.'
+    handle, temporary = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(handle, 'wb') as stream:
+            stream.write(dumps(kexps))
+        os.rename(temporary, path)
+    except:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+def load(path, use_mmap=True):
+    """
+    Reads the KExpressions from a compiled file.
+
+    :param path: The path of the compiled file.
+    :param use_mmap: Whether to memory-map the file instead of reading it.
+    :return: A list of the KExpressions.
+    """
+    with open(path, 'rb') as stream:
+        if not use_mmap:
+            return loads(stream.read(), path)
+        try:
+            data = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, mmap.error):
+            # Empty files cannot be mapped.
+            raise InvalidCacheFileException(path)
+        try:
+            return loads(data, path)
+        finally:
+            data.close()
+
+def read_version(path):
+    """
+    Reads the Kelpy version a compiled file was written by.
+
+    :return: The version string, or None if the file is not a compiled file.
+    """
+    with open(path, 'rb') as stream:
+        header = stream.read(HEADER.size)
+        if len(header) != HEADER.size:
+            return None
+        magic, format_version, length = HEADER.unpack(header)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            return None
+        return stream.read(length)
+
+################################################################################
+# CompiledCache
+####
+
+def default_directory():
+    """
+    Finds the directory compiled files are kept in: $KELPY_CACHE_DIR if it is
+    set, and otherwise a 'kelpy' directory in the user's cache directory.
+    """
+    directory = os.environ.get('KELPY_CACHE_DIR')
+    if directory:
+        return directory
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join('~', '.cache')
+    return os.path.join(os.path.expanduser(base), 'kelpy')
+
+class CompiledCache(object):
+    """
+    A directory of compiled files, keyed by the hash of their source text and
+    the Kelpy version.
+    """
+    def __init__(self, directory=None, use_mmap=True):
+        """
+        :param directory: The cache directory, or None for the default.
+        :param use_mmap: Whether compiled files should be memory-mapped when
+            they are loaded.
+        """
+        self.directory  = directory or default_directory()
+        self.use_mmap   = use_mmap
+        self.hits       = 0
+        self.misses     = 0
+    def key(self, text):
+        digest = hashlib.sha1(encode(__version__) + '\0')
+        digest.update(encode(text))
+        return digest.hexdigest()
+    def path_for(self, text):
+        return os.path.join(self.directory, self.key(text) + EXTENSION)
+    def load(self, path):
+        """
+        Gets the expressions in a KL file, loading them from the cache if the
+        file has been compiled before and parsing (and caching) them if not.
+
+        :param path: The path of the KL file.
+        :return: A list of the KExpressions in the file.
+        """
+        with open(path) as stream:
+            text = stream.read()
+        return self.load_text(text)
+    def load_text(self, text):
+        """
+        Gets the expressions in KL text, as `load` does for a file.
+        """
+        compiled = self.path_for(text)
+        if os.path.exists(compiled):
+            try:
+                kexps = load(compiled, self.use_mmap)
+            except InvalidCacheFileException:
+                pass
+            else:
+                self.hits += 1
+                self.touch(compiled)
+                return kexps
+        self.misses += 1
+        kexps = [kexp for kexp, _, _ in parse_stream(StringIO(text))]
+        self.store(compiled, kexps)
+        return kexps
+    def store(self, compiled, kexps):
+        """
+        Writes a compiled file. A cache which cannot be written to is skipped,
+        since the expressions have already been parsed.
+        """
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            dump(kexps, compiled)
+        except (IOError, OSError):
+            pass
+    def touch(self, compiled):
+        try:
+            os.utime(compiled, None)
+        except OSError:
+            pass
+    def warm(self, paths):
+        """
+        Compiles KL files into the cache ahead of time.
+
+        :param paths: The paths of the KL files.
+        :return: The number of files which were not already cached.
+        """
+        misses = self.misses
+        for path in paths:
+            self.load(path)
+        return self.misses - misses
+    def entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.endswith(EXTENSION)]
+    def prune(self, max_age=None):
+        """
+        Removes compiled files written by other versions of Kelpy, or that are
+        not valid compiled files. If `max_age` is given, files which have not
+        been used in that many seconds are removed as well.
+
+        :return: The number of files removed.
+        """
+        now = time.time()
+        removed = 0
+        for compiled in self.entries():
+            try:
+                stale = (read_version(compiled) != encode(__version__) or
+                         (max_age is not None and
+                          now - os.path.getmtime(compiled) > max_age))
+                if stale:
+                    os.remove(compiled)
+                    removed += 1
+            except (IOError, OSError):
+                pass
+        return removed
+    def clear(self):
+        for compiled in self.entries():
+            os.remove(compiled)
@@ -0,0 +1,268 @@
+################################################################################
+#
+# memo.py
+#
+# This module caches the values of pure subtrees as an expression is
+# interpreted. A subtree is pure when it calls only builtin functions which
+# have no side effects, does not call lambdas, and makes only lambdas whose
+# bodies are pure. Its value then depends only on the values of its free
+# symbols, so it is cached under the subtree itself along with those values,
+# and evaluating the same subtree with the same values again takes its value
+# from the cache.
+#
+# Calls of lambdas are never pure, even though KL has no side effects: a body
+# in tail position whose value could be cached would be evaluated by a call of
+# its own, so a long loop of tail calls would run out of Python stack.
+#
+# Only subtrees of at least a minimum number of nodes are cached, since
+# looking up the cache costs more than evaluating a small subtree.
+#
+################################################################################
+
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from exceptions import *
+from types import *
+from interpreter import close, enter
+from cache import estimate_size
+
+def parts(kexp):
+    """
+    Gets the sub-expressions of a KExpression which are evaluated as part of
+    it, or as part of calling it.
+    """
+    if isinstance(kexp, KFunctionExpression):
+        return kexp.args
+    elif isinstance(kexp, KIf):
+        return (kexp.test, kexp.true, kexp.false)
+    elif isinstance(kexp, KLet):
+        return (kexp.value, kexp.body)
+    elif isinstance(kexp, (KScope, KLambda)):
+        return (kexp.body,)
+    elif isinstance(kexp, KApply):
+        return (kexp.function,) + kexp.args
+    return ()
+
+def analyze(kexp, min_cost):
+    """
+    Finds the subtrees of an expression whose values can be cached.
+
+    :param kexp: The KExpression, which may have been resolved.
+    :param min_cost: The fewest nodes a subtree must have to be cached.
+    :return: A dictionary mapping the id of each such subtree to a tuple of the
+        addresses of its free symbols: KSymbols, for symbols looked up by name,
+        and (depth, slot) pairs, for let-bound symbols which have been resolved.
+    """
+    facts = {}      # The (pure, free addresses, cost) of each subtree, by id.
+    cacheable = {}
+    stack = [(kexp, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if id(node) in facts:
+            continue
+        kids = parts(node)
+        if kids and not expanded:
+            stack.append((node, True))
+            stack.extend((kid, False) for kid in kids)
+            continue
+        pure = all(facts[id(kid)][0] for kid in kids)
+        free = frozenset().union(*[facts[id(kid)][1] for kid in kids])
+        cost = 1 + sum(facts[id(kid)][2] for kid in kids)
+        if isinstance(node, KLocal):
+            free = frozenset([(node.depth, node.slot)])
+        elif isinstance(node, KSymbol):
+            free = frozenset([node])
+        elif isinstance(node, KFunctionExpression):
+            pure = pure and node.builtin.pure
+        elif isinstance(node, KLet):
+            value, body = (facts[id(kid)][1] for kid in kids)
+            if isinstance(node.name, KLocal):
+                bound = (node.name.depth, node.name.slot)
+            else:
+                bound = node.name
+            free = value | (body - frozenset([bound]))
+        elif isinstance(node, KScope):
+            # The body's slots are in a frame of its own, one deeper than the
+            # frames around it.
+            free = frozenset(address if isinstance(address, KSymbol)
+                             else (address[0] - 1, address[1])
+                             for address in free
+                             if isinstance(address, KSymbol) or address[0] > 0)
+        elif isinstance(node, KLambda):
+            free = lambda_free(node, free)
+            # Making a closure does not evaluate its body, and costs no more
+            # than looking it up, so lambdas themselves are never cached.
+            cost = 1
+        elif isinstance(node, KApply):
+            pure = False
+        facts[id(node)] = (pure, free, cost)
+        if pure and kids and cost >= min_cost and not isinstance(node, KLambda):
+            cacheable[id(node)] = tuple(free)
+    return cacheable
+
+def lambda_free(klambda, body):
+    """
+    Gets the addresses of the free symbols of a lambda, from those of its body.
+    A resolved lambda's body refers only to its own frame, and the values it
+    needs from outside are those of its captures.
+    """
+    if klambda.captures is not None:
+        return frozenset((capture.depth, capture.slot) if isinstance(capture, KLocal)
+                         else capture
+                         for capture in klambda.captures)
+    bound = list(klambda.params)
+    if klambda.name is not None:
+        bound.append(klambda.name)
+    return body - frozenset(bound)
+
+def value_key(kexp):
+    """
+    Gets a hashable key for a value, which is the same for two values only if
+    they are the same in every way, and not merely equal: the integer 1 and
+    the float 1.0 have different keys.
+    """
+    if isinstance(kexp, KNumber):
+        value = kexp.value
+        if isinstance(value, float):
+            # Distinguishes 0.0 from -0.0.
+            return (float, repr(value))
+        return (type(value), value)
+    elif isinstance(kexp, KBoolean):
+        return (KBoolean, kexp.value)
+    elif isinstance(kexp, KRange):
+        return (KRange, kexp.start, len(kexp), kexp.step)
+    elif isinstance(kexp, KList):
+        return (KList,) + tuple(value_key(item) for item in kexp)
+    return kexp
+
+class Memo(object):
+    """
+    A least-recently-used cache of the values of pure subtrees, keyed by the
+    subtree and the values of its free symbols. A single Memo may be used to
+    interpret any number of expressions, from any number of threads at once.
+    """
+    def __init__(self, max_entries=4096, max_bytes=None, min_cost=8):
+        """
+        :param max_entries: The most values to keep.
+        :param max_bytes: The approximate memory budget for the cached values
+            and their keys, or None for no budget.
+        :param min_cost: The fewest nodes a subtree must have for its value to
+            be cached.
+        """
+        self.max_entries    = max_entries
+        self.max_bytes      = max_bytes
+        self.min_cost       = min_cost
+        self.entries        = OrderedDict()
+        self.analyses       = weakref.WeakKeyDictionary()
+        self.size           = 0
+        self.hits           = 0
+        self.misses         = 0
+        self.lock           = threading.Lock()
+    def __len__(self):
+        return len(self.entries)
+    def __repr__(self):
+        return "<memo: {hits} hits, {misses} misses>".format(
+            hits=self.hits, misses=self.misses)
+    def interpret(self, kexp, env):
+        """
+        Interprets an expression as `interpret` does, taking the values of its
+        pure subtrees from the cache where it can, and caching those it has to
+        work out.
+
+        :param kexp: The KExpression, which may have been resolved.
+        :param env: The environment to interpret it in.
+        :return: The value of the expression.
+        """
+        with self.lock:
+            cacheable = self.analyses.get(kexp)
+            if cacheable is None:
+                cacheable = self.analyses[kexp] = analyze(kexp, self.min_cost)
+        return self.evaluate(kexp, env, cacheable)
+    def evaluate(self, kexp, env, cacheable):
+        free = cacheable.get(id(kexp))
+        if free is None:
+            return self.evaluate_node(kexp, env, cacheable)
+        key = (kexp,) + tuple(value_key(fetch(address, env)) for address in free)
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.hits += 1
+                self.entries[key] = entry
+                return entry[0]
+            self.misses += 1
+        value = self.evaluate_node(kexp, env, cacheable)
+        size = sys.getsizeof(key) + estimate_size(value)
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = (value, size)
+                self.size += size
+                self.evict()
+        return value
+    def evaluate_node(self, kexp, env, cacheable):
+        """
+        Evaluates a node in the way `interpret` does, with each part evaluated
+        through the cache. Parts in tail position are evaluated by the same
+        call unless their values are to be cached.
+        """
+        evaluate = self.evaluate
+        while True:
+            if isinstance(kexp, KLocal):
+                return env.fetch(kexp.depth, kexp.slot)
+            elif isinstance(kexp, KSymbol):
+                return lookup(kexp, env)
+            elif isinstance(kexp, KFunctionExpression):
+                return kexp.builtin.function(
+                    tuple([evaluate(argument, env, cacheable) for argument in kexp.args]))
+            elif isinstance(kexp, KIf):
+                if KBoolean(evaluate(kexp.test, env, cacheable)):
+                    kexp = kexp.true
+                else:
+                    kexp = kexp.false
+            elif isinstance(kexp, KLet) and isinstance(kexp.name, KLocal):
+                env.values[kexp.name.slot] = evaluate(kexp.value, env, cacheable)
+                kexp = kexp.body
+            elif isinstance(kexp, KLet):
+                env = env + KBinding(kexp.name, evaluate(kexp.value, env, cacheable))
+                kexp = kexp.body
+            elif isinstance(kexp, KScope):
+                env = KFrame(kexp.size, env)
+                kexp = kexp.body
+            elif isinstance(kexp, KLambda):
+                # Calls of the closure by builtins such as `map` are evaluated
+                # through the cache as well.
+                return close(kexp, env, lambda body, env: evaluate(body, env, cacheable))
+            elif isinstance(kexp, KApply):
+                closure = evaluate(kexp.function, env, cacheable)
+                arguments = [evaluate(argument, env, cacheable) for argument in kexp.args]
+                kexp, env = enter(closure, arguments)
+            elif isinstance(kexp, KPrimitive):
+                return kexp
+            elif not isinstance(kexp, KExpression):
+                raise InterpretException("Not a parsed expression: {}".format(kexp))
+            else:
+                raise RuntimeError()
+            if id(kexp) in cacheable:
+                return evaluate(kexp, env, cacheable)
+    def evict(self):
+        """
+        Discards the least recently used entries until the cache is within its
+        limits. The most recent entry is always kept.
+        """
+        while len(self.entries) > 1 and (
+                len(self.entries) > self.max_entries or
+                (self.max_bytes is not None and self.size > self.max_bytes)):
+            _, (_, size) = self.entries.popitem(last=False)
+            self.size -= size
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+
+def fetch(address, env):
+    if isinstance(address, KSymbol):
+        return lookup(address, env)
+    return env.fetch(*address)
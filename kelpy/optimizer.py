@@ -0,0 +1,191 @@
+################################################################################
+#
+# optimizer.py
+#
+# This module simplifies parsed expressions before they are evaluated. It
+# works out ahead of time everything which does not depend on the environment:
+#   - calls of builtin functions whose arguments are all constants are folded
+#     into their results,
+#   - ifs whose tests are constants are replaced with the branch taken, and
+#   - lets binding constants are removed, with the constant put in place of
+#     each reference to the symbol.
+#
+# Only calls of builtins declared pure are folded, so folding a call never
+# changes what an expression means. A call which the builtin's arity or
+# argument types rule out is not attempted, and one which fails anyway is left
+# for evaluation to report.
+#
+################################################################################
+
+from exceptions import *
+from types import *
+from hamt import HashMap
+
+def is_constant(kexp):
+    """
+    Determines whether an expression is a constant: a primitive other than a
+    symbol, which evaluates to itself.
+    """
+    return isinstance(kexp, KPrimitive) and not isinstance(kexp, KSymbol)
+
+def foldable(builtin, args):
+    """
+    Determines whether a call of a builtin on constant arguments can be folded,
+    going by what the builtin declares: it must be pure, and accept as many
+    arguments as it is given, of their types.
+    """
+    if not builtin.pure or not builtin.accepts(len(args)):
+        return False
+    types = builtin.argument_types
+    return types is None or all(arg.type in types for arg in args)
+
+def optimize(kexp):
+    """
+    Simplifies an expression which has not been resolved.
+
+    :param kexp: The KExpression to optimize.
+    :return: A tuple of the optimized KExpression and the number of nodes
+        which were eliminated from it. Subtrees which could not be simplified
+        are shared with the original expression, which is left unchanged.
+    """
+    optimized = simplify(kexp)
+    return optimized, count_nodes(kexp) - count_nodes(optimized)
+
+def simplify(kexp):
+    """
+    Simplifies an expression without recursion. The work stack holds nodes to
+    visit along with continuations which combine the simplified children left
+    on the result stack.
+    """
+    results = []
+    work = [(visit, kexp, HashMap())]
+    while work:
+        task = work.pop()
+        task[0](task, work, results)
+    return results.pop()
+
+def visit(task, work, results):
+    _, kexp, constants = task
+    if isinstance(kexp, KSymbol):
+        constant = constants.get(kexp)
+        results.append(kexp if constant is None else constant)
+    elif isinstance(kexp, KFunctionExpression):
+        work.append((finish_function, kexp))
+        work.extend((visit, arg, constants) for arg in reversed(kexp.args))
+    elif isinstance(kexp, KIf):
+        work.append((choose_branch, kexp, constants))
+        work.append((visit, kexp.test, constants))
+    elif isinstance(kexp, KLet):
+        work.append((bind_value, kexp, constants))
+        work.append((visit, kexp.value, constants))
+    elif isinstance(kexp, KLambda):
+        # The parameters hide any constants bound to the same symbols.
+        inner = constants
+        for name in kexp.params + ((kexp.name,) if kexp.name is not None else ()):
+            inner = inner.set(name, None)
+        work.append((finish_lambda, kexp))
+        work.append((visit, kexp.body, inner))
+    elif isinstance(kexp, KApply):
+        work.append((finish_apply, kexp))
+        work.extend((visit, kid, constants) for kid in reversed((kexp.function,) + kexp.args))
+    else:
+        results.append(kexp)
+
+def finish_function(task, work, results):
+    _, kexp = task
+    count = len(kexp.args)
+    args = results[len(results) - count:]
+    del results[len(results) - count:]
+    if all(is_constant(arg) for arg in args) and foldable(kexp.builtin, args):
+        try:
+            results.append(kexp.builtin.function(tuple(args)))
+            return
+        except Exception:
+            # The call fails, so it is left for evaluation to report (if the
+            # expression is evaluated at all).
+            pass
+    if all(new is old for new, old in zip(args, kexp.args)):
+        results.append(kexp)
+    else:
+        results.append(KFunctionExpression(kexp.span or kexp.raw, kexp.function, *args))
+
+def choose_branch(task, work, results):
+    _, kexp, constants = task
+    test = results.pop()
+    if is_constant(test):
+        branch = kexp.true if KBoolean(test) else kexp.false
+        work.append((visit, branch, constants))
+        return
+    work.append((finish_if, kexp, test))
+    work.append((visit, kexp.false, constants))
+    work.append((visit, kexp.true, constants))
+
+def finish_if(task, work, results):
+    _, kexp, test = task
+    false = results.pop()
+    true = results.pop()
+    if test is kexp.test and true is kexp.true and false is kexp.false:
+        results.append(kexp)
+    else:
+        results.append(KIf(kexp.span or kexp.raw, test, true, false))
+
+def bind_value(task, work, results):
+    _, kexp, constants = task
+    value = results.pop()
+    if is_constant(value):
+        work.append((visit, kexp.body, constants.set(kexp.name, value)))
+        return
+    # The binding hides any constant bound to the same symbol outside it.
+    work.append((finish_let, kexp, value))
+    work.append((visit, kexp.body, constants.set(kexp.name, None)))
+
+def finish_let(task, work, results):
+    _, kexp, value = task
+    body = results.pop()
+    if value is kexp.value and body is kexp.body:
+        results.append(kexp)
+    else:
+        results.append(KLet(kexp.span or kexp.raw, kexp.name, value, body))
+
+def finish_lambda(task, work, results):
+    _, kexp = task
+    body = results.pop()
+    if body is kexp.body:
+        results.append(kexp)
+    else:
+        results.append(KLambda(kexp.span or kexp.raw, kexp.params, body, kexp.name))
+
+def finish_apply(task, work, results):
+    _, kexp = task
+    count = len(kexp.args) + 1
+    kids = results[len(results) - count:]
+    del results[len(results) - count:]
+    if all(new is old for new, old in zip(kids, (kexp.function,) + kexp.args)):
+        results.append(kexp)
+    else:
+        results.append(KApply(kexp.span or kexp.raw, *kids))
+
+def count_nodes(kexp):
+    """
+    Counts the nodes of an expression. Primitives, including lists, count as
+    single nodes.
+    """
+    count = 0
+    stack = [kexp]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if isinstance(node, KFunctionExpression):
+            stack.extend(node.args)
+        elif isinstance(node, KIf):
+            stack.extend((node.test, node.true, node.false))
+        elif isinstance(node, KLet):
+            stack.extend((node.name, node.value, node.body))
+        elif isinstance(node, KLambda):
+            stack.extend(node.params + (node.body,))
+            if node.name is not None:
+                stack.append(node.name)
+        elif isinstance(node, KApply):
+            stack.append(node.function)
+            stack.extend(node.args)
+    return count
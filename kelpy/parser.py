@@ -1,95 +1,93 @@
 from exceptions import *
 from types import *
-from functions import FUNCTION_MAP
+from functions import BUILTINS
+from tokenizer import tokenize, Token, OPEN, CLOSE
+from forms import FORM_MAP, Group, expression
 
 def parse(text):
-    # Strip the text of extra whitespace.
-    text = text.strip()
-    # Now ensure the braces are balanced (if there are any).
-    #TODO: Replace this with an auto-indent form.
-    if text.count('{') != text.count('}'):
-        raise UnbalancedBracesException(text)
-    # Begin parsing for KExpressions.
-    if kexp_match("NUMBER", text):
-        return KNumber(text)
-    elif kexp_match("SYMBOL", text):
-        return KSymbol(text)
-    elif kexp_match("BOOLEAN", text):
-        return KBoolean(text)
-    elif kexp_match("empty", text):
-        return KList()
-    elif kexp_match("{list}", text):
-        return KList()
-    elif kexp_match("{list NUMBER -> NUMBER}", text):
-        parses  = kexp_to_list(text)
-        low     = parse(parses[1])
-        high    = parse(parses[3])
-        if not low.integer or not high.integer:
-            raise ParseException("Bad exclusive list definition.")
-        values = [KNumber(x) for x in xrange(low.value, high.value)]
-        return KList(*values)
-    elif kexp_match("{list NUMBER => NUMBER}", text):
-        parses  = kexp_to_list(text)
-        low     = parse(parses[1])
-        high    = parse(parses[3])
-        if not low.integer or not high.integer:
-            raise ParseException("Bad inclusive list definition.")
-        values = [KNumber(x) for x in xrange(low.value, high.value + 1)]
-        return KList(*values)
-    elif kexp_match("{list ANY ...}", text):
-        parses = kexp_to_list(text)
-        return KList([parse(part) for part in parses[1:]])
-    elif kexp_match("{empty? ANY}", text):
-        parses = kexp_to_list(text)
-        return KBoolean(parse(parses[1]) == KList())
-    elif kexp_match("{first ANY}", text):
-        parses = kexp_to_list(text)
-        return first(parse(parses[1]))
-    elif kexp_match("{second ANY}", text):
-        parses = kexp_to_list(text)
-        return first(rest(parse(parses[1])))
-    elif kexp_match("{rest ANY}", text):
-        parses = kexp_to_list(text)
-        return rest(parse(parses[1]))
-    elif kexp_match("{reverse ANY}", text):
-        parses = kexp_to_list(text)
-        return reverse(parse(parses[1]))
-    elif kexp_match("{prepend ANY ANY}", text):
-        parses = kexp_to_list(text)
-        return prepend(
-            parse(parses[1]),
-            parse(parses[2])
-        )
-    elif kexp_match("{append ANY ANY}", text):
-        parses = kexp_to_list(text)
-        return append(
-            parse(parses[1]),
-            parse(parses[2])
-        )
-    elif kexp_match("{if ANY ANY ANY}", text):
-        parses = kexp_to_list(text)
-        return KIf(
-            text,
-            parse(parses[1]),
-            parse(parses[2]),
-            parse(parses[3])
-        )
-    elif kexp_match("{let {SYMBOL ANY} ANY}", text):
-        parses = kexp_to_list(text)
-        interior = kexp_to_list(parses[1])
-        return KLet(
-            text,
-            parse(interior[0]),
-            parse(interior[1]),
-            parse(parses[2])
-        )
-    elif kexp_match("{FUNCTION ANY ...}", text):
-        parses = kexp_to_list(text)
-        f = parses[0] # Don't parse this. It won't go well.
-        args = [parse(arg) for arg in parses[1:]]
-        return KFunctionExpression(text, f, *args)
-    else:
-        raise ParseException("Invalid input.")
+    """
+    Parses a single KExpression from text.
+
+    The text is tokenized once, and the tree is then built bottom-up as each
+    closing brace is reached. An explicit stack of open groups is used instead
+    of recursion, so deeply nested expressions cannot exhaust the Python stack.
+    Expressions refer to their raw text by a Span of `text`, so no part of the
+    text is copied for them.
+
+    :param text: The raw text to parse.
+    :return: The KExpression described by the text.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        raise NoExpressionException(text, 0)
+    # Each open group is kept as (offset, items, raw), where `raw` denotes that
+    # the group is syntax to be handed to its parent as a Group.
+    stack = []
+    for index, token in enumerate(tokens):
+        if token.kind == OPEN:
+            stack.append((token.offset, [], is_binding_position(stack)))
+            continue
+        elif token.kind == CLOSE:
+            offset, items, raw = stack.pop()
+            if raw:
+                node = Group(items, offset)
+            else:
+                node = build(items, Span(text, offset, token.offset + 1), offset)
+        else:
+            node = token
+        if stack:
+            stack[-1][1].append(node)
+            continue
+        # A complete top-level expression has been read.
+        if index != len(tokens) - 1:
+            extra = tokens[index + 1]
+            raise SuperfluousDataException(text[extra.offset:], extra.offset)
+        return expression(node)
+
+def is_binding_position(stack):
+    """
+    Determines whether a group opened now would be a binding of the form
+    enclosing it, such as the `{'x 3}` in `{let {'x 3} 'x}`.
+
+    :param stack: The parser's stack of open groups.
+    :return: A boolean describing whether the new group should be left unbuilt.
+    """
+    if not stack:
+        return False
+    items = stack[-1][1]
+    if not items or not isinstance(items[0], Token):
+        return False
+    form = FORM_MAP.get(items[0].text)
+    return form is not None and (len(items) - 1) in form.bindings
+
+def build(items, raw, offset):
+    """
+    Builds the KExpression for a complete brace group. The form is found with
+    a single lookup of the group's leading keyword in FORM_MAP.
+
+    :param items: The items within the braces. Nested groups have already been
+        built, while atoms are still Tokens.
+    :param raw: The Span of the group's text, including its braces.
+    :param offset: The offset of the group's opening brace.
+    :return: The KExpression described by the group.
+    """
+    if not items:
+        raise NoArgumentsException(raw, offset)
+    head = items[0]
+    if not isinstance(head, Token):
+        raise FunctionlessExpressionException(raw, offset)
+    form = FORM_MAP.get(head.text)
+    if form is None:
+        raise InvalidFunctionException(head.text, head.offset)
+    return form.build(items[1:], raw, offset)
+
+################################################################################
+# Template matching
+#
+# The helpers below match KL text against symbolic templates such as
+# "{if ANY ANY ANY}". `parse` no longer uses them, but they are kept for code
+# that wants to test text against a template.
+####
 
 def get_text_through_matching_brace(text):
     """
@@ -333,7 +331,7 @@ def type_match(symbol, literal):
         except ParseException:
             return False
     elif symbol == 'FUNCTION':
-        if literal in FUNCTION_MAP:
+        if literal in BUILTINS:
             return True
         else:
             return False
@@ -0,0 +1,115 @@
+################################################################################
+#
+# reader.py
+#
+# This module reads a sequence of top-level KL expressions from a file or
+# stream. Input is consumed in chunks, and only the text of the expression
+# currently being read is held in memory.
+#
+################################################################################
+
+import re
+from exceptions import UnbalancedBracesException
+from parser import parse
+
+NONSPACE_PATTERN = re.compile(r"\S")
+BRACE_PATTERN    = re.compile(r"[{}]")
+ATOM_END_PATTERN = re.compile(r"[{}\s]")
+
+class Position(object):
+    """
+    Tracks the line and column reached in a stream as its chunks are read.
+    Lines and columns both count from 1.
+    """
+    def __init__(self):
+        self.offset = 0
+        self.line   = 1
+        self.column = 1
+    def advance(self, chunk, start, end):
+        """
+        Moves the position over chunk[start:end].
+        """
+        newlines = chunk.count('\n', start, end)
+        if newlines:
+            self.line  += newlines
+            self.column = end - chunk.rfind('\n', start, end)
+        else:
+            self.column += end - start
+        self.offset += end - start
+
+def parse_stream(stream, chunk_size=8192):
+    """
+    Parses each top-level KExpression in a stream as soon as it is complete.
+
+    :param stream: A file-like object with a `read` method, such as an open
+        file or `sys.stdin`.
+    :param chunk_size: The number of characters to read at a time.
+    :return: A generator of (kexp, line, column) tuples, where the line and
+        column give the position of the expression's first character.
+    """
+    position = Position()
+    pieces   = []       # The text read so far of the current expression.
+    depth    = 0        # The brace depth within the current expression.
+    start    = None     # The (offset, line, column) of the current expression.
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        length  = len(chunk)
+        index   = 0
+        mark    = 0     # The index in the chunk that `position` describes.
+        segment = 0     # The index in the chunk of the current expression.
+        while index < length:
+            if start is None:
+                # Between expressions: skip ahead to the next one.
+                match = NONSPACE_PATTERN.search(chunk, index)
+                if match is None:
+                    break
+                index = match.start()
+                position.advance(chunk, mark, index)
+                mark = index
+                if chunk[index] == '}':
+                    raise UnbalancedBracesException(chunk[index:], position.offset)
+                start   = (position.offset, position.line, position.column)
+                segment = index
+                if chunk[index] == '{':
+                    depth = 1
+                    index += 1
+                continue
+            elif depth > 0:
+                # Within braces: the expression ends at the matching brace.
+                end = None
+                for match in BRACE_PATTERN.finditer(chunk, index):
+                    if match.group() == '{':
+                        depth += 1
+                    else:
+                        depth -= 1
+                    if depth == 0:
+                        end = match.end()
+                        break
+                if end is None:
+                    break
+            else:
+                # A bare atom ends at whitespace or a brace, unless it is the
+                # quote mark of a quoted brace symbol such as "'{a b}".
+                match = ATOM_END_PATTERN.search(chunk, index)
+                if match is None:
+                    break
+                end = match.start()
+                if chunk[end] == '{' and ''.join(pieces) + chunk[segment:end] == "'":
+                    depth = 1
+                    index = end + 1
+                    continue
+            pieces.append(chunk[segment:end])
+            yield parse(''.join(pieces)), start[1], start[2]
+            pieces = []
+            start  = None
+            index  = end
+        if start is not None:
+            # The current expression continues into the next chunk.
+            pieces.append(chunk[segment:])
+        position.advance(chunk, mark, length)
+    if start is not None:
+        if depth > 0:
+            raise UnbalancedBracesException(''.join(pieces), start[0])
+        yield parse(''.join(pieces)), start[1], start[2]
@@ -0,0 +1,158 @@
+################################################################################
+#
+# resolver.py
+#
+# This module resolves the symbols of a parsed expression before it is
+# interpreted. Each reference to a let-bound symbol is replaced with a KLocal
+# giving the slot the symbol's value will be held in, so that the interpreter
+# can fetch it by index instead of searching an environment by name. Symbols
+# which are bound nowhere are reported here, before anything is evaluated.
+#
+################################################################################
+
+from exceptions import *
+from types import *
+from hamt import HashMap
+from cache import children, rebuild
+
+def resolve(kexp, env=empty_env):
+    """
+    Resolves the symbols of an expression.
+
+    Every let in the expression is given a slot of a single frame. Lets which
+    are nested within one another get different slots, while lets side by side
+    reuse the same ones, so the frame is only as large as the lets are deep.
+    The body of each lambda is resolved to a frame of its own instead, which
+    is made each time the lambda is called.
+
+    :param kexp: The KExpression to resolve.
+    :param env: The environment the expression will be interpreted in. Symbols
+        bound in it, and not by a let, are left to be looked up by name. Any
+        container of the symbols which will be bound may be given instead.
+    :return: An equivalent KExpression to be interpreted in `env`. If the
+        expression has lets, this is a KScope; otherwise the expression is
+        returned unchanged.
+    """
+    scope = Scope(env)
+    body = scope.resolve(kexp, HashMap(), 0)
+    if scope.size == 0:
+        return body
+    return KScope(kexp.span or kexp.raw, body, scope.size)
+
+def free_symbols(kexp):
+    """
+    Finds the symbols an expression refers to without binding them in a let,
+    which must be bound in the environment it is interpreted in.
+
+    :param kexp: A KExpression, which has not been resolved.
+    :return: A frozenset of the KSymbols.
+    """
+    free = set()
+    stack = [(kexp, HashMap())]
+    while stack:
+        node, bound = stack.pop()
+        if isinstance(node, KSymbol):
+            if node not in bound:
+                free.add(node)
+        elif isinstance(node, KLet):
+            stack.append((node.value, bound))
+            stack.append((node.body, bound.set(node.name, True)))
+        elif isinstance(node, KLambda):
+            for name in children(node)[:-1]:
+                bound = bound.set(name, True)
+            stack.append((node.body, bound))
+        elif not isinstance(node, KPrimitive):
+            stack.extend((kid, bound) for kid in children(node))
+    return frozenset(free)
+
+# The kinds of task on the work stack of Scope.resolve.
+VISIT       = 0     # Resolves an expression, leaving it on the result stack.
+REBUILD     = 1     # Rebuilds a node from its resolved children.
+FINISH_LET  = 2     # Rebuilds a let from its resolved value and body.
+
+class Scope(object):
+    """
+    The state of resolving a single KScope.
+    """
+    def __init__(self, env):
+        self.env    = env
+        self.size   = 0
+    def resolve(self, kexp, slots, level):
+        """
+        Resolves an expression without recursion, so that it can be nested as
+        deeply as you like. The work stack holds expressions to visit along
+        with the nodes waiting to be rebuilt from their resolved children, which
+        are left on the result stack.
+
+        :param kexp: The KExpression to resolve.
+        :param slots: A HashMap of the slots of the let-bound symbols in scope.
+        :param level: The number of lets enclosing the expression, which is the
+            first free slot.
+        :return: The resolved KExpression.
+        """
+        results = []
+        work = [(VISIT, kexp, slots, level)]
+        while work:
+            task, kexp, slots, level = work.pop()
+            if task == REBUILD:
+                kids = children(kexp)
+                resolved = results[len(results) - len(kids):]
+                del results[len(results) - len(kids):]
+                if all(new is old for new, old in zip(resolved, kids)):
+                    results.append(kexp)
+                else:
+                    results.append(rebuild(kexp, resolved))
+            elif task == FINISH_LET:
+                body = results.pop()
+                value = results.pop()
+                results.append(KLet(kexp.span or kexp.raw, KLocal(kexp.name, 0, level), value, body))
+            elif isinstance(kexp, KSymbol):
+                results.append(self.address(kexp, slots))
+            elif isinstance(kexp, KLet):
+                # The value is outside the scope of its own binding.
+                self.size = max(self.size, level + 1)
+                work.append((FINISH_LET, kexp, None, level))
+                work.append((VISIT, kexp.body, slots.set(kexp.name, level), level + 1))
+                work.append((VISIT, kexp.value, slots, level))
+            elif isinstance(kexp, KLambda):
+                results.append(self.resolve_lambda(kexp, slots))
+            elif isinstance(kexp, KPrimitive):
+                # The symbols within lists are data rather than references.
+                results.append(kexp)
+            else:
+                kids = children(kexp)
+                work.append((REBUILD, kexp, None, level))
+                work.extend((VISIT, kid, slots, level) for kid in reversed(kids))
+        return results.pop()
+    def address(self, symbol, slots):
+        """
+        :return: The KLocal of a let-bound symbol, or the symbol itself if it
+            is bound in the environment instead.
+        """
+        slot = slots.get(symbol)
+        if slot is not None:
+            return KLocal(symbol, 0, slot)
+        elif symbol not in self.env:
+            raise UnboundSymbolException(symbol)
+        return symbol
+    def resolve_lambda(self, klambda, slots):
+        """
+        Resolves a lambda into a flat closure: its free symbols are captured
+        by value when it is evaluated, so its body is resolved in a scope of
+        its own, holding nothing from outside but those values. Lambdas are
+        resolved recursively, so only their nesting within one another (and
+        not that of other expressions) is limited by the Python stack.
+        """
+        free = sorted(free_symbols(klambda), key=lambda symbol: symbol.raw)
+        captures = tuple(self.address(symbol, slots) for symbol in free)
+        names = list(klambda.params)
+        if klambda.name is not None:
+            names.append(klambda.name)
+        inner = Scope(empty_env)
+        inner_slots = HashMap()
+        for slot, symbol in enumerate(names + free):
+            inner_slots = inner_slots.set(symbol, slot)
+        inner.size = len(names) + len(free)
+        body = inner.resolve(klambda.body, inner_slots, inner.size)
+        return KLambda(klambda.span or klambda.raw, klambda.params, body,
+                       klambda.name, captures, inner.size)
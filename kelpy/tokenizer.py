@@ -0,0 +1,88 @@
+################################################################################
+#
+# tokenizer.py
+#
+# This module splits KL text into tokens in a single pass. The parser builds
+# its KExpressions from these tokens instead of re-slicing the text.
+#
+################################################################################
+
+import re
+from collections import namedtuple
+from exceptions import UnbalancedBracesException
+
+################################################################################
+# Token
+#   - a single lexical element of KL text
+####
+
+OPEN  = 'open'
+CLOSE = 'close'
+ATOM  = 'atom'
+
+Token = namedtuple('Token', ['kind', 'text', 'offset'])
+
+# Matches the next token after any whitespace. The groups are, in order: an
+# opening brace, a closing brace, the start of a quoted brace symbol (such as
+# "'{long symbol}"), and any other run of non-brace, non-space characters.
+TOKEN_PATTERN = re.compile(r"\s*(?:(\{)|(\})|('\{)|([^\s{}]+))")
+BRACE_PATTERN = re.compile(r"[{}]")
+
+def tokenize(text):
+    """
+    Converts a raw text string into a list of tokens. Braces are checked for
+    balance along the way, so a successful return guarantees that every OPEN
+    token has a matching CLOSE token.
+
+    :param text: The raw text to be converted.
+    :return: A list of Tokens, each holding its kind, text, and the offset of
+        its first character within `text`.
+    """
+    tokens = []
+    opened = []
+    index  = 0
+    length = len(text)
+    while index < length:
+        match = TOKEN_PATTERN.match(text, index)
+        if match is None or match.lastindex is None:
+            # Only trailing whitespace remains.
+            break
+        offset = match.start(match.lastindex)
+        if match.lastindex == 1:
+            opened.append(offset)
+            tokens.append(Token(OPEN, '{', offset))
+        elif match.lastindex == 2:
+            if not opened:
+                raise UnbalancedBracesException(text[offset:], offset)
+            opened.pop()
+            tokens.append(Token(CLOSE, '}', offset))
+        elif match.lastindex == 3:
+            end = find_matching_brace(text, offset + 1)
+            tokens.append(Token(ATOM, text[offset:end], offset))
+            index = end
+            continue
+        else:
+            tokens.append(Token(ATOM, match.group(4), offset))
+        index = match.end()
+    if opened:
+        raise UnbalancedBracesException(text[opened[-1]:], opened[-1])
+    return tokens
+
+def find_matching_brace(text, offset):
+    """
+    Finds the end of the brace group opening at the given offset.
+
+    :param text: A raw string of text.
+    :param offset: The offset of an opening curly brace within `text`.
+    :return: The offset just past the matching closing curly brace. If no
+        matching curly brace is found, raises an UnbalancedBracesException.
+    """
+    count = 0
+    for match in BRACE_PATTERN.finditer(text, offset):
+        if match.group() == '{':
+            count += 1
+        else:
+            count -= 1
+        if count == 0:
+            return match.end()
+    raise UnbalancedBracesException(text[offset:], offset)
@@ -6,8 +6,32 @@
 ################################################################################
 
 import re
+from fractions import Fraction
+from itertools import islice, izip
 from exceptions import *
-from functions import FUNCTION_MAP
+from functions import builtin_for
+from hamt import HashMap
+
+################################################################################
+# Span
+#   - a region of the source text an expression was parsed from
+####
+
+class Span(object):
+    """
+    Refers to the text between two offsets of a source string. The expressions
+    parsed from a text all share that text through their Spans, rather than
+    each keeping a copy of their own part of it.
+    """
+    __slots__ = ('source', 'start', 'end')
+    def __init__(self, source, start, end):
+        self.source = source
+        self.start  = start
+        self.end    = end
+    def __repr__(self):
+        return "<span: {start}-{end}>".format(start=self.start, end=self.end)
+    def __str__(self):
+        return self.source[self.start:self.end]
 
 ################################################################################
 # KExpression
@@ -15,9 +39,32 @@ from functions import FUNCTION_MAP
 ####
 
 class KExpression(object):
+    # Every KExpression class lists its attributes in __slots__, so that nodes
+    # carry no __dict__. The `type` of most classes is a class attribute.
+    __slots__   = ('_raw', '__weakref__')
+    type        = "kexp"
     def __init__(self, raw):
         self.raw = raw
-        self.type = "kexp"
+    @property
+    def raw(self):
+        """
+        The raw text of the expression. For expressions parsed from a larger
+        text, this is only sliced out of the source when it is asked for.
+        """
+        if isinstance(self._raw, Span):
+            return str(self._raw)
+        return self._raw
+    @raw.setter
+    def raw(self, raw):
+        self._raw = raw
+    @property
+    def span(self):
+        """
+        The Span of source text the expression was parsed from, or None.
+        """
+        if isinstance(self._raw, Span):
+            return self._raw
+        return None
     def __repr__(self):
         return "<expr: {raw}>".format(raw=self.raw)
     def __str__(self):
@@ -29,11 +76,17 @@ class KExpression(object):
 ####
 
 class KFunctionExpression(KExpression):
+    """
+    A call of a builtin function. The function's Builtin is looked up once,
+    when the expression is made, rather than by name on every call.
+    """
+    __slots__ = ('function', 'builtin', 'args', 'type')
     def __init__(self, raw, function, *args):
         self.raw        = raw
         self.function   = function
+        self.builtin    = builtin_for(function)
         self.args       = args
-        self.type       = "KF{}".format(FUNCTION_MAP[self.function][0])
+        self.type       = "KF{}".format(self.builtin.title)
     def __repr__(self):
         return "<{type}: {raw}>".format(type=self.type, raw=self.raw)
     def __str__(self):
@@ -47,34 +100,77 @@ class KFunctionExpression(KExpression):
 ####
 
 class KPrimitive(KExpression):
+    __slots__ = ()
     def __init__(self, raw):
         raise RawPrimitiveException(raw)
 
+# The interned KSymbols, by their raw text.
+SYMBOL_TABLE = {}
+
 class KSymbol(KPrimitive):
+    """
+    A symbol. Symbols are interned: every KSymbol made from the same text is
+    the same object, so symbols are compared by identity.
+    """
+    __slots__   = ()
+    type        = "symbol"
+    def __new__(cls, raw):
+        symbol = SYMBOL_TABLE.get(raw)
+        if symbol is None:
+            if not raw[0] == "'":
+                raise InvalidSymbolException(raw)
+            symbol = KExpression.__new__(cls)
+            symbol._raw = raw
+            # If another thread interned the same text first, use its symbol.
+            symbol = SYMBOL_TABLE.setdefault(raw, symbol)
+        return symbol
     def __init__(self, raw):
-        if not raw[0] == "'":
-            raise InvalidSymbolException(raw)
-        self.raw = raw
-        self.type = "symbol"
+        pass
     def __repr__(self):
         return "<sym: {raw}>".format(raw=self.raw)
     def __str__(self):
         return "{raw}".format(raw=self.raw)
     def __eq__(self, other):
-        return self.raw == other.raw
+        return self is other
+    def __ne__(self, other):
+        return self is not other
+    def __hash__(self):
+        # The hash of the text is spread more evenly than the object's address,
+        # which keeps the HashMaps of environments shallow.
+        return hash(self._raw)
+
+# The spellings of booleans, by their value.
+BOOLEAN_TEXTS = {'true': True, '#t': True, 'false': False, '#f': False}
 
 class KBoolean(KPrimitive):
-    def __init__(self, raw):
-        if str(raw).lower() in ('true', '#t'):
-            self.value = True
-        elif str(raw).lower() in ('false', '#f'):
-            self.value = False
+    """
+    A boolean. There are only two KBooleans, KBoolean.TRUE and KBoolean.FALSE,
+    so booleans are compared by identity. A boolean made from text is one of
+    them whatever its spelling, which is kept in the text of the expression
+    around it; on its own, each is written '#t' or '#f'.
+    """
+    __slots__   = ('value',)
+    type        = "boolean"
+    def __new__(cls, raw):
+        if isinstance(raw, basestring):
+            try:
+                value = BOOLEAN_TEXTS[raw.lower()]
+            except KeyError:
+                raise InvalidBooleanException(raw)
+            return KBoolean.TRUE if value else KBoolean.FALSE
+        elif raw is True or raw is False:
+            return KBoolean.TRUE if raw else KBoolean.FALSE
         elif isinstance(raw, KExpression):
-            self.value = bool(raw)
-        else:
-            raise InvalidBooleanException(raw)
-        self.raw = raw
-        self.type = "boolean"
+            return KBoolean.TRUE if raw else KBoolean.FALSE
+        raise InvalidBooleanException(raw)
+    @staticmethod
+    def make(raw, value):
+        boolean = KExpression.__new__(KBoolean)
+        boolean._raw = raw
+        boolean.value = value
+        return boolean
+    def __init__(self, raw):
+        pass
     def __repr__(self):
         return "<bool: {raw}>".format(raw=self.raw)
     def __str__(self):
@@ -82,60 +178,141 @@ class KBoolean(KPrimitive):
     def __nonzero__(self):
         return self.value
     def __eq__(self, other):
-        return self.value == other.value
+        return self is other
+    def __ne__(self, other):
+        return self is not other
+    def __hash__(self):
+        return hash(self.value)
+
+KBoolean.TRUE   = KBoolean.make('#t', True)
+KBoolean.FALSE  = KBoolean.make('#f', False)
+
+# The textual number formats accepted by KNumber. These are compiled once here
+# so that the parser can also use them to classify tokens.
+INTEGER_PATTERN     = re.compile(r"^-?\d+$")
+FRACTION_PATTERN    = re.compile(r"^-?\d+/\d+$")
+FLOATING_ND_PATTERN = re.compile(r"^-?\d+\.\d*$")
+FLOATING_WD_PATTERN = re.compile(r"^-?\d*\.\d+$")
+
+def is_number(text):
+    """
+    Determines whether the given text is in a format accepted by KNumber.
+
+    :param text: The raw text to check.
+    :return: A boolean describing whether a KNumber can be made from the text.
+    """
+    return bool(INTEGER_PATTERN.match(text) or
+                FRACTION_PATTERN.match(text) or
+                FLOATING_ND_PATTERN.match(text) or
+                FLOATING_WD_PATTERN.match(text))
+
+def number_value(text):
+    """
+    Converts the text of a number into its native value: an int for integers,
+    a Fraction for fractions (or an int, if the fraction is whole), and a float
+    otherwise.
+
+    :param text: The raw text of the number.
+    :return: The int, long, Fraction, or float the text describes.
+    """
+    if INTEGER_PATTERN.match(text):
+        return int(text)
+    elif FRACTION_PATTERN.match(text):
+        numerator, denominator = text.split('/')
+        if int(denominator) == 0:
+            raise InvalidNumberException(text)
+        return exact(Fraction(int(numerator), int(denominator)))
+    elif FLOATING_ND_PATTERN.match(text) or FLOATING_WD_PATTERN.match(text):
+        return float(text)
+    raise InvalidNumberException(text)
+
+def exact(value):
+    """
+    Converts whole Fractions into ints, so that each rational value has only
+    one representation.
+    """
+    if type(value) is Fraction and value.denominator == 1:
+        return value.numerator
+    return value
+
+def quotient(dividend, divisor):
+    """
+    Divides two native numbers, keeping the quotient of integers exact.
+    """
+    kinds = (type(dividend), type(divisor))
+    if (kinds[0] is int or kinds[0] is long) and (kinds[1] is int or kinds[1] is long):
+        return exact(Fraction(dividend, divisor))
+    return dividend / divisor
 
 class KNumber(KPrimitive):
-    def __init__(self, raw):
-        self.raw = str(raw)
-        self.type = "number"
-        integer     = re.compile(r"^-?\d+$")
-        fraction    = re.compile(r"^-?\d+/\d+$")
-        floating_nd = re.compile(r"^-?\d+.\d*$")
-        floating_wd = re.compile(r"^-?\d*.\d+$")
-        if not (re.match(integer, self.raw) or
-                re.match(fraction, self.raw) or
-                re.match(floating_nd, self.raw) or
-                re.match(floating_wd, self.raw)):
-            raise InvalidNumberException(self.raw)
-        if re.match(integer, self.raw):
-            self.value   = int(self.raw)
-            self.integer = True
-        elif re.match(fraction, self.raw):
-            numerator    = self.raw[:self.raw.find('/')]
-            denominator  = self.raw[self.raw.find('/') + 1:]
-            self.value   = float(numerator) / float(denominator)
-            if self.value == int(self.value):
-                self.value   = int(self.value)
-                self.integer = True
-            else:
-                self.integer = False
+    """
+    A number, held as an exact int or Fraction where possible and as a float
+    otherwise. Arithmetic between exact numbers stays exact (so `{/ 1 3}` is
+    1/3), while any float makes the result a float.
+
+    A KNumber can be made from the text of a number, as the parser does, or
+    directly from a Python number. Small integers are interned, unless they are
+    written unusually (such as '007').
+    """
+    __slots__   = ('value', 'integer')
+    type        = "number"
+    def __new__(cls, value):
+        # The checks use `type` rather than `isinstance`, which is slow for the
+        # abstract numeric classes Fraction is registered with.
+        kind = type(value)
+        raw  = None
+        if kind is int or kind is long or kind is float:
+            pass
+        elif isinstance(value, basestring):
+            raw   = value
+            value = number_value(value)
+            kind  = type(value)
         else:
-            self.value   = float(self.raw)
-            self.integer = False
+            value = exact(value)
+            kind  = type(value)
+        integer = kind is int or kind is long
+        if integer and SMALL_INTEGER_MIN <= value <= SMALL_INTEGER_MAX:
+            if raw is None or raw == str(value):
+                return SMALL_INTEGERS[value - SMALL_INTEGER_MIN]
+        number = KExpression.__new__(cls)
+        number._raw     = raw
+        number.value    = value
+        number.integer  = integer
+        return number
+    def __init__(self, value):
+        pass
+    @property
+    def raw(self):
+        if self._raw is None:
+            return str(self.value)
+        return self._raw
     def __repr__(self):
         return "<num: {raw}>".format(raw=self.raw)
     def __str__(self):
         return str(self.value)
+    def __hash__(self):
+        return hash(self.value)
     def __add__(self, other):
-        return KNumber(str(self.value + other.value))
+        return KNumber(self.value + other.value)
     def __sub__(self, other):
-        return KNumber(str(self.value - other.value))
+        return KNumber(self.value - other.value)
     def __mul__(self, other):
-        return KNumber(str(self.value * other.value))
+        return KNumber(self.value * other.value)
     def __floordiv__(self, other):
-        return KNumber(str(self.value // other.value))
+        return KNumber(self.value // other.value)
     def __div__(self, other):
-        return KNumber(str(self.value / other.value))
+        return KNumber(quotient(self.value, other.value))
+    __truediv__ = __div__
     def __mod__(self, other):
-        return KNumber(str(self.value % other.value))
+        return KNumber(self.value % other.value)
     def __lt__(self, other):
         return self.value < other.value
     def __le__(self, other):
         return self.value <= other.value
     def __eq__(self, other):
-        return self.value == other.value
+        return isinstance(other, KNumber) and self.value == other.value
     def __ne__(self, other):
-        not self.__eq__(other)
+        return not self.__eq__(other)
     def __ge__(self, other):
         return self.value >= other.value
     def __gt__(self, other):
@@ -143,6 +320,18 @@ class KNumber(KPrimitive):
     def __nonzero__(self):
         return self.value != 0
 
+# The interned small integers.
+SMALL_INTEGER_MIN   = -5
+SMALL_INTEGER_MAX   = 256
+SMALL_INTEGERS      = []
+for value in xrange(SMALL_INTEGER_MIN, SMALL_INTEGER_MAX + 1):
+    number = KExpression.__new__(KNumber)
+    number._raw     = None
+    number.value    = value
+    number.integer  = True
+    SMALL_INTEGERS.append(number)
+del value, number
+
 ################################################################################
 # KList
 #   - slightly more advanced primitive with its own methods
@@ -169,75 +358,231 @@ def prepend(item, klist):
         raise InvalidPrependException(item)
     if not isinstance(klist, KList):
         raise InvalidPrependException(klist)
-    return KList(item) + klist
+    return klist.prepended(item)
 
 def append(item, klist):
     if not isinstance(item, KExpression):
         raise InvalidAppendException(item)
     if not isinstance(klist, KList):
         raise InvalidAppendException(klist)
-    return klist + KList(item)
+    return klist.appended(item)
 
 class KList(KPrimitive):
-    def __init__(self, *kexps):
-        if len(kexps) == 0:
-            self.raw = '()'
-            kexps = []
-        elif len(kexps) == 1:
-            if isinstance(kexps[0], list):
-                kexps = kexps[0]
-            else:
-                kexps = [kexps[0]]
-        else:
-            kexps = [kexp for kexp in kexps]
-        for kexp in kexps:
+    """
+    A persistent list of KExpressions. The items are kept as two chains of
+    (item, next) pairs: `front`, holding items from the start of the list, and
+    `rear`, holding the items after those in reverse order. Lists built from
+    one another share their chains, so `prepend`, `append`, `first` and `rest`
+    never copy a list, and `+` copies only the shorter of its two lists.
+
+    There is a single empty KList, KList.EMPTY.
+    """
+    __slots__   = ('front', 'rear', 'length', '_hash')
+    type        = "list"
+    def __new__(cls, *kexps):
+        if cls is not KList:
+            return KExpression.__new__(cls)
+        if len(kexps) == 1 and isinstance(kexps[0], list):
+            kexps = kexps[0]
+        front = None
+        for kexp in reversed(kexps):
             if not isinstance(kexp, KExpression):
-                raise InvalidListException("({})".format(', '.join(kexps)))
-        self.index = 0
-        self.kexps = kexps
-        self.type = "list"
-        self.raw = "{}".format(', '.join([str(kexp) for kexp in kexps]))
+                raise InvalidListException("({})".format(', '.join([str(kexp) for kexp in kexps])))
+            front = (kexp, front)
+        return KList.linked(front, None, len(kexps))
+    def __init__(self, *kexps):
+        pass
+    @staticmethod
+    def linked(front, rear, length):
+        """
+        Creates a KList directly from its chains.
+        """
+        if not length and KList.EMPTY is not None:
+            return KList.EMPTY
+        klist = KExpression.__new__(KList)
+        klist.front     = front
+        klist.rear      = rear
+        klist.length    = length
+        klist._hash     = None
+        return klist
+    # The raw text of a list is built from its items when it is asked for.
+    span = None
+    @property
+    def raw(self):
+        return "{}".format(', '.join([str(kexp) for kexp in self]))
+    @property
+    def kexps(self):
+        return list(self)
     def __repr__(self):
         return "<list: {raw}>".format(raw=self.raw)
     def __str__(self):
         return "KList({raw})".format(raw=self.raw)
     def __nonzero__(self):
-        return len(self.kexps) != 0
+        return self.length != 0
     def __add__(self, other):
-        return KList(self.kexps + other.kexps)
+        if not other.length:
+            return self
+        elif not self.length:
+            return other
+        length = self.length + other.length
+        if self.length <= other.length:
+            front = other.front
+            for kexp in reversed(self.kexps):
+                front = (kexp, front)
+            return KList.linked(front, other.rear, length)
+        rear = self.rear
+        for kexp in other:
+            rear = (kexp, rear)
+        return KList.linked(self.front, rear, length)
     def __eq__(self, other):
-        if not isinstance(other, KList):
-            return False
-        if self.empty and other.empty:
+        if self is other:
             return True
-        if ((self.empty and not other.empty) or
-            (not self.empty and other.empty)):
+        if not isinstance(other, KList) or len(self) != len(other):
             return False
-        if self.first != other.first:
+        if (self._hash is not None and other._hash is not None and
+                self._hash != other._hash):
             return False
-        return self.rest == other.rest
+        for mine, theirs in izip(self, other):
+            if not mine == theirs:
+                return False
+        return True
     def __ne__(self, other):
-        not self.__eq__(other)
+        return not self.__eq__(other)
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(tuple(self))
+        return self._hash
     def __iter__(self):
-        return iter(self.kexps)
+        cell = self.front
+        while cell is not None:
+            yield cell[0]
+            cell = cell[1]
+        if self.rear is not None:
+            back = []
+            cell = self.rear
+            while cell is not None:
+                back.append(cell[0])
+                cell = cell[1]
+            for kexp in reversed(back):
+                yield kexp
+    def __len__(self):
+        return self.length
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise BadListIndexException(str(index))
+        return next(islice(self, index, None))
+    def settled(self):
+        """
+        Gets a list of the same items whose first item can be reached directly:
+        the list itself, unless `front` has run out, in which case it is a new
+        list with the items of `rear` moved into `front`. Lists are never
+        changed once made, so they can be read from any number of threads.
+        """
+        if self.front is not None or self.rear is None:
+            return self
+        front = None
+        cell = self.rear
+        while cell is not None:
+            front = (cell[0], front)
+            cell = cell[1]
+        return KList.linked(front, None, self.length)
+    def prepended(self, kexp):
+        return KList.linked((kexp, self.front), self.rear, self.length + 1)
+    def appended(self, kexp):
+        return KList.linked(self.front, (kexp, self.rear), self.length + 1)
     @property
     def first(self):
-        try:
-            return self.kexps[0]
-        except IndexError:
+        if not self.length:
             raise BadListIndexException('0')
+        return self.settled().front[0]
     @property
     def rest(self):
+        if not self.length:
+            return KList()
+        settled = self.settled()
+        return KList.linked(settled.front[1], settled.rear, self.length - 1)
+    @property
+    def empty(self):
+        return self.length == 0
+    @property
+    def reverse(self):
+        front = None
+        for kexp in self:
+            front = (kexp, front)
+        return KList.linked(front, None, self.length)
+
+KList.EMPTY = None
+KList.EMPTY = KList.linked(None, None, 0)
+
+class KRange(KList):
+    """
+    A KList of the integers from `start` up to (but not including) `stop`,
+    counting by `step`. The numbers are only made when they are asked for, so a
+    range takes the same space however long it is. Operations which need the
+    chain of items, such as `+`, build it once for the whole range.
+    """
+    __slots__ = ('values', 'start', 'step', '_front')
+    def __init__(self, start, stop, step=1):
+        if step == 0:
+            raise InvalidListException("step 0")
+        self.values = xrange(start, stop, step)
+        self.start  = start
+        self.step   = step
+        self.length = len(self.values)
+        self.rear   = None
+        self._front = None
+        self._hash  = None
+    @property
+    def front(self):
+        if self._front is None:
+            front = None
+            for value in reversed(self.values):
+                front = (KNumber(value), front)
+            self._front = front
+        return self._front
+    @property
+    def raw(self):
+        return "{}".format(', '.join([str(value) for value in self.values]))
+    def __eq__(self, other):
+        if isinstance(other, KRange):
+            if self.length != other.length:
+                return False
+            return (self.length == 0 or
+                    (self.start == other.start and
+                     (self.length == 1 or self.step == other.step)))
+        return KList.__eq__(self, other)
+    def __hash__(self):
+        return KList.__hash__(self)
+    def __iter__(self):
+        if self._front is not None:
+            return KList.__iter__(self)
+        return (KNumber(value) for value in self.values)
+    def __getitem__(self, index):
         try:
-            return KList(self.kexps[1:])
+            return KNumber(self.values[index])
         except IndexError:
-            raise BadListIndexException
+            raise BadListIndexException(str(index))
+    def settled(self):
+        return self
+    def prepended(self, kexp):
+        return KList.linked((kexp, self.front), None, self.length + 1)
+    def appended(self, kexp):
+        return KList.linked(self.front, (kexp, None), self.length + 1)
     @property
-    def empty(self):
-        return len(self.kexps) == 0
+    def first(self):
+        return self[0]
+    @property
+    def rest(self):
+        if not self.values:
+            return KList()
+        return KRange(self.start + self.step, self.start + self.length * self.step, self.step)
     @property
     def reverse(self):
-        return KList(*list(reversed(self.kexps)))
+        if not self.values:
+            return KList()
+        return KRange(self.values[-1], self.start - self.step, -self.step)
 
 ################################################################################
 # KEnvironment
@@ -245,6 +590,8 @@ class KList(KPrimitive):
 ####
 
 class KBinding(KExpression):
+    __slots__   = ('symbol', 'kexp')
+    type        = "binding"
     def __init__(self, symbol, kexp):
         if not isinstance(symbol, KSymbol):
             raise BadBindingNameException(symbol)
@@ -252,42 +599,70 @@ class KBinding(KExpression):
             raise BadBindingValueException(kexp)
         self.symbol = symbol
         self.kexp = kexp
-        self.type = "binding"
-        self.raw = "{} -> {}".format(symbol, kexp)
+    @property
+    def raw(self):
+        return "{} -> {}".format(self.symbol, self.kexp)
     def __repr__(self):
         return "<bind: {raw}>".format(raw=self.raw)
     def __str__(self):
         return "({} -> {})".format(self.symbol, self.kexp)
 
 class KEnvironment(KExpression):
+    """
+    The bindings in scope while an expression is interpreted. Environments are
+    persistent: adding a binding makes a new environment sharing almost all of
+    its structure with the old one, which is left unchanged. Bindings are held
+    in a HashMap keyed by symbol, so adding a binding and looking a symbol up
+    both take O(log n) time, and a binding replaces any earlier binding of the
+    same symbol.
+    """
+    __slots__   = ('bindings',)
+    type        = "environment"
     def __init__(self, *bindings):
-        self.bindings = KList()
+        self.bindings = HashMap()
         for binding in bindings:
             if not isinstance(binding, KBinding):
                 raise BadEnvironmentBindingException(binding)
-            self.bindings += KList(binding)
-        self.type = "environment"
-        self.raw = "({})".format(', '.join([str(binding) for binding in self.bindings]))
+            self.bindings = self.bindings.set(binding.symbol, binding)
+    @property
+    def raw(self):
+        return "({})".format(', '.join(sorted(str(binding) for binding in self)))
     def __repr__(self):
         return "<env: {raw}>".format(raw=self.raw)
     def __str__(self):
-        return "{raw]".format(raw=self.raw)
+        return "{raw}".format(raw=self.raw)
     def __add__(self, other):
         if isinstance(other, KBinding):
-            return KEnvironment(*(self.bindings + KList(other)))
+            bindings = [other]
+        elif isinstance(other, KEnvironment):
+            bindings = other
         else:
-            return KEnvironment(*(self.bindings + other.bindings))
+            raise BadEnvironmentBindingException(other)
+        env = KEnvironment.__new__(KEnvironment)
+        env.bindings = self.bindings
+        for binding in bindings:
+            env.bindings = env.bindings.set(binding.symbol, binding)
+        return env
     def __iter__(self):
-        return iter(self.bindings)
+        return (binding for _, binding in self.bindings.items())
+    def __len__(self):
+        return len(self.bindings)
+    def __contains__(self, symbol):
+        return symbol in self.bindings
+    def get(self, symbol, default=None):
+        binding = self.bindings.get(symbol)
+        if binding is None:
+            return default
+        return binding.kexp
 
 empty_env = KEnvironment()
 
 def lookup(symbol, env):
+    if isinstance(env, KFrame):
+        env = env.env
     if not isinstance(env, KEnvironment):
         raise BadLookupException(symbol)
-    for binding in env:
-        if binding.symbol == symbol:
-            return binding.kexp
+    return env.get(symbol)
 
 ################################################################################
 # KIf
@@ -295,12 +670,13 @@ def lookup(symbol, env):
 ####
 
 class KIf(KExpression):
+    __slots__   = ('test', 'true', 'false')
+    type        = "KIf"
     def __init__(self, raw, test, result_true, result_false):
         self.raw    = raw
         self.test   = test
         self.true   = result_true
         self.false  = result_false
-        self.type   = "KIf"
     def __repr__(self):
         return "<{type}: {raw}>".format(type=self.type, raw=self.raw)
     def __str__(self):
@@ -317,12 +693,13 @@ class KIf(KExpression):
 ####
 
 class KLet(KExpression):
+    __slots__   = ('name', 'value', 'body')
+    type        = "KLet"
     def __init__(self, raw, name, value, body):
         self.raw = raw
         self.name = name
         self.value = value
         self.body = body
-        self.type = "KLet"
     def __repr__(self):
         return "<{type}: {raw}>".format(type=self.type, raw=self.raw)
     def __str__(self):
@@ -331,3 +708,141 @@ class KLet(KExpression):
             value   = self.value,
             body    = self.body
         )
+
+################################################################################
+# Lambdas
+#   - functions written in KL, and their application
+####
+
+class KLambda(KExpression):
+    """
+    A function of its parameters. A lambda with a `name` can call itself by
+    that name from within its body.
+
+    Once resolved, a lambda also records the addresses, in the scope around
+    it, of the symbols it `captures`, and the `size` of the frame its body is
+    evaluated in. The frame holds the arguments first, then the lambda itself
+    if it has a name, then the captured values, then the body's lets.
+    """
+    __slots__   = ('name', 'params', 'body', 'captures', 'size', 'free')
+    type        = "KLambda"
+    def __init__(self, raw, params, body, name=None, captures=None, size=None):
+        self.raw        = raw
+        self.name       = name
+        self.params     = tuple(params)
+        self.body       = body
+        self.captures   = captures
+        self.size       = size
+        # The free symbols of the lambda, worked out when they are first
+        # needed by the interpreter.
+        self.free       = None
+    def __repr__(self):
+        return "<{type}: {raw}>".format(type=self.type, raw=self.raw)
+    def __str__(self):
+        return "{type}{name}({params}) : {body}".format(
+            type    = self.type,
+            name    = " {}".format(self.name) if self.name is not None else "",
+            params  = ', '.join(str(param) for param in self.params),
+            body    = self.body
+        )
+
+class KApply(KExpression):
+    """
+    The application of a lambda to arguments.
+    """
+    __slots__   = ('function', 'args')
+    type        = "KApply"
+    def __init__(self, raw, function, *args):
+        self.raw        = raw
+        self.function   = function
+        self.args       = args
+    def __repr__(self):
+        return "<{type}: {raw}>".format(type=self.type, raw=self.raw)
+    def __str__(self):
+        return "{type}({function}; {arguments})".format(
+            type        = self.type,
+            function    = self.function,
+            arguments   = ', '.join([str(argument) for argument in self.args]))
+
+class KClosure(KExpression):
+    """
+    The value of a lambda: the lambda along with the values of its free
+    symbols, and nothing else from the environment it was made in. These are
+    held in a KEnvironment for a lambda which has not been resolved, and in a
+    tuple ordered as its `captures` for one which has.
+
+    A closure also records how to `evaluate` its body: a function of the body
+    and the environment or frame to evaluate it in, belonging to the engine
+    which made the closure. A builtin calling the closure calls it through
+    this, so the body is run by the same engine as the rest of the expression.
+    """
+    __slots__   = ('function', 'captured', 'evaluate')
+    type        = "closure"
+    def __init__(self, function, captured, evaluate):
+        self.raw        = function.span or function.raw
+        self.function   = function
+        self.captured   = captured
+        self.evaluate   = evaluate
+    def __repr__(self):
+        return "<closure: {raw}>".format(raw=self.raw)
+    def __str__(self):
+        return "KClosure({params})".format(
+            params = ', '.join(str(param) for param in self.function.params))
+
+################################################################################
+# Lexical addresses
+#   - symbols resolved ahead of time to slots of a frame
+####
+
+class KLocal(KExpression):
+    """
+    A reference to a let-bound symbol, addressed by the number of frames out
+    from the current one (`depth`) and its index within that frame (`slot`).
+    """
+    __slots__   = ('symbol', 'depth', 'slot')
+    type        = "local"
+    def __init__(self, symbol, depth, slot):
+        self.raw    = symbol.raw
+        self.symbol = symbol
+        self.depth  = depth
+        self.slot   = slot
+    def __repr__(self):
+        return "<local: {raw} ({depth}, {slot})>".format(
+            raw=self.raw, depth=self.depth, slot=self.slot)
+
+class KScope(KExpression):
+    """
+    An expression whose let-bound symbols have been resolved to KLocals. It is
+    interpreted in a new KFrame with `size` slots.
+    """
+    __slots__   = ('body', 'size')
+    type        = "scope"
+    def __init__(self, raw, body, size):
+        self.raw    = raw
+        self.body   = body
+        self.size   = size
+    def __repr__(self):
+        return "<scope: {raw}>".format(raw=self.raw)
+    def __str__(self):
+        return "{body}".format(body=self.body)
+
+class KFrame(object):
+    """
+    The values of the let-bound symbols of a KScope while it is interpreted,
+    along with the enclosing frame and the environment holding every symbol
+    which is not let-bound.
+    """
+    __slots__ = ('values', 'parent', 'env')
+    def __init__(self, size, parent):
+        self.values = [None] * size
+        if isinstance(parent, KFrame):
+            self.parent = parent
+            self.env    = parent.env
+        else:
+            self.parent = None
+            self.env    = parent
+    def fetch(self, depth, slot):
+        frame = self
+        for _ in xrange(depth):
+            frame = frame.parent
+        return frame.values[slot]
@@ -0,0 +1,272 @@
+################################################################################
+#
+# vectorize.py
+#
+# This module evaluates an expression over whole columns of values at once.
+# Symbols are bound to NumPy arrays, and the expression is evaluated a single
+# time with array operations: the arithmetic and comparison functions become
+# NumPy ufuncs and `if` becomes numpy.where.
+#
+# The array operations give exactly the values that evaluating the rows one
+# at a time would. Expressions whose array values would differ, such as the
+# division of integers (which is exact, rather than a float), are not
+# vectorized, and integer arithmetic which could overflow NumPy's fixed-size
+# integers is done on Python's own integers instead.
+#
+# NumPy is optional. Without it, or for expressions using forms which have no
+# array equivalent, CompiledExpression.evaluate_columns evaluates the rows one
+# at a time instead.
+#
+################################################################################
+
+from fractions import Fraction
+from itertools import combinations
+from exceptions import *
+from types import *
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The ufuncs standing in for the functions of FUNCTION_MAP, by name.
+ARITHMETIC_UFUNCS = {
+    '+': 'add',
+    '*': 'multiply',
+    '-': 'subtract',
+    '/': 'true_divide',
+    '%': 'mod',
+}
+
+COMPARISON_UFUNCS = {
+    '==': 'equal',
+    '!=': 'not_equal',
+    '<':  'less',
+    '>':  'greater',
+    '<=': 'less_equal',
+    '>=': 'greater_equal',
+}
+
+# The kinds of values an expression can give for every row.
+INTEGER = 'integer'
+FLOAT   = 'float'
+BOOLEAN = 'boolean'
+
+# The kinds of the arrays bound to symbols, by the `kind` of their dtypes.
+DTYPE_KINDS = {'i': INTEGER, 'u': INTEGER, 'f': FLOAT, 'b': BOOLEAN}
+
+# The largest magnitude of NumPy's integers, and that up to which a float holds
+# every integer exactly.
+INTEGER_LIMIT   = 2 ** 63
+FLOAT_EXACT     = 2 ** 53
+
+def available():
+    """
+    Determines whether NumPy is installed, so that expressions can be
+    vectorized at all.
+    """
+    return numpy is not None
+
+def vectorizable(kexp, arrays=None):
+    """
+    Determines whether an expression can be evaluated with array operations:
+    that is, whether it is built only from numbers, booleans, symbols, lets,
+    ifs, and arithmetic and comparison functions. Fractions are excluded, since
+    arrays cannot hold them exactly.
+
+    :param kexp: A KExpression, which has not been resolved.
+    :param arrays: A dictionary mapping each free KSymbol of the expression to
+        the NumPy array it is to be bound to, or None. If it is given, the
+        expression must also give the same values with those arrays as it
+        would row by row.
+    :return: A boolean.
+    """
+    if arrays is not None:
+        kinds = dict((symbol, DTYPE_KINDS.get(array.dtype.kind))
+                     for symbol, array in arrays.iteritems())
+        if kind(kexp, kinds) is None:
+            return False
+    stack = [kexp]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, KNumber):
+            if type(node.value) is Fraction:
+                return False
+        elif isinstance(node, (KBoolean, KSymbol)):
+            pass
+        elif isinstance(node, KFunctionExpression):
+            if (node.function not in ARITHMETIC_UFUNCS and
+                    node.function not in COMPARISON_UFUNCS):
+                return False
+            stack.extend(node.args)
+        elif isinstance(node, KIf):
+            stack.extend((node.test, node.true, node.false))
+        elif isinstance(node, KLet):
+            stack.extend((node.value, node.body))
+        else:
+            return False
+    return True
+
+def kind(kexp, kinds):
+    """
+    Works out the kind of value an expression gives in every row: INTEGER,
+    FLOAT or BOOLEAN.
+
+    :param kexp: A KExpression.
+    :param kinds: A dictionary mapping KSymbols to their kinds.
+    :return: The kind, or None if the array operations would not give the same
+        values as evaluating the expression row by row.
+    """
+    if isinstance(kexp, KSymbol):
+        return kinds.get(kexp)
+    elif isinstance(kexp, KBoolean):
+        return BOOLEAN
+    elif isinstance(kexp, KNumber):
+        if type(kexp.value) is float:
+            return FLOAT
+        elif kexp.integer:
+            return INTEGER
+        return None
+    elif isinstance(kexp, KFunctionExpression):
+        args = [kind(arg, kinds) for arg in kexp.args]
+        if None in args:
+            return None
+        elif kexp.function in COMPARISON_UFUNCS:
+            # Booleans are only equal or unequal to one another, and unordered.
+            if BOOLEAN in args and (kexp.function not in ('==', '!=') or
+                                    any(arg != BOOLEAN for arg in args)):
+                return None
+            return BOOLEAN
+        elif kexp.function not in ARITHMETIC_UFUNCS or BOOLEAN in args:
+            return None
+        elif kexp.function == '/' and len(args) > 1 and FLOAT not in args[:2]:
+            # The quotient of two integers is an exact fraction.
+            return None
+        elif kexp.function == '+' and len(args) > 2 and FLOAT in args:
+            # A float sum of more than two numbers is rounded only once.
+            return None
+        return FLOAT if FLOAT in args else INTEGER
+    elif isinstance(kexp, KIf):
+        test = kind(kexp.test, kinds)
+        true = kind(kexp.true, kinds)
+        if test is None or true is None or kind(kexp.false, kinds) != true:
+            return None
+        return true
+    elif isinstance(kexp, KLet):
+        value = kind(kexp.value, kinds)
+        if value is None:
+            return None
+        inner = dict(kinds)
+        inner[kexp.name] = value
+        return kind(kexp.body, inner)
+    return None
+
+def evaluate_arrays(kexp, arrays):
+    """
+    Evaluates a vectorizable expression with array operations. Floating-point
+    errors, such as division by zero, are raised as FloatingPointErrors.
+
+    :param kexp: A KExpression for which `vectorizable` holds.
+    :param arrays: A dictionary mapping each free KSymbol of the expression to
+        a NumPy array.
+    :return: A NumPy array, or a scalar if the expression refers to no arrays.
+    """
+    with numpy.errstate(divide='raise', invalid='raise'):
+        return evaluate(kexp, arrays)
+
+def evaluate(kexp, arrays):
+    if isinstance(kexp, KSymbol):
+        try:
+            return arrays[kexp]
+        except KeyError:
+            raise UnboundSymbolException(kexp)
+    elif isinstance(kexp, (KNumber, KBoolean)):
+        return kexp.value
+    elif isinstance(kexp, KFunctionExpression):
+        args = [evaluate(arg, arrays) for arg in kexp.args]
+        if kexp.function in ARITHMETIC_UFUNCS:
+            ufunc = getattr(numpy, ARITHMETIC_UFUNCS[kexp.function])
+            return reduce(lambda one, two: arithmetic(kexp.function, ufunc, one, two), args)
+        return compare(kexp.function, args)
+    elif isinstance(kexp, KIf):
+        test = numpy.asarray(evaluate(kexp.test, arrays)) != 0
+        return numpy.where(test, evaluate(kexp.true, arrays), evaluate(kexp.false, arrays))
+    elif isinstance(kexp, KLet):
+        inner = dict(arrays)
+        inner[kexp.name] = evaluate(kexp.value, arrays)
+        return evaluate(kexp.body, inner)
+    raise ImplementationException(
+        "Cannot vectorize expression: {}".format(repr(kexp)))
+
+def integral(operand):
+    """
+    Determines whether an operand is an integer, or an array of them.
+    """
+    if isinstance(operand, numpy.ndarray):
+        return operand.dtype.kind in 'iuO'
+    return isinstance(operand, (int, long, numpy.integer))
+
+def magnitude(operand):
+    """
+    Finds the greatest magnitude of the integers of an operand.
+    """
+    if isinstance(operand, numpy.ndarray):
+        if not operand.size:
+            return 0
+        return max(abs(int(operand.min())), abs(int(operand.max())))
+    return abs(int(operand))
+
+def objects(operand):
+    """
+    Converts an operand to Python's own numbers, which cannot overflow.
+    """
+    if isinstance(operand, numpy.ndarray):
+        return operand.astype(object)
+    elif isinstance(operand, numpy.generic):
+        return operand.item()
+    return operand
+
+def arithmetic(function, ufunc, one, two):
+    """
+    Applies an arithmetic ufunc to two operands. Integers are worked on as
+    Python integers where NumPy's integers could overflow.
+    """
+    if integral(one) and integral(two):
+        if function == '*':
+            bound = magnitude(one) * magnitude(two)
+        elif function in ('+', '-'):
+            bound = magnitude(one) + magnitude(two)
+        else:
+            bound = 0
+        if bound >= INTEGER_LIMIT:
+            one, two = objects(one), objects(two)
+    return ufunc(one, two)
+
+def comparable(one, two):
+    """
+    Gets two operands in a form in which NumPy compares them exactly: integers
+    too large for a float to hold exactly are compared with floats as Python
+    numbers.
+    """
+    if integral(one) != integral(two):
+        integer = one if integral(one) else two
+        if magnitude(integer) > FLOAT_EXACT:
+            return objects(one), objects(two)
+    return one, two
+
+def compare(function, args):
+    """
+    Applies a comparison across its arguments in the way the functions of
+    `function_definitions/comparison.py` do: equality against the first
+    argument, inequality between every pair, and ordering between neighbours.
+    """
+    if len(args) < 2:
+        raise TooFewArgumentsException(function, args)
+    ufunc = getattr(numpy, COMPARISON_UFUNCS[function])
+    if function == '==':
+        pairs = [(args[0], arg) for arg in args[1:]]
+    elif function == '!=':
+        pairs = combinations(args, 2)
+    else:
+        pairs = zip(args, args[1:])
+    return reduce(numpy.logical_and, [ufunc(*comparable(one, two)) for one, two in pairs])
@@ -0,0 +1,406 @@
+################################################################################
+#
+# vm.py
+#
+# This module provides a third execution engine: a stack machine. Expressions
+# are compiled into Bytecode, a flat sequence of instructions held in an array
+# together with a pool of the constants and functions they refer to, and run by
+# a single loop with an explicit stack of values. Neither compiling nor running
+# uses Python recursion, so deeply nested expressions cost nothing extra.
+#
+# The body of each lambda is compiled in line, after an instruction making its
+# closure and a jump over it. Calling a closure saves where to return to on a
+# stack of calls, and a call in tail position reuses the caller's entry, so a
+# loop written as a tail call runs in constant space.
+#
+# As with the closure compiler, the interpreter remains the reference engine.
+#
+################################################################################
+
+import struct
+import sys
+from array import array
+from exceptions import *
+from types import *
+from functions import BUILTINS
+from interpreter import close, enter
+import kelpc
+
+################################################################################
+# Instructions
+#
+# Each instruction is an opcode followed by its operands, all held as integers
+# in the same array. Jump targets are indices into the array.
+####
+
+PUSH_CONST      = 0     # (constant)        push a constant
+LOAD_SLOT       = 1     # (slot)            push a slot of the current frame
+LOAD_OUTER      = 2     # (depth, slot)     push a slot of an enclosing frame
+LOAD_NAME       = 3     # (constant)        push the value bound to a symbol
+CALL_BUILTIN    = 4     # (function, count) call a function on the top values
+JUMP            = 5     # (target)
+JUMP_IF_FALSE   = 6     # (target)          pop a value, and jump if it is false
+BIND            = 7     # (slot)            pop a value into a slot
+BIND_NAME       = 8     # (constant)        pop a value and bind a symbol to it
+UNBIND_NAME     = 9     # ()                remove the last symbol bound
+ENTER           = 10    # (size)            start a new frame
+LEAVE           = 11    # ()                return to the enclosing frame
+MAKE_CLOSURE    = 12    # (constant, entry) push the closure of a lambda
+CALL_CLOSURE    = 13    # (count)           call a closure on the top values
+TAIL_CALL       = 14    # (count)           call a closure in place of this call
+RETURN          = 15    # ()                return from a call of a closure
+
+OPERANDS = {
+    PUSH_CONST: 1, LOAD_SLOT: 1, LOAD_OUTER: 2, LOAD_NAME: 1, CALL_BUILTIN: 2,
+    JUMP: 1, JUMP_IF_FALSE: 1, BIND: 1, BIND_NAME: 1, UNBIND_NAME: 0,
+    ENTER: 1, LEAVE: 0, MAKE_CLOSURE: 2, CALL_CLOSURE: 1, TAIL_CALL: 1,
+    RETURN: 0,
+}
+
+NAMES = {
+    PUSH_CONST: 'PUSH_CONST', LOAD_SLOT: 'LOAD_SLOT', LOAD_OUTER: 'LOAD_OUTER',
+    LOAD_NAME: 'LOAD_NAME', CALL_BUILTIN: 'CALL_BUILTIN', JUMP: 'JUMP',
+    JUMP_IF_FALSE: 'JUMP_IF_FALSE', BIND: 'BIND', BIND_NAME: 'BIND_NAME',
+    UNBIND_NAME: 'UNBIND_NAME', ENTER: 'ENTER', LEAVE: 'LEAVE',
+    MAKE_CLOSURE: 'MAKE_CLOSURE', CALL_CLOSURE: 'CALL_CLOSURE',
+    TAIL_CALL: 'TAIL_CALL', RETURN: 'RETURN',
+}
+
+CODE_TYPE = 'i'
+
+################################################################################
+# Bytecode
+####
+
+MAGIC           = 'KELPB\0'
+FORMAT_VERSION  = 2
+
+HEADER  = struct.Struct('<6sHII')   # magic, format version, code length, names length
+
+class Bytecode(object):
+    """
+    A compiled expression: the instructions, the constants they push or bind,
+    and the names of the functions they call.
+    """
+    __slots__ = ('code', 'constants', 'names', 'functions', 'bodies')
+    def __init__(self, code, constants, names):
+        """
+        :param code: An array of the instructions.
+        :param constants: A list of the KExpressions referred to by index.
+        :param names: A list of the names of the functions called, each the
+            key of its Builtin in BUILTINS.
+        """
+        self.code       = code
+        self.constants  = constants
+        self.names      = names
+        try:
+            self.functions = [BUILTINS[name].function for name in names]
+        except KeyError as e:
+            raise InvalidFunctionException(e.args[0])
+        # The Body of each lambda, by its entry, made when it is first needed.
+        self.bodies = {}
+    def __repr__(self):
+        return "<bytecode: {} instructions>".format(len(self.instructions()))
+    def __call__(self, env=empty_env):
+        return run(self, env)
+    def instructions(self):
+        """
+        :return: A list of (offset, opcode, operands) for each instruction.
+        """
+        code = self.code
+        instructions = []
+        pc = 0
+        while pc < len(code):
+            op = code[pc]
+            count = OPERANDS[op]
+            instructions.append((pc, op, tuple(code[pc + 1:pc + 1 + count])))
+            pc += 1 + count
+        return instructions
+    def disassemble(self):
+        """
+        :return: A readable listing of the instructions, one per line.
+        """
+        lines = []
+        for pc, op, operands in self.instructions():
+            line = "{:4d} {:<14}".format(pc, NAMES[op])
+            if op in (PUSH_CONST, LOAD_NAME, BIND_NAME, MAKE_CLOSURE):
+                line += "{} ({})".format(operands[0], self.constants[operands[0]])
+                if op == MAKE_CLOSURE:
+                    line += " {}".format(operands[1])
+            elif op == CALL_BUILTIN:
+                line += "{} ({}) {}".format(operands[0], self.names[operands[0]], operands[1])
+            else:
+                line += ' '.join(str(operand) for operand in operands)
+            lines.append(line.rstrip())
+        return '\n'.join(lines)
+    def dumps(self):
+        """
+        Serializes the bytecode. The code is written as the bytes of its array
+        in little-endian order, and the constants in the kelpc format.
+
+        :return: A string.
+        """
+        code = self.code
+        if sys.byteorder != 'little':
+            code = array(CODE_TYPE, code)
+            code.byteswap()
+        names = '\0'.join(self.names)
+        return ''.join([HEADER.pack(MAGIC, FORMAT_VERSION, len(code), len(names)),
+                        code.tostring(), names, kelpc.dumps(self.constants)])
+    @staticmethod
+    def loads(data, name='<string>'):
+        """
+        Rebuilds serialized bytecode.
+
+        :param data: A string made by `dumps`.
+        :param name: The name of the data's source, used in error messages.
+        :return: The Bytecode.
+        """
+        try:
+            magic, format_version, length, names_length = HEADER.unpack_from(data, 0)
+            if magic != MAGIC or format_version != FORMAT_VERSION:
+                raise InvalidCacheFileException(name)
+            offset = HEADER.size
+            code = array(CODE_TYPE)
+            end = offset + length * code.itemsize
+            code.fromstring(data[offset:end])
+            if len(code) != length:
+                raise InvalidCacheFileException(name)
+            if sys.byteorder != 'little':
+                code.byteswap()
+            names = data[end:end + names_length]
+            names = names.split('\0') if names else []
+            constants = kelpc.loads(data[end + names_length:], name)
+            return Bytecode(code, constants, names)
+        except (struct.error, ValueError, InvalidFunctionException):
+            raise InvalidCacheFileException(name)
+
+################################################################################
+# Compiling
+####
+
+def compile_bytecode(kexp):
+    """
+    Compiles a KExpression, which may have been resolved, into Bytecode.
+
+    :param kexp: The KExpression to compile.
+    :return: The Bytecode, which leaves the expression's value on the stack.
+    """
+    if not isinstance(kexp, KExpression):
+        raise InterpretException("Not a parsed expression: {}".format(kexp))
+    code = []
+    constants = []
+    constant_indices = {}
+    names = []
+    name_indices = {}
+    labels = []     # The offset of each label, once it has been placed.
+    jumps = []      # The offsets of jump operands, which hold label numbers.
+    def constant(kexp):
+        index = constant_indices.get(id(kexp))
+        if index is None:
+            index = constant_indices[id(kexp)] = len(constants)
+            constants.append(kexp)
+        return index
+    def function(name):
+        if name not in BUILTINS:
+            raise InvalidFunctionException(name)
+        index = name_indices.get(name)
+        if index is None:
+            index = name_indices[name] = len(names)
+            names.append(name)
+        return index
+    def label():
+        labels.append(None)
+        return len(labels) - 1
+    # The work stack holds expressions still to be compiled, along with
+    # instructions and labels to be placed once the expressions before them
+    # have been compiled. Expressions in tail position in the body of a lambda
+    # are held as ('tail', expression).
+    work = [kexp]
+    while work:
+        item = work.pop()
+        tail = False
+        if type(item) is tuple:
+            if item[0] == 'tail':
+                item, tail = item[1], True
+            elif item[0] == 'label':
+                labels[item[1]] = len(code)
+                continue
+            else:
+                if item[0] in (JUMP, JUMP_IF_FALSE):
+                    jumps.append(len(code) + 1)
+                elif item[0] == MAKE_CLOSURE:
+                    jumps.append(len(code) + 2)
+                code.extend(item)
+                continue
+        if not isinstance(item, KExpression):
+            raise InterpretException("Not a parsed expression: {}".format(item))
+        if isinstance(item, KLocal):
+            if item.depth == 0:
+                code.extend((LOAD_SLOT, item.slot))
+            else:
+                code.extend((LOAD_OUTER, item.depth, item.slot))
+        elif isinstance(item, KSymbol):
+            code.extend((LOAD_NAME, constant(item)))
+        elif isinstance(item, KFunctionExpression):
+            work.append((CALL_BUILTIN, function(item.function), len(item.args)))
+            work.extend(reversed(item.args))
+        elif isinstance(item, KIf):
+            false, end = label(), label()
+            work.extend([('label', end), in_tail(item.false, tail), ('label', false),
+                         (JUMP, end), in_tail(item.true, tail), (JUMP_IF_FALSE, false),
+                         item.test])
+        elif isinstance(item, KLet):
+            if isinstance(item.name, KLocal):
+                work.extend([in_tail(item.body, tail), (BIND, item.name.slot), item.value])
+            else:
+                work.extend([(UNBIND_NAME,), in_tail(item.body, tail),
+                             (BIND_NAME, constant(item.name)), item.value])
+        elif isinstance(item, KScope):
+            work.extend([(LEAVE,), in_tail(item.body, tail), (ENTER, item.size)])
+        elif isinstance(item, KLambda):
+            entry, end = label(), label()
+            work.extend([('label', end), (RETURN,), ('tail', item.body), ('label', entry),
+                         (JUMP, end), (MAKE_CLOSURE, constant(item), entry)])
+        elif isinstance(item, KApply):
+            work.append((TAIL_CALL if tail else CALL_CLOSURE, len(item.args)))
+            work.extend(reversed(item.args))
+            work.append(item.function)
+        elif isinstance(item, KPrimitive):
+            code.extend((PUSH_CONST, constant(item)))
+        else:
+            raise ImplementationException(
+                "Cannot compile expression: {}".format(repr(item)))
+    for offset in jumps:
+        code[offset] = labels[code[offset]]
+    return Bytecode(array(CODE_TYPE, code), constants, names)
+
+def in_tail(kexp, tail):
+    """
+    Marks an expression for the work stack of `compile_bytecode` as being in
+    tail position, if the expression holding it is.
+    """
+    return ('tail', kexp) if tail else kexp
+
+################################################################################
+# Running
+####
+
+class Body(object):
+    """
+    The compiled body of a lambda, which evaluates it for the closures made
+    from the lambda, when they are called from outside the bytecode.
+    """
+    __slots__ = ('bytecode', 'entry')
+    def __init__(self, bytecode, entry):
+        self.bytecode   = bytecode
+        self.entry      = entry
+    def __call__(self, body, env):
+        return run(self.bytecode, env, self.entry)
+
+def run(bytecode, env=empty_env, start=0):
+    """
+    Runs Bytecode.
+
+    :param bytecode: The Bytecode to run.
+    :param env: The environment to run it in, as for `interpret`, or the frame
+        to run the body of a resolved lambda in.
+    :param start: The offset to start at: 0 to run the compiled expression,
+        or the entry of a lambda to run its body until it returns.
+    :return: The value of the compiled expression, or of the body.
+    """
+    code        = bytecode.code
+    constants   = bytecode.constants
+    functions   = bytecode.functions
+    bodies      = bytecode.bodies
+    stack       = []
+    push        = stack.append
+    pop         = stack.pop
+    frame       = None
+    if isinstance(env, KFrame):
+        frame, env = env, env.env
+    envs        = []
+    calls       = []    # The (return offset, frame, env, len(envs)) of each call.
+    pc          = start
+    end         = len(code)
+    while pc < end:
+        op = code[pc]
+        if op == PUSH_CONST:
+            push(constants[code[pc + 1]])
+            pc += 2
+        elif op == LOAD_SLOT:
+            push(frame.values[code[pc + 1]])
+            pc += 2
+        elif op == CALL_BUILTIN:
+            count = code[pc + 2]
+            arguments = tuple(stack[len(stack) - count:])
+            del stack[len(stack) - count:]
+            push(functions[code[pc + 1]](arguments))
+            pc += 3
+        elif op == JUMP_IF_FALSE:
+            if KBoolean(pop()):
+                pc += 2
+            else:
+                pc = code[pc + 1]
+        elif op == JUMP:
+            pc = code[pc + 1]
+        elif op == BIND:
+            frame.values[code[pc + 1]] = pop()
+            pc += 2
+        elif op == LOAD_NAME:
+            push(lookup(constants[code[pc + 1]], frame or env))
+            pc += 2
+        elif op == LOAD_OUTER:
+            push(frame.fetch(code[pc + 1], code[pc + 2]))
+            pc += 3
+        elif op == ENTER:
+            frame = KFrame(code[pc + 1], frame or env)
+            pc += 2
+        elif op == LEAVE:
+            frame = frame.parent
+            pc += 1
+        elif op == BIND_NAME:
+            envs.append(env)
+            env = env + KBinding(constants[code[pc + 1]], pop())
+            pc += 2
+        elif op == UNBIND_NAME:
+            env = envs.pop()
+            pc += 1
+        elif op == MAKE_CLOSURE:
+            entry = code[pc + 2]
+            body = bodies.get(entry)
+            if body is None:
+                body = bodies.setdefault(entry, Body(bytecode, entry))
+            push(close(constants[code[pc + 1]], frame or env, body))
+            pc += 3
+        elif op == CALL_CLOSURE or op == TAIL_CALL:
+            count = code[pc + 1]
+            arguments = stack[len(stack) - count:]
+            del stack[len(stack) - count:]
+            closure = pop()
+            body, inner = enter(closure, arguments)
+            evaluate = closure.evaluate
+            if type(evaluate) is not Body or evaluate.bytecode is not bytecode:
+                # The closure was made elsewhere, so its body is not here.
+                push(evaluate(body, inner))
+                pc += 2
+                continue
+            if op == CALL_CLOSURE:
+                calls.append((pc + 2, frame, env, len(envs)))
+            else:
+                # The call takes the place of the one being made, so the
+                # symbols bound since it began are no longer needed.
+                del envs[calls[-1][3] if calls else 0:]
+            if isinstance(inner, KFrame):
+                frame, env = inner, inner.env
+            else:
+                frame, env = None, inner
+            pc = evaluate.entry
+        elif op == RETURN:
+            if not calls:
+                return pop()
+            pc, frame, env, depth = calls.pop()
+            del envs[depth:]
+        else:
+            raise ImplementationException("Invalid instruction: {}".format(op))
+    return pop()
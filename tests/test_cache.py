@@ -0,0 +1,102 @@
+from kelpy import cache, parser, interpreter
+from kelpy.types import *
+from kelpy.exceptions import *
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+################################################################################
+# normalize
+####
+
+@params(('{+ 1 2}', '{+ 1 2}'), ('  {+  1\n\t2 }  ', '{+ 1 2}'), ('{ + { * 2 3 } }', '{+ {* 2 3}}'))
+def test_normalize(text, normal):
+    assert cache.normalize(text) == normal
+
+def test_normalize_quoted_symbol():
+    assert cache.normalize("{+  '{a  b} 1}") == "{+ '{a  b} 1}"
+    assert cache.normalize("{ list  '{ a } 1 }") == "{list '{ a } 1}"
+
+################################################################################
+# ParseCache
+####
+
+def test_parse_cache_hits():
+    parses = cache.ParseCache()
+    kexp = parses.parse('{+ 1 2}')
+    assert parses.parse(' {+ 1   2} ') is kexp
+    assert (parses.hits, parses.misses) == (1, 1)
+    assert '{+ 1 2}' in parses
+
+def test_parse_cache_distinct_symbols():
+    parses = cache.ParseCache()
+    assert parses.parse("'{a b}") is not parses.parse("'{a  b}")
+    spaced = parses.parse("{list '{ a} 1}")
+    assert parses.parse("{list '{a} 1}") is not spaced
+    assert spaced.first.raw == "'{ a}"
+
+def test_parse_cache_max_entries():
+    parses = cache.ParseCache(max_entries=2)
+    parses.parse('1')
+    parses.parse('2')
+    parses.parse('1')
+    parses.parse('3')
+    assert len(parses) == 2
+    assert '1' in parses and '3' in parses and '2' not in parses
+
+def test_parse_cache_max_bytes():
+    parses = cache.ParseCache(max_bytes=1)
+    parses.parse('{+ 1 2}')
+    parses.parse('{+ 3 4}')
+    assert len(parses) == 1
+    assert '{+ 3 4}' in parses
+
+def test_parse_cache_ranges():
+    parses = cache.ParseCache()
+    kexp = parses.parse('{list 1 -> 3000000}')
+    # The range is sized without making its numbers or its text.
+    assert parses.size < 1000
+    assert kexp._front is None
+    assert cache.estimate_size(kexp) == cache.estimate_size(KRange(0, 10))
+    assert cache.estimate_size(KRange(0, 1000).prepended(KNumber(1))) > 1000 * cache.CELL_SIZE
+
+def test_parse_cache_errors():
+    parses = cache.ParseCache()
+    helper.assertRaises(ParseException, parses.parse, '{+ 1')
+    assert len(parses) == 0
+
+def test_parse_cache_clear():
+    parses = cache.ParseCache()
+    parses.parse('{+ 1 2}')
+    parses.clear()
+    assert len(parses) == 0 and parses.size == 0
+
+################################################################################
+# HashConsTable
+####
+
+def test_hashcons_subtrees():
+    table = cache.HashConsTable()
+    kexp = table.share(parser.parse('{+ {* 2 3} {* 2 3} 2}'))
+    assert kexp.args[0] is kexp.args[1]
+    assert kexp.args[0].args[0] is kexp.args[2]
+
+def test_hashcons_across_trees():
+    parses = cache.ParseCache(hashcons=True)
+    one = parses.parse("{if {== 'x 1} {list 1 2} 3}")
+    two = parses.parse("{let {'y 1} {list 1 2}}")
+    assert one.true is two.body
+    assert one.test.args[1] is two.value
+
+def test_hashcons_distinct():
+    table = cache.HashConsTable()
+    kexp = table.share(parser.parse('{+ {* 2 3} {* 3 2} {- 2 3}}'))
+    assert kexp.args[0] is not kexp.args[1]
+    assert kexp.args[0] is not kexp.args[2]
+
+def test_hashcons_interpret():
+    table = cache.HashConsTable()
+    kexp = table.share(parser.parse("{+ {let {'x 2} {* 'x 3}} {let {'x 5} {* 'x 3}}}"))
+    assert kexp.args[0].body is kexp.args[1].body
+    assert interpreter.interpret(kexp, empty_env) == KNumber(21)
+    assert interpreter.interpret(kexp, empty_env) == KNumber(21)
@@ -0,0 +1,52 @@
+from kelpy import parser, interpreter, resolver, compiler
+from kelpy.types import *
+from kelpy.exceptions import *
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+EXPRESSIONS = (
+    '42', '#t', '{list 1 2 3}', '{list 1 -> 5}',
+    '{+ 1 2}', '{- 10}', '{* 2 3 4 5}', '{/ 1 3}', '{% 7 3}', '{+ 1.5 1/2}',
+    '{+ {* 2 3} {- 10 4} {/ 8 2}}', '{== 1 1 1}', '{< 1 2 3}', '{!= 1 2 1}',
+    '{if #t 1 2}', '{if 0 1 2}', '{if {> 3 2} {+ 1 1} {- 1 1}}', '{if {list} 1 2}',
+    "{let {'x 3} {* 'x 'x}}",
+    "{let {'x 1} {let {'x {+ 'x 1}} 'x}}",
+    "{let {'x 1} {+ {let {'y 10} {* 'y 'x}} {let {'z 5} 'z}}}",
+    "{let {'x {list 1 2}} 'x}",
+    "{let {'x #f} {if 'x 'x {let {'y 3} {+ 'y 'y 'y}}}}",
+    "{== {list #t} {list 'a}}", "{== {list #t 1} {list {list 1} 1}}",
+)
+
+def compiled_value(kexp, env=empty_env):
+    return compiler.compile_expression(kexp)(env)
+
+@params(*EXPRESSIONS)
+def test_matches_interpreter(text):
+    kexp = parser.parse(text)
+    expected = interpreter.interpret(kexp, empty_env)
+    assert compiled_value(kexp) == expected
+    assert compiled_value(resolver.resolve(kexp)) == expected
+
+@params('{- 1 {list}}', '{/ 1 0}', '{< {list} 1}', "{let {'x 0} {% 1 'x}}")
+def test_same_exceptions(text):
+    kexp = parser.parse(text)
+    try:
+        interpreter.interpret(kexp, empty_env)
+    except Exception as e:
+        helper.assertRaises(type(e), compiled_value, kexp)
+    else:
+        raise AssertionError("{} should not evaluate".format(text))
+
+def test_compiled_function_reused():
+    run = compiler.compile_expression(resolver.resolve(parser.parse("{let {'x 6} {* 'x 7}}")))
+    assert run(empty_env) == run(empty_env) == KNumber(42)
+
+def test_environment():
+    env = KEnvironment(KBinding(KSymbol("'g"), KNumber(10)))
+    kexp = parser.parse("{let {'x 1} {+ 'x 'g}}")
+    assert compiled_value(kexp, env) == KNumber(11)
+    assert compiled_value(resolver.resolve(kexp, env), env) == KNumber(11)
+
+def test_not_an_expression():
+    helper.assertRaises(InterpretException, compiler.compile_expression, 3)
@@ -0,0 +1,104 @@
+import random
+
+from kelpy import parser, interpreter, resolver
+from kelpy.cse import eliminate_common_subexpressions, HIDDEN_PREFIX
+from kelpy.types import *
+from kelpy.exceptions import *
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+ENV = KEnvironment(KBinding(KSymbol("'a"), KNumber(3)),
+                   KBinding(KSymbol("'b"), KNumber(-2)),
+                   KBinding(KSymbol("'z"), KNumber(0)))
+
+def evaluate(kexp):
+    try:
+        return interpreter.interpret(kexp, ENV)
+    except Exception as e:
+        return type(e)
+
+def same_outcome(one, two):
+    """
+    Compares two results of `evaluate`. Sharing a subexpression can change the
+    order in which parts of an expression are evaluated, so when evaluation
+    fails, another error may be met first.
+    """
+    if isinstance(one, type) and isinstance(two, type):
+        return True
+    return one == two
+
+def hidden_lets(kexp):
+    return str(kexp).count("with (" + HIDDEN_PREFIX)
+
+@params(("{+ {* 'a 'b} {* 'a 'b}}", 1),
+        ("{+ {* {+ 'a 'b} 2} {* {+ 'a 'b} 2} {+ 'a 'b}}", 2),
+        ("{if {> {+ 'a 'b} 0} {+ 'a 'b} {- {+ 'a 'b}}}", 1),
+        ("{let {'a 1} {+ {+ 'a 'b} {+ 'a 'b}}}", 1),
+        ("{if 'a {+ {- 'b} {- 'b}} 0}", 1))
+def test_shared(text, count):
+    kexp = parser.parse(text)
+    shared, eliminated = eliminate_common_subexpressions(kexp)
+    assert eliminated == count
+    assert hidden_lets(shared) == count
+    assert evaluate(shared) == evaluate(kexp)
+
+@params("{+ {let {'a 1} {+ 'a 'b}} {+ 'a 'b}}",
+        "{if 'z {/ 1 'z} {if 'a 0 {/ 1 'z}}}",
+        "{if {== 'z 0} 0 {/ 1 'z}}",
+        "{+ 'a 'a 'b}",
+        "{list {+ 1 2} {+ 1 2}}")
+def test_not_shared(text):
+    kexp = parser.parse(text)
+    shared, eliminated = eliminate_common_subexpressions(kexp)
+    assert eliminated == 0
+    assert shared is kexp
+
+def test_repeated_elimination():
+    kexp = parser.parse("{+ {* 'a 'b} {* 'a 'b} {let {'c {- 'a}} {+ {* 'c 'c} {* 'c 'c}}}}")
+    once, count = eliminate_common_subexpressions(kexp)
+    assert count == 2
+    again, count = eliminate_common_subexpressions(once)
+    assert count == 0 and again is once
+    assert evaluate(once) == evaluate(kexp)
+
+def test_hidden_names_not_reused():
+    kexp = parser.parse("{+ {* 'a 'b} {* 'a 'b}}")
+    once, _ = eliminate_common_subexpressions(kexp)
+    outer = KFunctionExpression('+', '+', once, parser.parse("{- 'b 'a}"), parser.parse("{- 'b 'a}"))
+    twice, count = eliminate_common_subexpressions(outer)
+    assert count == 1
+    assert HIDDEN_PREFIX + '1' in str(twice)
+    assert evaluate(twice) == evaluate(outer)
+
+def random_expression(generator, depth, names):
+    if depth == 0 or generator.random() < 0.2:
+        choice = generator.random()
+        if choice < 0.5:
+            return "'" + generator.choice(names)
+        return str(generator.randint(-2, 3))
+    kind = generator.random()
+    if kind < 0.15:
+        name = generator.choice('abc')
+        value = random_expression(generator, depth - 1, names)
+        body = random_expression(generator, depth - 1, names + [name])
+        return "{let {'%s %s} %s}" % (name, value, body)
+    elif kind < 0.3:
+        return "{if %s %s %s}" % tuple(random_expression(generator, depth - 1, names)
+                                       for _ in xrange(3))
+    function = generator.choice(['+', '-', '*', '/', '<', '=='])
+    args = [random_expression(generator, depth - 1, names) for _ in xrange(2)]
+    # Repeat arguments often, so that there are subexpressions to share.
+    if generator.random() < 0.5:
+        args.append(args[0])
+    return "{%s %s}" % (function, ' '.join(args))
+
+@params(*range(30))
+def test_random_expressions(seed):
+    generator = random.Random(seed)
+    for _ in xrange(20):
+        kexp = parser.parse(random_expression(generator, 5, ['a', 'b', 'z']))
+        shared, _ = eliminate_common_subexpressions(kexp)
+        assert same_outcome(evaluate(shared), evaluate(kexp))
+        resolved = resolver.resolve(shared, ENV)
+        assert same_outcome(evaluate(resolved), evaluate(kexp))
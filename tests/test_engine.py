@@ -0,0 +1,68 @@
+from fractions import Fraction
+from multiprocessing.pool import ThreadPool
+
+import kelpy
+from kelpy.engine import to_kexp, to_python
+from kelpy.types import *
+from kelpy.exceptions import *
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+BACKENDS = ('interpret', 'stack', 'compile', 'vm')
+
+@params(*BACKENDS)
+def test_evaluate(backend):
+    handle = kelpy.Engine(backend).compile("{let {'y {* 'x 2}} {+ 'x 'y 'z}}")
+    assert handle.free_symbols == frozenset(['x', 'z'])
+    assert handle.evaluate({'x': 1, 'z': 10}) == 13
+    assert handle.evaluate({"'x": 2}, z=0.5) == 6.5
+    assert handle.evaluate(x=Fraction(1, 3), z=0) == 1
+
+@params(*BACKENDS)
+def test_plain_values(backend):
+    engine = kelpy.Engine(backend)
+    assert engine.compile("'xs").evaluate(xs=[1, [2.5, True]]) == [1, [2.5, True]]
+    assert engine.compile('{list 1 -> 4}').evaluate() == [1, 2, 3]
+    assert engine.compile('{< 1 2}').evaluate() is True
+    assert engine.compile('{/ 1 4}').evaluate() == Fraction(1, 4)
+    assert engine.compile("{list 'a}").evaluate() == ["'a"]
+
+def test_missing_binding():
+    handle = kelpy.Engine().compile("{+ 'x 1}")
+    helper.assertRaises(UnboundSymbolException, handle.evaluate)
+    helper.assertRaises(UnboundSymbolException, handle.evaluate, y=1)
+
+@params('text', None, object())
+def test_bad_binding_value(value):
+    handle = kelpy.Engine().compile("'x")
+    helper.assertRaises(BadBindingValueException, handle.evaluate, x=value)
+
+def test_bad_binding_name():
+    handle = kelpy.Engine().compile("'x")
+    helper.assertRaises(BadBindingNameException, handle.evaluate, {3: 1, 'x': 1})
+
+def test_unknown_backend():
+    helper.assertRaises(ImplementationException, kelpy.Engine, 'jit')
+
+def test_immutable():
+    handle = kelpy.Engine().compile('1')
+    helper.assertRaises(AttributeError, setattr, handle, 'text', '2')
+
+@params(*BACKENDS)
+def test_concurrent_evaluation(backend):
+    handle = kelpy.Engine(backend).compile(
+        "{let {'a {* 'x 'x}} {let {'b {+ 'a 1}} {if {> 'b 50} {- 'b 'a} {+ 'a 'b}}}}")
+    expected = [1 if x * x + 1 > 50 else 2 * x * x + 1 for x in xrange(200)]
+    pool = ThreadPool(8)
+    try:
+        results = pool.map(lambda x: handle.evaluate(x=x), xrange(200))
+    finally:
+        pool.close()
+        pool.join()
+    assert results == expected
+
+@params(0, 7, 2 ** 70, 1.5, Fraction(2, 3), True, False, [], [1, [2, 3]])
+def test_round_trip(value):
+    result = to_python(to_kexp(value))
+    assert result == value and type(result) is type(value)
@@ -0,0 +1,95 @@
+from kelpy import forms, parser
+from kelpy.types import *
+from kelpy.exceptions import *
+from kelpy.functions import FUNCTION_MAP, BUILTINS
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+################################################################################
+# FORM_MAP
+####
+
+@params('list', 'empty?', 'first', 'second', 'rest', 'reverse', 'prepend', 'append', 'if', 'let',
+        'lambda', 'rec', 'call')
+def test_form_map_special_forms(keyword):
+    assert forms.FORM_MAP[keyword].keyword == keyword
+
+@params(*FUNCTION_MAP)
+def test_form_map_functions(function):
+    builtin = BUILTINS[function]
+    count = 2 if builtin.accepts(2) else builtin.min_args
+    text = '{{{} {}}}'.format(function, ' '.join(['1'] * count))
+    assert isinstance(parser.parse(text), KFunctionExpression)
+
+################################################################################
+# Form
+####
+
+@params(('{if 1 2}', 'if'), ('{if 1 2 3 4}', 'if'), ('{first}', 'first'), ('{let {\'x 1}}', 'let'),
+        ('{== 1}', '=='), ('{< 1}', '<'))
+def test_form_arity(text, keyword):
+    helper.assertRaises(InvalidFormException, parser.parse, text)
+
+################################################################################
+# register_form
+####
+
+def test_register_form():
+    @forms.register_form('pair', 2, 2, bindings=(1,))
+    def build_pair(args, raw, offset):
+        group = args[1]
+        return KList(forms.expression(args[0]), *[forms.expression(item) for item in group.items])
+    try:
+        assert parser.parse('{pair 1 {2 3}}') == KList(KNumber(1), KNumber(2), KNumber(3))
+        assert parser.parse('{list {pair 1 {2}}}') == KList(KList(KNumber(1), KNumber(2)))
+        helper.assertRaises(InvalidFormException, parser.parse, '{pair 1}')
+    finally:
+        del forms.FORM_MAP['pair']
+
+################################################################################
+# parse_atom
+####
+
+@params(('1', KNumber), ("'x", KSymbol), ('#t', KBoolean), ('empty', KList))
+def test_parse_atom(text, kind):
+    assert isinstance(forms.parse_atom(forms.Token('atom', text, 0)), kind)
+
+def test_parse_atom_exception():
+    helper.assertRaises(ParseException, forms.parse_atom, forms.Token('atom', 'blah', 0))
+
+################################################################################
+# Range lists
+####
+
+@params(('{list 1 -> 5}', [1, 2, 3, 4]), ('{list 1 => 5}', [1, 2, 3, 4, 5]),
+        ('{list 5 -> 1}', []), ('{list 3 => 3}', [3]), ('{rest {list 1 -> 4}}', [2, 3]),
+        ('{reverse {list 1 => 4}}', [4, 3, 2, 1]), ('{prepend 0 {list 1 -> 3}}', [0, 1, 2]))
+def test_range_values(text, values):
+    kexp = parser.parse(text)
+    assert [number.value for number in kexp] == values
+    assert len(kexp) == len(values)
+
+def test_range_lazy():
+    kexp = parser.parse('{list 1 -> 10000000}')
+    assert isinstance(kexp, KRange)
+    assert len(kexp) == 9999999
+    assert kexp[1234566] == KNumber(1234567)
+    assert kexp.reverse.first == KNumber(9999999)
+    assert len(kexp.rest.rest) == 9999997
+    assert kexp._front is None
+    assert parser.parse('{first {list 1 -> 10000000}}') == KNumber(1)
+
+def test_range_equality():
+    assert parser.parse('{list 1 -> 4}') == parser.parse('{list 1 => 3}')
+    assert parser.parse('{list 1 -> 4}') == KList(KNumber(1), KNumber(2), KNumber(3))
+    assert parser.parse('{list 4 -> 1}') == KList()
+    assert parser.parse('{empty? {list 4 -> 1}}') == KBoolean(True)
+    assert not parser.parse('{list 1 -> 4}') == parser.parse('{list 1 -> 5}')
+
+def test_range_raw():
+    assert str(parser.parse('{list 1 => 3}')) == 'KList(1, 2, 3)'
+
+def test_range_index_exception():
+    helper.assertRaises(BadListIndexException, lambda: parser.parse('{list 1 -> 3}')[2])
+    helper.assertRaises(BadListIndexException, parser.parse, '{first {list 3 -> 1}}')
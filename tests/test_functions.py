@@ -0,0 +1,167 @@
+from fractions import Fraction
+
+import kelpy
+from kelpy import parser, interpreter, optimizer
+from kelpy.types import *
+from kelpy.exceptions import *
+from kelpy.functions import FUNCTION_MAP, BUILTINS, builtin_for
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+def run(text):
+    return interpreter.interpret(parser.parse(text), empty_env)
+
+def call(function, *values):
+    return FUNCTION_MAP[function][1](tuple(KNumber(value) for value in values))
+
+@params(
+    ('{+ 1 2 3}',               KNumber(6)),
+    ('{+ 1 2.5}',               KNumber(3.5)),
+    ('{+ 0.1 0.2 0.3}',         KNumber(0.6)),
+    ('{* 2 3 4}',               KNumber(24)),
+    ('{- 10 1 2}',              KNumber(7)),
+    ('{== 1 1 1}',              KBoolean(True)),
+    ('{== 1 1 2}',              KBoolean(False)),
+    ('{!= 1 2 3}',              KBoolean(True)),
+    ('{!= 1 2 1}',              KBoolean(False)),
+    ('{!= 1 2 1.0}',            KBoolean(False)),
+    ('{< 1 2 3}',               KBoolean(True)),
+    ('{< 1 3 2}',               KBoolean(False)),
+    ('{>= 3 3 1}',              KBoolean(True)),
+    ('{!= {list 1} {list 2} {list 1}}', KBoolean(False)),
+    ('{== {list 1} {list 1} {list 1}}', KBoolean(True)),
+)
+def test_variadic(text, expected):
+    result = run(text)
+    assert result == expected
+    assert type(result.value) is type(expected.value)
+
+def test_wide_calls():
+    count = 1000
+    values = range(count)
+    assert call('+', *values) == KNumber(sum(values))
+    assert call('+', *[0.1] * count).value == 100.0
+    assert call('+', *([1] * count + [Fraction(1, 2)])) == KNumber(Fraction(2001, 2))
+    assert call('<', *values) == KBoolean(True)
+    assert call('>', *values) == KBoolean(False)
+    assert call('!=', *values) == KBoolean(True)
+    assert call('!=', *(values + [count - 1])) == KBoolean(False)
+    assert call('==', *[7] * count) == KBoolean(True)
+
+def test_special_floats():
+    nan = float('nan')
+    inf = float('inf')
+    assert call('!=', 1, nan, nan, 2) == KBoolean(True)
+    assert call('==', nan, nan, nan) == KBoolean(False)
+    # fsum cannot add opposite infinities, so ordinary addition is used.
+    result = call('+', inf, 1, -inf)
+    assert result.value != result.value
+    assert call('+', inf, 1, 2) == KNumber(inf)
+    assert repr(call('+', -0.0).value) == '-0.0'
+
+@params(*BUILTINS)
+def test_registry(name):
+    builtin = BUILTINS[name]
+    assert builtin.name == name
+    assert FUNCTION_MAP[name] == (builtin.title, builtin.function)
+    count = 2 if builtin.accepts(2) else builtin.min_args
+    kexp = parser.parse('{{{} {}}}'.format(name, ' '.join(['1'] * count)))
+    assert kexp.builtin is builtin
+    assert kexp.type == 'KF' + builtin.title
+
+def test_unknown_builtin():
+    helper.assertRaises(InvalidFunctionException, builtin_for, 'nowhere')
+
+@params(*BUILTINS)
+def test_binary_kernels(name):
+    builtin = BUILTINS[name]
+    if builtin.binary is None:
+        return
+    values = [KNumber(3), KNumber(-2), KNumber(2 ** 70), KNumber(1.5), KNumber(Fraction(1, 3))]
+    for one in values:
+        for two in values:
+            assert builtin.binary(one, two) == builtin.function((one, two))
+
+def test_integer_kernels():
+    assert BUILTINS['+'].binary(KNumber(2 ** 62), KNumber(2 ** 62)) == KNumber(2 ** 63)
+    assert BUILTINS['<'].binary(KNumber(1), KNumber(2)) is KBoolean(True)
+    assert BUILTINS['+'].binary(KList([KNumber(1)]), KList([KNumber(2)])) == \
+        KList([KNumber(1), KNumber(2)])
+    helper.assertRaises(ZeroDivisionError, BUILTINS['%'].binary, KNumber(1), KNumber(0))
+
+@params('{< {list} 1}', '{* {list 1} 2}')
+def test_unfoldable_arguments(text):
+    kexp = parser.parse(text)
+    assert optimizer.optimize(kexp) == (kexp, 0)
+
+################################################################################
+# Lists
+####
+
+@params(
+    ('{length {list 5 6 7}}',                           KNumber(3)),
+    ('{length {list 0 -> 1000000}}',                    KNumber(1000000)),
+    ('{nth 0 {list 5 6 7}}',                            KNumber(5)),
+    ('{nth 2 {list 0 -> 10}}',                          KNumber(2)),
+    ('{take 2 {list 5 6 7}}',                           KList([KNumber(5), KNumber(6)])),
+    ('{take 9 {list 5 6 7}}',                           KList([KNumber(5), KNumber(6), KNumber(7)])),
+    ('{take 2 {list 1 => 9}}',                          KList([KNumber(1), KNumber(2)])),
+    ('{drop 2 {list 5 6 7}}',                           KList([KNumber(7)])),
+    ('{drop 9 {list 5 6 7}}',                           KList()),
+    ('{drop 7 {list 1 => 9}}',                          KList([KNumber(8), KNumber(9)])),
+    ('{sum {list 1 2 3.5}}',                            KNumber(6.5)),
+    ('{sum {list}}',                                    KNumber(0)),
+    ('{sum {list 1 => 100}}',                           KNumber(5050)),
+    ('{min {list 3 1 2}}',                              KNumber(1)),
+    ('{max {list 3 1.5 2}}',                            KNumber(3)),
+    ('{sort {list 3 1 2}}',                             KList([KNumber(1), KNumber(2), KNumber(3)])),
+    ("{map {lambda {'x} {* 'x 'x}} {list 1 2 3}}",      KList([KNumber(1), KNumber(4), KNumber(9)])),
+    ("{filter {lambda {'x} {< 'x 3}} {list 1 => 5}}",   KList([KNumber(1), KNumber(2)])),
+    ("{foldl {lambda {'a 'x} {- 'a 'x}} 10 {list 1 2}}", KNumber(7)),
+    ("{foldl {lambda {'a 'x} 'x} 0 {list}}",            KNumber(0)),
+)
+def test_lists(text, expected):
+    assert run(text) == expected
+
+@params(
+    ('{nth 3 {list 5 6 7}}',                BadListIndexException),
+    ('{nth -1 {list 5 6 7}}',               InvalidArgumentsException),
+    ('{take 1.5 {list 5 6 7}}',             InvalidArgumentsException),
+    ('{length 1}',                          InvalidArgumentsException),
+    ('{min {list}}',                        InvalidArgumentsException),
+    ('{sort {list 1 #t}}',                  InvalidArgumentsException),
+    ('{map 1 {list 1}}',                    NotAFunctionException),
+    ("{map {lambda {'a 'b} 'a} {list 1}}",  ArityException),
+)
+def test_list_errors(text, exception):
+    helper.assertRaises(exception, run, text)
+
+@params('{length}', '{nth 1}', '{foldl 1 {list}}')
+def test_list_arity(text):
+    helper.assertRaises(InvalidFormException, parser.parse, text)
+
+def test_drop_shares():
+    items = KList([KNumber(value) for value in xrange(10)])
+    dropped = BUILTINS['drop'].function((KNumber(4), items))
+    assert dropped.front is items.front[1][1][1][1]
+    assert dropped == KList([KNumber(value) for value in xrange(4, 10)])
+    appended = items.appended(KNumber(10))
+    dropped = BUILTINS['drop'].function((KNumber(9), appended))
+    assert dropped == KList([KNumber(9), KNumber(10)])
+
+def test_long_lists():
+    count = 10000
+    fold = "{foldl {lambda {'a 'x} {+ 'a 'x}} 0 'xs}"
+    for backend in ('interpret', 'stack'):
+        handle = kelpy.Engine(backend=backend).compile(fold)
+        assert handle.evaluate(xs=range(count)) == sum(xrange(count))
+    for backend in ('compile', 'vm'):
+        handle = kelpy.Engine(backend=backend).compile("{nth 3 {sort {take 5 'xs}}}")
+        assert handle.evaluate(xs=range(count, 0, -1)) == count - 1
+
+def test_list_folding():
+    kexp, eliminated = optimizer.optimize(parser.parse('{sum {list 1 2 3}}'))
+    assert kexp == KNumber(6) and eliminated == 1
+    kexp = parser.parse("{map {lambda {'x} 'x} {list 1}}")
+    assert optimizer.optimize(kexp) == (kexp, 0)
@@ -0,0 +1,57 @@
+from kelpy.hamt import HashMap
+
+from nose2.tools import params
+
+class Key(object):
+    """
+    A key with a chosen hash, so that tests can force keys to collide.
+    """
+    def __init__(self, name, hash_):
+        self.name = name
+        self.hash = hash_
+    def __hash__(self):
+        return self.hash
+    def __eq__(self, other):
+        return isinstance(other, Key) and self.name == other.name
+    def __repr__(self):
+        return "Key({!r})".format(self.name)
+
+def build(keys):
+    hashmap = HashMap()
+    for value, key in enumerate(keys):
+        hashmap = hashmap.set(key, value)
+    return hashmap
+
+@params(0, 1, 31, 32, 33, 1000, 20000)
+def test_set_and_get(count):
+    hashmap = build(range(count))
+    assert len(hashmap) == count
+    assert all(hashmap.get(key) == key for key in xrange(count))
+    assert hashmap.get(count) is None
+    assert sorted(hashmap) == range(count)
+
+def test_persistence():
+    one = build(['a', 'b'])
+    two = one.set('a', 10).set('c', 3)
+    assert (one.get('a'), one.get('c')) == (0, None)
+    assert (two.get('a'), two.get('c')) == (10, 3)
+    assert (len(one), len(two)) == (2, 3)
+    assert two.set('c', two.get('c')) is two
+
+@params(0, 1, -1, 2 ** 63, 32 ** 5)
+def test_collisions(hash_):
+    keys = [Key(name, hash_) for name in 'abcd'] + [Key('e', hash_ + 1)]
+    hashmap = build(keys)
+    assert len(hashmap) == 5
+    assert [hashmap.get(key) for key in keys] == range(5)
+    assert hashmap.get(Key('z', hash_)) is None
+    replaced = hashmap.set(Key('b', hash_), 'b')
+    assert len(replaced) == 5
+    assert replaced.get(Key('b', hash_)) == 'b'
+    assert hashmap.get(Key('b', hash_)) == 1
+
+def test_contains():
+    hashmap = build(['a', None])
+    assert 'a' in hashmap and None in hashmap
+    assert 'b' not in hashmap
+    assert dict(hashmap.items()) == {'a': 0, None: 1}
@@ -0,0 +1,94 @@
+from kelpy import incremental, parser
+from kelpy.types import *
+from kelpy.exceptions import *
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+TEXT = "{+ {* 2 3} {let {'x 4} {- 'x 1}} {if #t 5 6}}"
+
+def same_tree(one, two):
+    return (repr(one), str(one)) == (repr(two), str(two))
+
+################################################################################
+# parse_document
+####
+
+@params('1', "'x", '  {+ 1 2}  ', TEXT, '{list 1 -> 4}')
+def test_parse_document(text):
+    assert same_tree(incremental.parse_document(text).kexp, parser.parse(text))
+
+@params(('', NoExpressionException), ('1 2', SuperfluousDataException),
+        ('{+ 1', UnbalancedBracesException), ('{blah}', InvalidFunctionException))
+def test_parse_document_exceptions(text, exception):
+    helper.assertRaises(exception, incremental.parse_document, text)
+
+################################################################################
+# Document.edit
+####
+
+@params((TEXT.index('3'), 1, '30'),                 # replace an atom
+        (TEXT.index('{if'), 0, '7 '),               # insert an argument
+        (TEXT.index('- '), 1, '*'),                 # change a function
+        (TEXT.index('4}'), 1, '{+ 1 2}'),           # replace a let value
+        (TEXT.index("'x 4"), 2, "'y"),              # rename a let binding
+        (TEXT.index('{if'), 0, '{'),                # unbalance braces locally
+        (0, 3, '{*'),                               # touch the outer braces
+        (TEXT.index('#t'), 2, '#f 7'))              # change an if's arity
+def test_edit(offset, deleted, inserted):
+    document = incremental.parse_document(TEXT)
+    text = TEXT[:offset] + inserted + TEXT[offset + deleted:]
+    try:
+        expected = parser.parse(text)
+    except ParseException as e:
+        helper.assertRaises(type(e), document.edit, offset, deleted, inserted)
+    else:
+        edited = document.edit(offset, deleted, inserted)
+        assert edited.text == text
+        assert same_tree(edited.kexp, expected)
+
+def test_edit_reuses_subtrees():
+    document = incremental.parse_document(TEXT)
+    edited = document.edit(TEXT.index('5'), 1, '50')
+    assert edited.kexp.args[2].true == KNumber(50)
+    assert edited.kexp.args[0] is document.kexp.args[0]
+    assert edited.kexp.args[1] is document.kexp.args[1]
+    assert document.kexp.args[2].true == KNumber(5)
+
+def test_edit_repeated():
+    document = incremental.parse_document('{+ 1 2}')
+    for number in xrange(3, 10):
+        document = document.edit(len(document.text) - 1, 0, ' {} '.format(number))
+    assert same_tree(document.kexp, parser.parse(document.text))
+
+def test_edit_bounds():
+    document = incremental.parse_document('{+ 1 2}')
+    helper.assertRaises(ImplementationException, document.edit, 5, 3, '')
+
+################################################################################
+# Document.update
+####
+
+def test_update():
+    document = incremental.parse_document(TEXT)
+    text = TEXT.replace('{* 2 3}', '{* 2 3 4}')
+    updated = document.update(text)
+    assert updated.text == text
+    assert same_tree(updated.kexp, parser.parse(text))
+    assert updated.kexp.args[1] is document.kexp.args[1]
+
+def test_reparse():
+    document = incremental.reparse(incremental.parse_document('{+ 1 2}'), 3, 1, '5')
+    assert same_tree(document.kexp, parser.parse('{+ 5 2}'))
+
+################################################################################
+# common_prefix_length / common_suffix_length
+####
+
+@params(('', '', 0), ('abc', 'abd', 2), ('abc', 'abc', 3), ('xbc', 'abc', 0), ('ab', 'abc', 2))
+def test_common_prefix_length(one, two, length):
+    assert incremental.common_prefix_length(one, two) == length
+
+@params(('abc', 'xbc', 3, 2), ('abc', 'abc', 3, 3), ('abc', 'abc', 1, 1), ('abc', 'abd', 3, 0))
+def test_common_suffix_length(one, two, limit, length):
+    assert incremental.common_suffix_length(one, two, limit) == length
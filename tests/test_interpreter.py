@@ -0,0 +1,64 @@
+from kelpy import parser, interpreter, resolver, memo
+from kelpy.types import *
+from kelpy.exceptions import *
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+from test_compiler import EXPRESSIONS
+
+def run(kexp, env=empty_env):
+    return interpreter.interpret_iteratively(kexp, env)
+
+@params(*EXPRESSIONS)
+def test_matches_interpreter(text):
+    kexp = parser.parse(text)
+    expected = interpreter.interpret(kexp, empty_env)
+    assert run(kexp) == expected
+    assert run(resolver.resolve(kexp)) == expected
+
+@params('{- 1 {list}}', '{/ 1 0}', '{< {list} 1}', "{let {'x 0} {% 1 'x}}", "{+ 'nowhere 1}")
+def test_same_exceptions(text):
+    kexp = parser.parse(text)
+    try:
+        interpreter.interpret(kexp, empty_env)
+    except Exception as e:
+        helper.assertRaises(type(e), run, kexp)
+    else:
+        raise AssertionError("{} should not evaluate".format(text))
+
+def test_environment():
+    env = KEnvironment(KBinding(KSymbol("'g"), KNumber(10)))
+    kexp = parser.parse("{let {'x 1} {+ {let {'g 2} 'g} 'x 'g}}")
+    assert run(kexp, env) == KNumber(13)
+    assert run(resolver.resolve(kexp, env), env) == KNumber(13)
+
+def test_not_an_expression():
+    helper.assertRaises(InterpretException, run, 3)
+
+def test_deep_nesting():
+    depth = 5000
+    text = '{+ 1 ' * depth + '0' + '}' * depth
+    assert run(parser.parse(text)) == KNumber(depth)
+    text = '{if #t ' * depth + '7' + ' 0}' * depth
+    assert run(parser.parse(text)) == KNumber(7)
+    text = ''.join("{let {'v%d %d} " % (i, i) for i in xrange(depth)) + "'v0" + '}' * depth
+    kexp = parser.parse(text)
+    assert run(kexp) == KNumber(0)
+    assert run(resolver.resolve(kexp)) == KNumber(0)
+
+def test_calls_make_no_nodes():
+    kexp = parser.parse("{let {'x 2} {+ {* 'x 3} {- 10 'x} {if {< 'x 3} 1 0}}}")
+    memos = memo.Memo(min_cost=100)
+    made = []
+    original = KFunctionExpression.__init__
+    def counting(self, *args):
+        made.append(args)
+        original(self, *args)
+    KFunctionExpression.__init__ = counting
+    try:
+        for evaluate in (interpreter.interpret, interpreter.interpret_iteratively, memos.interpret):
+            assert evaluate(kexp, empty_env) == KNumber(15)
+    finally:
+        KFunctionExpression.__init__ = original
+    assert not made
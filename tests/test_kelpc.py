@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+
+from kelpy import kelpc, parser
+from kelpy.types import *
+from kelpy.exceptions import *
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+LIBRARY = """
+{+ 1 2}
+{let {'x 3} {if {== 'x 3} {list 1 2 'x} 'x}}
+'{a b}
+#t
+{list}
+"""
+
+################################################################################
+# dumps/loads
+####
+
+@params('1', "'x", '#f', '{list}', '{list 1 -> 4}', "{let {'x 3} {+ 'x 2.5}}",
+        '{if {< 1 2} 3/4 {* 2 3}}', '{empty? {list 1}}', "{call {lambda {'x} 'x} 1}",
+        "{rec 'f {} {call 'f}}")
+def test_round_trip(text):
+    kexp = parser.parse(text)
+    loaded, = kelpc.loads(kelpc.dumps([kexp]))
+    assert repr(loaded) == repr(kexp)
+    assert str(loaded) == str(kexp)
+
+def test_round_trip_spans():
+    text = "{+ 1 {* 2 3}}"
+    loaded, = kelpc.loads(kelpc.dumps([parser.parse(text)]))
+    assert loaded.span.source == text
+    assert loaded.args[1].span.source is loaded.span.source
+    assert loaded.args[1].raw == '{* 2 3}'
+
+def test_round_trip_deep_nesting():
+    depth = 3000
+    text = '{+ ' * depth + '1' + '}' * depth
+    loaded, = kelpc.loads(kelpc.dumps([parser.parse(text)]))
+    assert loaded.raw == text
+
+def test_round_trip_range():
+    loaded, = kelpc.loads(kelpc.dumps([parser.parse('{list 10 => 1000000}')]))
+    assert isinstance(loaded, KRange)
+    assert loaded._front is None
+    assert loaded.reverse.first == KNumber(1000000)
+
+@params(0.30000000000000004, 1e20, -1e-300, float('inf'), 2.0)
+def test_round_trip_computed_float(value):
+    loaded, = kelpc.loads(kelpc.dumps([KNumber(value)]))
+    assert type(loaded.value) is float and loaded.value == value
+
+@params('', 'KELPC', 'not a compiled file at all')
+def test_loads_invalid(data):
+    helper.assertRaises(InvalidCacheFileException, kelpc.loads, data)
+
+def test_loads_truncated():
+    data = kelpc.dumps([parser.parse('{+ 1 2}')])
+    helper.assertRaises(InvalidCacheFileException, kelpc.loads, data[:-1])
+
+################################################################################
+# CompiledCache
+####
+
+class TestCompiledCache(object):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, 'library.kl')
+        with open(self.source, 'w') as stream:
+            stream.write(LIBRARY)
+        self.cache = kelpc.CompiledCache(os.path.join(self.directory, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_load(self):
+        parsed = self.cache.load(self.source)
+        loaded = self.cache.load(self.source)
+        assert (self.cache.hits, self.cache.misses) == (1, 1)
+        assert [repr(kexp) for kexp in loaded] == [repr(kexp) for kexp in parsed]
+
+    def test_load_without_mmap(self):
+        self.cache.use_mmap = False
+        self.cache.load(self.source)
+        assert len(self.cache.load(self.source)) == 5
+        assert self.cache.hits == 1
+
+    def test_load_changed_source(self):
+        self.cache.load(self.source)
+        with open(self.source, 'a') as stream:
+            stream.write('{* 2 3}')
+        assert len(self.cache.load(self.source)) == 6
+        assert self.cache.misses == 2
+
+    def test_load_corrupt_file(self):
+        self.cache.load(self.source)
+        compiled, = self.cache.entries()
+        with open(compiled, 'wb') as stream:
+            stream.write('garbage')
+        assert len(self.cache.load(self.source)) == 5
+        assert self.cache.misses == 2
+
+    def test_warm(self):
+        assert self.cache.warm([self.source]) == 1
+        assert self.cache.warm([self.source]) == 0
+        assert len(self.cache.entries()) == 1
+
+    def test_prune(self):
+        self.cache.warm([self.source])
+        stale = os.path.join(self.cache.directory, 'stale' + kelpc.EXTENSION)
+        with open(stale, 'wb') as stream:
+            stream.write('garbage')
+        assert self.cache.prune() == 1
+        assert self.cache.prune(max_age=60) == 0
+        compiled, = self.cache.entries()
+        os.utime(compiled, (0, 0))
+        assert self.cache.prune(max_age=60) == 1
+        assert self.cache.entries() == []
@@ -0,0 +1,174 @@
+import kelpy
+from kelpy import parser, interpreter, resolver, optimizer, cse, compiler, vm
+from kelpy.types import *
+from kelpy.exceptions import *
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+LOOP = "{rec 'loop {'n 'acc} {if {== 'n 0} 'acc {call 'loop {- 'n 1} {+ 'acc 'n}}}}"
+FACT = "{rec 'fact {'n} {if {<= 'n 1} 1 {* 'n {call 'fact {- 'n 1}}}}}"
+
+# Each engine, as a function of an expression and an environment.
+RUNS = (
+    interpreter.interpret,
+    interpreter.interpret_iteratively,
+    lambda kexp, env: compiler.compile_expression(kexp)(env),
+    lambda kexp, env: vm.compile_bytecode(kexp)(env),
+)
+
+def evaluations(text, env=empty_env):
+    """
+    Evaluates text with every engine, before and after resolving it.
+    """
+    kexp = parser.parse(text)
+    resolved = resolver.resolve(kexp, env)
+    return [run(tree, env) for run in RUNS for tree in (kexp, resolved)]
+
+################################################################################
+# Parsing
+####
+
+def test_parse_lambda():
+    kexp = parser.parse("{lambda {'x 'y} {+ 'x 'y}}")
+    assert isinstance(kexp, KLambda)
+    assert kexp.params == (KSymbol("'x"), KSymbol("'y"))
+    assert kexp.name is None
+    assert isinstance(kexp.body, KFunctionExpression)
+    assert parser.parse("{lambda {} 1}").params == ()
+
+def test_parse_rec():
+    kexp = parser.parse(FACT)
+    assert kexp.name is KSymbol("'fact")
+    assert kexp.params == (KSymbol("'n"),)
+
+def test_parse_call():
+    kexp = parser.parse("{call 'f 1 {+ 1 2}}")
+    assert isinstance(kexp, KApply)
+    assert kexp.function is KSymbol("'f")
+    assert len(kexp.args) == 2
+
+@params("{lambda 'x 1}", "{lambda {'x 1} 1}", "{lambda {'x 'x} 1}", "{lambda {'x}}",
+        "{rec 'f {'f} 1}", "{rec 'f 'x 1}", "{call}")
+def test_invalid_forms(text):
+    helper.assertRaises(InvalidFormException, parser.parse, text)
+
+################################################################################
+# Evaluation
+####
+
+@params(
+    ("{call {lambda {'x 'y} {- 'x 'y}} 5 3}", 2),
+    ("{call {lambda {} 7}}", 7),
+    ("{let {'a 10} {let {'f {lambda {'x} {* 'x 'a}}} {let {'a 0} {call 'f 3}}}}", 30),
+    ("{let {'add {lambda {'x} {lambda {'y} {+ 'x 'y}}}} {call {call 'add 3} 4}}", 7),
+    ("{let {'x 5} {call {lambda {} {let {'y 2} {* 'x 'y}}}}}", 10),
+    ("{let {'x 1} {call {lambda {'x} {+ 'x 1}} 10}}", 11),
+    ("{call {if #f {lambda {'x} 'x} {lambda {'x} {* 'x 2}}} 4}", 8),
+    ("{call %s 10}" % FACT, 3628800),
+    ("{call %s 100 0}" % LOOP, 5050),
+)
+def test_evaluate(text, expected):
+    assert evaluations(text) == [KNumber(expected)] * 8
+
+def test_environment():
+    env = KEnvironment(KBinding(KSymbol("'g"), KNumber(2)))
+    assert evaluations("{call {lambda {'x} {* 'x 'g}} 21}", env) == [KNumber(42)] * 8
+
+@params(("{call 1 2}", NotAFunctionException),
+        ("{call {lambda {'x} 'x}}", ArityException),
+        ("{call {lambda {'x} 'x} 1 2}", ArityException),
+        ("{call {lambda {'x} {/ 'x 0}} 1}", ZeroDivisionError))
+def test_errors(text, exception):
+    kexp = parser.parse(text)
+    for run in RUNS:
+        helper.assertRaises(exception, run, kexp, empty_env)
+        helper.assertRaises(exception, run, resolver.resolve(kexp), empty_env)
+
+def test_tail_calls():
+    # Far more calls than the Python stack could hold, if each took a frame.
+    assert evaluations("{call %s 20000 0}" % LOOP) == [KNumber(200010000)] * 8
+    # Calls in tail position through lets, scopes and ifs.
+    text = "{call {rec 'f {'n} {let {'m {- 'n 1}} {if {< 'm 0} 0 {call 'f 'm}}}} 20000}"
+    assert evaluations(text) == [KNumber(0)] * 8
+
+@params('interpret', 'stack', 'compile', 'vm')
+def test_engines(backend):
+    engine = kelpy.Engine(backend=backend)
+    assert engine.compile("{call {lambda {'x 'y} {- 'x 'y}} 'a 3}").evaluate(a=5) == 2
+    assert engine.compile("{call %s 'n}" % FACT).evaluate(n=10) == 3628800
+    assert engine.compile("{call %s 'n 0}" % LOOP).evaluate(n=20000) == 200010000
+    squares = engine.compile("{map {lambda {'x} {* 'x 'x}} {list 1 2 3}}")
+    assert squares.evaluate() == [1, 4, 9]
+    closure = engine.compile("{lambda {'x} 'x}").evaluate()
+    assert isinstance(closure, KClosure)
+    assert interpreter.apply(closure, [KNumber(4)]) == KNumber(4)
+
+def test_bytecode_closures():
+    kexp = resolver.resolve(parser.parse("{call %s 10}" % FACT))
+    bytecode = vm.compile_bytecode(kexp)
+    listing = bytecode.disassemble()
+    for name in ('MAKE_CLOSURE', 'CALL_CLOSURE', 'RETURN'):
+        assert name in listing
+    loaded = vm.Bytecode.loads(bytecode.dumps())
+    assert loaded() == KNumber(3628800)
+    assert 'TAIL_CALL' in vm.compile_bytecode(parser.parse("{call %s 3 0}" % LOOP)).disassemble()
+
+def test_deep_recursion_iteratively():
+    # The recursive call is not in tail position, so each is a level deeper.
+    count = "{rec 'count {'n} {if {<= 'n 0} 0 {+ 1 {call 'count {- 'n 1}}}}}"
+    kexp = parser.parse("{call %s 5000}" % count)
+    assert interpreter.interpret_iteratively(kexp, empty_env) == KNumber(5000)
+    assert interpreter.interpret_iteratively(resolver.resolve(kexp), empty_env) == KNumber(5000)
+
+################################################################################
+# Closures
+####
+
+def test_flat_closures():
+    text = "{let {'big {list 1 2 3}} {let {'n 2} {let {'m 3} {lambda {'x} {+ 'x 'n}}}}}"
+    closure = interpreter.interpret(resolver.resolve(parser.parse(text)), empty_env)
+    assert isinstance(closure, KClosure)
+    assert closure.captured == (KNumber(2),)
+    closure = interpreter.interpret(parser.parse(text), empty_env)
+    assert [binding.symbol for binding in closure.captured] == [KSymbol("'n")]
+
+def test_closures_capture_globals():
+    env = KEnvironment(KBinding(KSymbol("'g"), KNumber(1)), KBinding(KSymbol("'h"), KNumber(2)))
+    kexp = resolver.resolve(parser.parse("{lambda {} 'g}"), env)
+    assert kexp.captures == (KSymbol("'g"),)
+    closure = interpreter.interpret(kexp, env)
+    assert closure.captured == (KNumber(1),)
+
+def test_resolved_frames():
+    kexp = resolver.resolve(parser.parse("{let {'a 1} {rec 'f {'x 'y} {let {'z 'a} {+ 'x 'y 'z}}}}"))
+    klambda = kexp.body.body
+    assert isinstance(klambda, KLambda)
+    # Two arguments, the lambda itself, one capture and one let.
+    assert klambda.size == 5
+    assert [(local.raw, local.slot) for local in klambda.captures] == [("'a", 0)]
+
+def test_unbound_in_lambda():
+    helper.assertRaises(UnboundSymbolException, resolver.resolve, parser.parse("{lambda {'x} 'y}"))
+    assert resolver.free_symbols(parser.parse("{rec 'f {'x} {call 'f 'x 'y}}")) == \
+        frozenset([KSymbol("'y")])
+
+################################################################################
+# Optimization
+####
+
+def test_optimize_lambda():
+    kexp, _ = optimizer.optimize(parser.parse(
+        "{let {'x 3} {let {'f {lambda {'y} {+ 'x 'y {* 2 2}}}} {call 'f {* 'x 'x}}}}"))
+    assert str(kexp) == "with ('f -> KLambda('y) : KFAdd(3, 'y, 4)) : KApply('f; 9)"
+    assert interpreter.interpret(kexp, empty_env) == KNumber(16)
+
+def test_optimize_shadowed_by_parameter():
+    kexp, _ = optimizer.optimize(parser.parse("{let {'x 3} {call {lambda {'x} 'x} 4}}"))
+    assert interpreter.interpret(kexp, empty_env) == KNumber(4)
+
+def test_calls_not_shared():
+    kexp, shared = cse.eliminate_common_subexpressions(parser.parse(
+        "{+ {call 'f {* 'a 'a}} {call 'f {* 'a 'a}}}"))
+    assert shared == 1
+    assert str(kexp).count('KApply') == 2
@@ -0,0 +1,131 @@
+from kelpy import parser, interpreter, resolver, memo, Engine
+from kelpy.types import *
+from kelpy.exceptions import *
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+from test_compiler import EXPRESSIONS
+
+SQUARES = "{let {'a 'x} {+ {* 'a 'a 'a} {* 'a 'a 'a} {if {> 'a 1} {- 'a 1} 0}}}"
+
+def env_of(**values):
+    return KEnvironment(*[KBinding(KSymbol("'" + name), KNumber(value))
+                          for name, value in values.iteritems()])
+
+@params(*EXPRESSIONS)
+def test_matches_interpreter(text):
+    memos = memo.Memo(min_cost=1)
+    kexp = parser.parse(text)
+    expected = interpreter.interpret(kexp, empty_env)
+    for _ in xrange(2):
+        assert memos.interpret(kexp, empty_env) == expected
+        assert memos.interpret(resolver.resolve(kexp), empty_env) == expected
+
+@params('{- 1 {list}}', '{/ 1 0}', '{< {list} 1}')
+def test_same_exceptions(text):
+    kexp = parser.parse(text)
+    memos = memo.Memo(min_cost=1)
+    try:
+        interpreter.interpret(kexp, empty_env)
+    except Exception as e:
+        helper.assertRaises(type(e), memos.interpret, kexp, empty_env)
+        assert len(memos) == 0
+    else:
+        raise AssertionError("{} should not evaluate".format(text))
+
+def test_hits():
+    memos = memo.Memo(min_cost=3)
+    kexp = resolver.resolve(parser.parse(SQUARES), env_of(x=0))
+    assert memos.interpret(kexp, env_of(x=2)) == KNumber(17)
+    # Subtrees are cached by identity, so the two {* 'a 'a 'a} are distinct.
+    assert memos.hits == 0
+    misses = memos.misses
+    assert memos.interpret(kexp, env_of(x=2)) == KNumber(17)
+    # The whole expression is found, so none of its parts are looked up.
+    assert (memos.hits, memos.misses) == (1, misses)
+    assert memos.interpret(kexp, env_of(x=3)) == KNumber(56)
+    assert memos.misses > misses
+
+def test_keyed_by_exact_values():
+    memos = memo.Memo(min_cost=1)
+    kexp = parser.parse("{/ 'x 2}")
+    assert memos.interpret(kexp, env_of(x=1)) == KNumber('1/2')
+    result = memos.interpret(kexp, env_of(x=1.0))
+    assert result.value == 0.5 and isinstance(result.value, float)
+    assert memos.hits == 0
+
+def test_shadowed_symbols_are_not_free():
+    memos = memo.Memo(min_cost=1)
+    kexp = parser.parse("{+ {let {'x 10} {* 'x 'x}} 'x}")
+    assert memos.interpret(kexp, env_of(x=1)) == KNumber(101)
+    assert memos.interpret(kexp, env_of(x=2)) == KNumber(102)
+    # The let does not depend on the outer 'x, so its value is reused.
+    assert memos.hits == 1
+
+def test_min_cost():
+    memos = memo.Memo(min_cost=100)
+    kexp = parser.parse(SQUARES)
+    memos.interpret(kexp, env_of(x=2))
+    memos.interpret(kexp, env_of(x=2))
+    assert len(memos) == 0 and memos.hits == memos.misses == 0
+
+def test_impure_subtrees_not_cached():
+    memos = memo.Memo(min_cost=1)
+    kexp = parser.parse("{call {lambda {'y} {+ 'y 1}} {* 'x 2}}")
+    assert memos.interpret(kexp, env_of(x=2)) == KNumber(5)
+    cacheable = memo.analyze(kexp, 1)
+    assert id(kexp) not in cacheable and id(kexp.function) not in cacheable
+    assert id(kexp.args[0]) in cacheable
+    assert id(kexp.function.body) in cacheable
+
+@params(False, True)
+def test_higher_order_subtrees(resolved):
+    memos = memo.Memo(min_cost=1)
+    kexp = parser.parse("{map {lambda {'y} {* 'y 'k}} {list 1 2}}")
+    if resolved:
+        kexp = resolver.resolve(kexp, env_of(k=0))
+    # The call of map depends only on 'k, which the lambda captures.
+    assert memo.analyze(kexp, 1)[id(kexp)] == (KSymbol("'k"),)
+    assert memos.interpret(kexp, env_of(k=2)) == KList([KNumber(2), KNumber(4)])
+    assert memos.interpret(kexp, env_of(k=3)) == KList([KNumber(3), KNumber(6)])
+    hits = memos.hits
+    assert memos.interpret(kexp, env_of(k=2)) == KList([KNumber(2), KNumber(4)])
+    assert memos.hits == hits + 1
+
+def test_closures_called_through_cache():
+    memos = memo.Memo(min_cost=3)
+    # The body's {* 'k 'k} is looked up by each call map makes.
+    kexp = parser.parse("{map {lambda {'y} {+ {* 'k 'k} 'y}} {list 1 2 3}}")
+    assert memos.interpret(kexp, env_of(k=2)) == KList([KNumber(5), KNumber(6), KNumber(7)])
+    assert memos.hits == 2
+
+def test_max_entries():
+    memos = memo.Memo(max_entries=2, min_cost=1)
+    kexp = parser.parse("{+ 'x 1}")
+    for x in (1, 2, 1, 3):
+        memos.interpret(kexp, env_of(x=x))
+    assert len(memos) == 2
+    memos.interpret(kexp, env_of(x=1))
+    memos.interpret(kexp, env_of(x=2))
+    assert memos.hits == 2
+
+def test_max_bytes():
+    memos = memo.Memo(max_bytes=1, min_cost=1)
+    kexp = parser.parse("{+ 'x 1}")
+    memos.interpret(kexp, env_of(x=1))
+    memos.interpret(kexp, env_of(x=2))
+    assert len(memos) == 1
+
+def test_clear():
+    memos = memo.Memo(min_cost=1)
+    memos.interpret(parser.parse("{+ 1 2}"), empty_env)
+    memos.clear()
+    assert len(memos) == 0 and memos.size == 0 and memos.misses == 0
+
+def test_engine():
+    memos = memo.Memo(min_cost=1)
+    engine = Engine(memo=memos)
+    area = engine.compile("{* {+ 'w 1} {+ 'h 1}}")
+    assert area.evaluate(w=2, h=3) == area.evaluate(w=2, h=3) == 12
+    assert memos.hits == 1
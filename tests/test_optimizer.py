@@ -0,0 +1,74 @@
+import kelpy
+from kelpy import parser, interpreter, resolver, optimizer
+from kelpy.types import *
+from kelpy.exceptions import *
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+from test_compiler import EXPRESSIONS
+
+def evaluate(kexp):
+    return interpreter.interpret(resolver.resolve(kexp), empty_env)
+
+@params(*EXPRESSIONS)
+def test_same_value(text):
+    kexp = parser.parse(text)
+    optimized, eliminated = optimizer.optimize(kexp)
+    assert evaluate(optimized) == evaluate(kexp)
+    assert eliminated == optimizer.count_nodes(kexp) - optimizer.count_nodes(optimized)
+
+@params(('{* 60 60 24}', '86400', 3),
+        ('{if #t 1 {+ 2 3}}', '1', 5),
+        ('{if {< 1 2 3} 4 5}', '4', 6),
+        ("{let {'x 3} {* 'x 'x}}", '9', 5),
+        ("{let {'x {+ 1 2}} {let {'y {* 'x 2}} {- 'y 'x}}}", '3', 12),
+        ("{let {'x {list 1 2}} 'x}", '{list 1 2}', 3))
+def test_folded(text, folded, eliminated):
+    optimized, count = optimizer.optimize(parser.parse(text))
+    assert optimized == parser.parse(folded)
+    assert count == eliminated
+
+@params("{+ 'x {* 2 3}}", "{if 'x {- 10 4} 0}", "{let {'y 'x} {+ 'y {* 1 2}}}")
+def test_partial(text):
+    env = KEnvironment(KBinding(KSymbol("'x"), KNumber(5)))
+    kexp = parser.parse(text)
+    optimized, eliminated = optimizer.optimize(kexp)
+    assert eliminated == 2
+    assert (interpreter.interpret(optimized, env) == interpreter.interpret(kexp, env))
+
+def test_shadowing():
+    text = "{let {'x 1} {+ 'x {let {'x 'y} 'x}}}"
+    optimized, _ = optimizer.optimize(parser.parse(text))
+    env = KEnvironment(KBinding(KSymbol("'y"), KNumber(10)))
+    assert interpreter.interpret(optimized, env) == KNumber(11)
+    assert str(optimized) == str(parser.parse("{+ 1 {let {'x 'y} 'x}}"))
+
+@params('{/ 1 0}', "{if 'x 1 {/ 1 0}}", '{< {list} 1}')
+def test_failing_calls_left(text):
+    kexp = parser.parse(text)
+    optimized, eliminated = optimizer.optimize(kexp)
+    assert optimized is kexp
+    assert eliminated == 0
+
+def test_unchanged_subtrees_shared():
+    kexp = parser.parse("{+ {* 'x 2} {- 4 1}}")
+    optimized, _ = optimizer.optimize(kexp)
+    assert optimized.args[0] is kexp.args[0]
+    assert optimized.args[1] == KNumber(3)
+    assert optimized.raw == kexp.raw
+
+def test_deep_nesting():
+    depth = 5000
+    kexp = parser.parse('{+ 1 ' * depth + '0' + '}' * depth)
+    optimized, eliminated = optimizer.optimize(kexp)
+    assert optimized == KNumber(depth)
+    assert eliminated == 2 * depth
+
+def test_engine_switch():
+    text = "{let {'rate {/ 1 {* 60 60}}} {* 'seconds 'rate}}"
+    on = kelpy.Engine().compile(text)
+    off = kelpy.Engine(optimize=False).compile(text)
+    assert on.eliminated == 7 and off.eliminated == 0
+    assert on.evaluate(seconds=7200) == off.evaluate(seconds=7200) == 2
+    assert on.free_symbols == off.free_symbols == frozenset(['seconds'])
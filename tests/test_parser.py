@@ -63,6 +63,42 @@ def test_parse_parseexception(text):
 def test_parse_unbalanced_braces(text):
     helper.assertRaises(UnbalancedBracesException, parser.parse, text)
 
+@params(('1 2', SuperfluousDataException, 2), ('{+ 1 2} 3', SuperfluousDataException, 8),
+        ('', NoExpressionException, 0), ('{}', NoArgumentsException, 0),
+        ('{{+ 1} 2}', FunctionlessExpressionException, 0), ('{if 1 2}', InvalidFormException, 0),
+        ('{+ 1 {blah 2}}', InvalidFunctionException, 6), ("{let {3 'x} 1}", InvalidFormException, 0),
+        ('{+ 1 blah}', ParseException, 5))
+def test_parse_error_offset(text, exception, offset):
+    try:
+        parser.parse(text)
+    except exception as e:
+        assert e.offset == offset
+    else:
+        assert False, "No exception raised."
+
+def test_parse_raw():
+    kexp = parser.parse("  {let {'x 3} {+ 'x {* 2 3}}}  ")
+    assert kexp.raw == "{let {'x 3} {+ 'x {* 2 3}}}"
+    assert kexp.body.raw == "{+ 'x {* 2 3}}"
+    assert kexp.body.args[1].raw == '{* 2 3}'
+
+def test_parse_spans():
+    text = "{if {== 'x 1} {+ 'x 2} 3}"
+    kexp = parser.parse(text)
+    assert kexp.span.source is text
+    assert kexp.true.span.source is text
+    assert (kexp.true.span.start, kexp.true.span.end) == (14, 22)
+    assert kexp.true.raw == "{+ 'x 2}"
+    assert KNumber(3).span is None
+    assert parser.parse('{list 1 2}').span is None
+
+def test_parse_deep_nesting():
+    depth = 3000
+    kexp = parser.parse('{+ ' * depth + '1' + '}' * depth)
+    for _ in xrange(depth - 1):
+        kexp = kexp.args[0]
+    assert kexp.args[0] == KNumber(1)
+
 ################################################################################
 # get_text_through_matching_brace (gttmb)
 ####
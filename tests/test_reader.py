@@ -0,0 +1,55 @@
+from StringIO import StringIO
+
+from kelpy import reader
+from kelpy.types import *
+from kelpy.exceptions import *
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+PROGRAM = """{+ 1 2}  3
+  'x {let {'y 4}
+     {* 'y 2}}
+'{a   b}  #t{if 1 2 3}
+empty"""
+
+################################################################################
+# parse_stream
+####
+
+@params(1, 2, 3, 7, 8192)
+def test_parse_stream(chunk_size):
+    results = list(reader.parse_stream(StringIO(PROGRAM), chunk_size))
+    assert [(line, column) for _, line, column in results] == [
+        (1, 1), (1, 10), (2, 3), (2, 6), (4, 1), (4, 11), (4, 13), (5, 1)
+    ]
+    kexps = [kexp for kexp, _, _ in results]
+    assert kexps[1] == KNumber(3)
+    assert kexps[3].raw == "{let {'y 4}\n     {* 'y 2}}"
+    assert kexps[4].raw == "'{a   b}"
+    assert isinstance(kexps[6], KIf)
+    assert kexps[7] == KList()
+
+@params('', '   \n\t ')
+def test_parse_stream_empty(text):
+    assert list(reader.parse_stream(StringIO(text))) == []
+
+def test_parse_stream_incremental():
+    stream = StringIO('{+ 1 2} {+')
+    expressions = reader.parse_stream(stream, 4)
+    kexp, line, column = next(expressions)
+    assert isinstance(kexp, KFunctionExpression)
+    assert stream.tell() == 8
+    helper.assertRaises(UnbalancedBracesException, next, expressions)
+
+@params(('1 }', 2), ('{+ 1 2}\n{* 3', 8))
+def test_parse_stream_unbalanced_braces(text, offset):
+    try:
+        list(reader.parse_stream(StringIO(text), 2))
+    except UnbalancedBracesException as e:
+        assert e.offset == offset
+    else:
+        assert False, "No exception raised."
+
+def test_parse_stream_parse_exception():
+    helper.assertRaises(ParseException, list, reader.parse_stream(StringIO('1 {blah 2}')))
@@ -0,0 +1,82 @@
+from kelpy import parser, interpreter, resolver
+from kelpy.types import *
+from kelpy.exceptions import *
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+def evaluate(text, env=empty_env):
+    return interpreter.interpret(resolver.resolve(parser.parse(text), env), env)
+
+def locals_of(kexp):
+    """
+    Collects the (symbol, depth, slot) of every KLocal in a resolved tree.
+    """
+    found = []
+    stack = [kexp]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, KLocal):
+            found.append((node.symbol.raw, node.depth, node.slot))
+        elif isinstance(node, KScope):
+            stack.append(node.body)
+        elif isinstance(node, KLet):
+            stack.extend((node.body, node.value, node.name))
+        elif isinstance(node, KIf):
+            stack.extend((node.false, node.true, node.test))
+        elif isinstance(node, KFunctionExpression):
+            stack.extend(reversed(node.args))
+    return found
+
+@params(("{let {'x 1} {let {'x 2} 'x}}", 2),
+        ("{let {'x 3} {let {'x {+ 'x 1}} 'x}}", 4),
+        ("{let {'x 1} {+ {let {'x 10} 'x} 'x}}", 11),
+        ("{let {'x {let {'y 2} {* 'y 'y}}} {+ 'x 1}}", 5),
+        ("{let {'x 1} {let {'y 2} {- 'x 'y}}}", -1),
+        ("{+ {let {'a 1} 'a} {let {'b 2} 'b}}", 3),
+        ("{let {'x #f} {if 'x 1 2}}", 2),
+        ("{let {'x {list 1 'x}} 'x}", KList([KNumber(1), KSymbol("'x")])),
+        ('{+ 1 2}', 3))
+def test_resolved_evaluation(text, value):
+    if not isinstance(value, KExpression):
+        value = KNumber(value)
+    assert evaluate(text) == value
+    assert interpreter.interpret(parser.parse(text), empty_env) == value
+
+def test_slots():
+    kexp = resolver.resolve(parser.parse("{let {'x 1} {+ {let {'y 'x} 'y} {let {'z 'x} {let {'w 'z} 'w}}}}"))
+    assert isinstance(kexp, KScope)
+    assert kexp.size == 3
+    assert locals_of(kexp) == [("'x", 0, 0), ("'y", 0, 1), ("'x", 0, 0), ("'y", 0, 1),
+                               ("'z", 0, 1), ("'x", 0, 0), ("'w", 0, 2), ("'z", 0, 1),
+                               ("'w", 0, 2)]
+
+def test_letless_expression_unchanged():
+    kexp = parser.parse('{+ 1 {* 2 3}}')
+    assert resolver.resolve(kexp) is kexp
+
+def test_resolved_tree_reused():
+    text = "{let {'x 6} {* 'x 7}}"
+    kexp = resolver.resolve(parser.parse(text))
+    assert interpreter.interpret(kexp, empty_env) == KNumber(42)
+    assert interpreter.interpret(kexp, empty_env) == KNumber(42)
+    assert kexp.raw == text
+
+@params("'x", "{+ 'x 1}", "{let {'x 'x} 1}", "{let {'x 1} 'y}", "{+ {let {'x 1} 'x} 'x}")
+def test_unbound_symbol(text):
+    kexp = parser.parse(text)
+    helper.assertRaises(UnboundSymbolException, resolver.resolve, kexp)
+
+def test_environment_symbols():
+    env = KEnvironment(KBinding(KSymbol("'g"), KNumber(10)))
+    kexp = resolver.resolve(parser.parse("{let {'x 1} {+ 'x 'g}}"), env)
+    assert locals_of(kexp) == [("'x", 0, 0), ("'x", 0, 0)]
+    assert interpreter.interpret(kexp, env) == KNumber(11)
+    helper.assertRaises(UnboundSymbolException, resolver.resolve, parser.parse("'g"))
+
+def test_deep_nesting():
+    depth = 5000
+    text = ''.join("{let {'v%d {+ %d 0}} " % (i, i) for i in xrange(depth)) + "'v0" + '}' * depth
+    kexp = resolver.resolve(parser.parse(text))
+    assert kexp.size == depth
+    assert interpreter.interpret_iteratively(kexp, empty_env) == KNumber(0)
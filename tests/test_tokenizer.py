@@ -0,0 +1,51 @@
+from kelpy import tokenizer
+from kelpy.tokenizer import Token, OPEN, CLOSE, ATOM
+from kelpy.exceptions import *
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+################################################################################
+# tokenize
+####
+
+@params('', '   ', '\n\t')
+def test_tokenize_empty(text):
+    assert tokenizer.tokenize(text) == []
+
+def test_tokenize():
+    assert tokenizer.tokenize("{+ 1 'x}") == [
+        Token(OPEN,  '{',  0),
+        Token(ATOM,  '+',  1),
+        Token(ATOM,  '1',  3),
+        Token(ATOM,  "'x", 5),
+        Token(CLOSE, '}',  7),
+    ]
+
+def test_tokenize_attached_braces():
+    kinds = [token.kind for token in tokenizer.tokenize('{+ 1{* 2 3}}')]
+    assert kinds == [OPEN, ATOM, ATOM, OPEN, ATOM, ATOM, ATOM, CLOSE, CLOSE]
+
+@params("'{long symbol}", "'{nested {long} symbol}")
+def test_tokenize_quoted_symbol(text):
+    assert tokenizer.tokenize(text) == [Token(ATOM, text, 0)]
+
+@params(('{blah', 0), ('{1 2} 3}', 7), ('  }', 2), ("{'{a}", 0), ("'{a", 1))
+def test_tokenize_unbalanced_braces(text, offset):
+    try:
+        tokenizer.tokenize(text)
+    except UnbalancedBracesException as e:
+        assert e.offset == offset
+    else:
+        assert False, "No exception raised."
+
+################################################################################
+# find_matching_brace
+####
+
+def test_find_matching_brace():
+    assert tokenizer.find_matching_brace('{a b} c', 0) == 5
+    assert tokenizer.find_matching_brace("x '{a {b}} c", 3) == 10
+
+def test_find_matching_brace_exceptions():
+    helper.assertRaises(UnbalancedBracesException, tokenizer.find_matching_brace, '{{a}', 0)
@@ -0,0 +1,220 @@
+from fractions import Fraction
+
+import kelpy
+from kelpy import parser, interpreter
+from kelpy.types import *
+from kelpy.exceptions import *
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+def evaluate(text):
+    return interpreter.interpret(parser.parse(text), empty_env)
+
+################################################################################
+# KNumber
+####
+
+@params(('42', 42, int), ('-7', -7, int), ('3/4', Fraction(3, 4), Fraction), ('8/4', 2, int),
+        ('-1/3', Fraction(-1, 3), Fraction), ('2.5', 2.5, float), ('-.25', -0.25, float))
+def test_number_from_text(text, value, kind):
+    number = KNumber(text)
+    assert number.value == value
+    assert type(number.value) is kind
+    assert number.raw == text
+
+@params((5, 5, True), (Fraction(6, 3), 2, True), (Fraction(1, 3), Fraction(1, 3), False), (0.5, 0.5, False))
+def test_number_from_value(value, expected, integer):
+    number = KNumber(value)
+    assert number.value == expected
+    assert number.integer == integer
+    assert number.raw == str(expected)
+
+@params('1/0', 'blah', '1.2.3', '')
+def test_number_invalid(text):
+    helper.assertRaises(InvalidNumberException, KNumber, text)
+
+@params(('{+ 1/3 1/6}', '1/2'), ('{- 1 1/3}', '2/3'), ('{* 2/3 3/2}', '1'), ('{/ 7 2}', '7/2'),
+        ('{/ 9 3}', '3'), ('{/ 1 2 2}', '1/4'), ('{+ 1/2 0.25}', '0.75'), ('{% 7/2 1}', '1/2'),
+        ('{* 3 4 5}', '60'), ('{- 10 1 2}', '7'))
+def test_number_arithmetic(text, result):
+    assert str(evaluate(text)) == result
+
+def test_number_arithmetic_large():
+    result = evaluate('{* ' + ' '.join(str(i) for i in xrange(1, 200)) + '}')
+    assert result.integer
+    assert len(str(result)) == 373
+
+def test_number_operators():
+    assert KNumber(1) + KNumber('1/2') == KNumber('3/2')
+    assert KNumber(1) / KNumber(3) == KNumber(Fraction(1, 3))
+    assert KNumber(7) // KNumber(2) == KNumber(3)
+    assert KNumber(1) == KNumber('1.0')
+    assert KNumber(1) != KNumber(2)
+    assert not KNumber(1) != KNumber('2/2')
+    assert KNumber(1) != KSymbol("'x")
+    assert KNumber('1/2') < KNumber('0.6')
+    assert hash(KNumber('4/2')) == hash(KNumber(2))
+
+@params(('{== 1 2}', False), ('{== 1 2/2 1.0}', True), ('{!= 1 2}', True), ('{< 1/3 1/2}', True))
+def test_number_comparison(text, result):
+    assert evaluate(text) == KBoolean(result)
+
+################################################################################
+# KList
+####
+
+def numbers(*values):
+    return KList([KNumber(value) for value in values])
+
+def test_list_prepend_append():
+    base = numbers(2, 3)
+    assert prepend(KNumber(1), base) == numbers(1, 2, 3)
+    assert append(KNumber(4), base) == numbers(2, 3, 4)
+    assert base == numbers(2, 3)
+    both = append(KNumber(5), append(KNumber(4), prepend(KNumber(1), base)))
+    assert list(both) == list(numbers(1, 2, 3, 4, 5))
+    assert both.rest.rest.rest == numbers(4, 5)
+    assert both.reverse == numbers(5, 4, 3, 2, 1)
+    assert both[-1] == KNumber(5)
+
+def test_list_sharing():
+    base = numbers(*range(1000))
+    longer = prepend(KNumber(-1), base)
+    assert longer.rest.front is base.front
+    assert base.rest.rest.front is base.front[1][1]
+
+def test_list_append_only():
+    klist = KList()
+    for value in xrange(5):
+        klist = append(KNumber(value), klist)
+    assert klist.first == KNumber(0)
+    assert klist.rest.first == KNumber(1)
+    assert klist == numbers(0, 1, 2, 3, 4)
+    # Reading the list leaves it as it was.
+    assert klist.front is None and klist.rear[0] == KNumber(4)
+    assert klist.settled().rear is None
+
+@params(((), ()), ((1,), ()), ((), (1,)), ((1, 2, 3), (4,)), ((1,), (2, 3, 4)))
+def test_list_concatenate(one, two):
+    assert numbers(*one) + numbers(*two) == numbers(*(one + two))
+
+def test_list_equality_long():
+    size = 100000
+    one = numbers(*xrange(size))
+    two = KList(list(one))
+    assert one == two
+    assert not one != two
+    assert one != append(KNumber(0), two.rest)
+    assert one != two.rest
+
+@params(("{== {list #t} {list 'a}}", False), ("{== {list #t 1} {list {list 1} 1}}", False),
+        ("{== {list 'a #f} {list 'a #f}}", True), ("{!= {list 1 #t} {list #t 1}}", True),
+        ("{== {list {list 1} 'a} {list 1 'a}}", False))
+def test_list_equality_mixed(text, result):
+    assert evaluate(text) == KBoolean(result)
+
+def test_list_equality_mixed_items():
+    kinds = [KBoolean(True), KNumber(1), KSymbol("'a"), numbers(1)]
+    for one in kinds:
+        for two in kinds:
+            assert (KList(one) == KList(two)) == (one is two)
+            assert (KList(one) != KList(two)) == (one is not two)
+
+def test_list_hash():
+    table = {numbers(1, 2): 'a', KList(numbers(1), KSymbol("'x")): 'b'}
+    assert table[prepend(KNumber(1), numbers(2))] == 'a'
+    assert table[KList(KList(KNumber('1/1')), KSymbol("'x"))] == 'b'
+    assert hash(numbers(1, 2, 3)) == hash(KRange(1, 4))
+    assert numbers() == KList() and hash(numbers()) == hash(KRange(3, 1))
+
+def test_list_index_exception():
+    helper.assertRaises(BadListIndexException, lambda: numbers(1, 2)[2])
+    helper.assertRaises(BadListIndexException, lambda: KList().first)
+
+################################################################################
+# Layout and interning
+####
+
+@params('0', '1/2', "'x", '#t', '{list 1 2}', '{list 1 -> 3}', '{+ 1 2}', '{if 1 2 3}', "{let {'x 1} 'x}")
+def test_no_instance_dict(text):
+    assert not hasattr(parser.parse(text), '__dict__')
+
+def test_symbol_interning():
+    assert KSymbol("'abc") is parser.parse("'abc")
+    assert parser.parse("{+ 'y 1}").args[0] is KSymbol("'y")
+    assert KSymbol("'a") != KSymbol("'b")
+
+def test_boolean_singletons():
+    assert KBoolean(True) is KBoolean(KNumber(3)) is KBoolean.TRUE
+    assert KBoolean(False) is KBoolean(KList()) is KBoolean.FALSE
+    assert KBoolean('#t') is parser.parse('#t')
+    assert KBoolean('#t') is KBoolean('true') is KBoolean('TRUE') is KBoolean(True)
+    assert KBoolean('#f') is KBoolean('false') is KBoolean(False)
+    assert not KBoolean('true') != KBoolean('#t')
+    assert KBoolean('#t') != KBoolean('#f')
+    assert parser.parse('{if true 1 2}').raw == '{if true 1 2}'
+    helper.assertRaises(InvalidBooleanException, KBoolean, 'yes')
+
+@params(('{== {< 1 2} #t}', True), ('{== {< 2 1} #f}', True), ('{!= {< 1 2} true}', False),
+        ('{== {> 1 2} true}', False), ('{== #t true {== 1 1}}', True))
+def test_computed_booleans(text, result):
+    assert evaluate(text) is KBoolean(result)
+
+def test_computed_booleans_bound():
+    for backend in ('interpret', 'stack', 'compile', 'vm'):
+        handle = kelpy.Engine(backend=backend).compile("{== 'b #t}")
+        assert handle.evaluate(b=True) is True
+        assert handle.evaluate(b=False) is False
+
+def test_empty_list_singleton():
+    assert KList() is KList([]) is parser.parse('empty') is parser.parse('{list}')
+    assert numbers(1).rest is KList.EMPTY
+
+@params(-5, 0, 42, 256)
+def test_small_integer_interning(value):
+    assert KNumber(value) is KNumber(str(value))
+    assert KNumber(value) is KNumber(value) + KNumber(0)
+
+def test_number_not_interned():
+    assert KNumber(257) is not KNumber(257)
+    assert KNumber('007') is not KNumber(7)
+    assert KNumber('007').raw == '007'
+
+################################################################################
+# KEnvironment
+####
+
+@params(("{let {'x 1} {let {'x 2} 'x}}", 2),
+        ("{let {'x 3} {let {'x {+ 'x 1}} 'x}}", 4),
+        ("{let {'x 1} {+ {let {'x 10} 'x} 'x}}", 11),
+        ("{let {'x {* 2 3}} {+ 'x 'x}}", 12),
+        ("{let {'x 1} {let {'y 2} {- 'x 'y}}}", -1))
+def test_let_shadowing(text, value):
+    assert evaluate(text) == KNumber(value)
+
+def test_environment_is_persistent():
+    x, y = KSymbol("'x"), KSymbol("'y")
+    outer = empty_env + KBinding(x, KNumber(1))
+    inner = outer + KBinding(x, KNumber(2)) + KBinding(y, KNumber(3))
+    assert lookup(x, outer) == KNumber(1)
+    assert lookup(y, outer) is None
+    assert lookup(x, inner) == KNumber(2)
+    assert lookup(y, inner) == KNumber(3)
+    assert len(outer) == 1 and len(inner) == 2
+    assert len(empty_env) == 0
+
+def test_environment_bindings():
+    x = KSymbol("'x")
+    env = KEnvironment(KBinding(x, KNumber(1)), KBinding(x, KNumber(2)))
+    assert lookup(x, env) == KNumber(2)
+    assert [binding.kexp for binding in env] == [KNumber(2)]
+    assert str(env) == "(('x -> 2))"
+    helper.assertRaises(BadEnvironmentBindingException, KEnvironment, KNumber(1))
+    helper.assertRaises(BadBindingNameException, KBinding, KNumber(1), KNumber(1))
+
+def test_deeply_nested_lets():
+    depth = 200
+    text = ''.join("{let {'v%d %d} " % (i, i) for i in xrange(depth))
+    text += "{+ 'v0 'v%d}" % (depth - 1) + '}' * depth
+    assert evaluate(text) == KNumber(depth - 1)
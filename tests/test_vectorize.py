@@ -0,0 +1,98 @@
+import unittest
+
+import kelpy
+from kelpy import parser, vectorize
+
+from nose2.tools import params
+from nose2.tools.such import helper
+from kelpy.types import KSymbol
+from kelpy.exceptions import *
+
+def require_numpy():
+    if not vectorize.available():
+        raise unittest.SkipTest("NumPy is not installed")
+
+COLUMNS = {'x': [1, 2, 3, 4, 5], 'y': [0.5, -1.0, 2.0, 0.0, 3.5]}
+
+EXPRESSIONS = (
+    "{+ 'x 'y 1}", "{* 'x 'x}", "{- 'x}", "{% 'x 2}", "{/ 'y 2.0}",
+    "{< 'x 3}", "{== 'x 3 3}", "{!= 'x 1 2}", "{>= 'y 0 -1}",
+    "{if {> 'x 2} 'y {* 'y 10}}",
+    "{let {'z {* 'x 2}} {if {< 'z 6} 'z 0}}",
+    "{if 'y 1 0}", "7", "{+ 1 2}",
+)
+
+@params(*EXPRESSIONS)
+def test_vectorizable(text):
+    assert vectorize.vectorizable(parser.parse(text))
+
+@params('{list 1 2}', "{if 'x {list 1} 0}", "{+ 'x 1/2}")
+def test_not_vectorizable(text):
+    assert not vectorize.vectorizable(parser.parse(text))
+
+def typed(values):
+    """
+    Pairs each value with its type, so that 1/2 and 0.5 are told apart.
+    """
+    if hasattr(values, 'tolist'):
+        values = values.tolist()
+    return [(type(value), value) for value in values]
+
+def rows_of(handle, columns):
+    names = columns.keys()
+    return [handle.evaluate(**dict(zip(names, row))) for row in zip(*columns.values())]
+
+@params(*EXPRESSIONS)
+def test_matches_row_evaluation(text):
+    handle = kelpy.Engine().compile(text)
+    rows = [handle.evaluate(x=x, y=y) for x, y in zip(COLUMNS['x'], COLUMNS['y'])]
+    assert typed(handle.evaluate_columns(COLUMNS)) == typed(rows)
+
+@params(("{* 'x 'x}",           {'x': [2 ** 40, 3]}),
+        ("{- 'x 'x 'x 'x}",     {'x': [2 ** 62, -2 ** 62]}),
+        ("{+ 'x 'y}",           {'x': [2 ** 62], 'y': [2 ** 62]}),
+        ("{* 'x 'x 1.5}",       {'x': [2 ** 40]}),
+        ("{/ 'x 2}",            {'x': [1, 2, 3]}),
+        ("{/ 'x 'y 2.0}",       {'x': [1, 2], 'y': [3, 4]}),
+        ("{/ 'x 2.0}",          {'x': [1, 2, 3]}),
+        ("{+ 'y 1.0 1.0}",      {'y': [10000000000000000.0, 0.5]}),
+        ("{< 'x 'y}",           {'x': [2 ** 53 + 1], 'y': [float(2 ** 53)]}),
+        ("{== 'x 'y}",          {'x': [2 ** 53 + 1], 'y': [float(2 ** 53)]}))
+def test_exact_results(text, columns):
+    handle = kelpy.Engine().compile(text)
+    assert typed(handle.evaluate_columns(columns)) == typed(rows_of(handle, columns))
+
+@params(("{* 'x 'x}", [1], True), ("{/ 'x 2}", [1], False), ("{/ 'x 2}", [1.0], True),
+        ("{/ 2 'x}", [1.0], True), ("{+ 'x 1 2}", [1], True), ("{+ 'x 1 2}", [1.0], False),
+        ("{if {< 'x 1} 1 2.5}", [1], False), ("{< #t 'x}", [1], False))
+def test_vectorizable_columns(text, column, expected):
+    require_numpy()
+    import numpy
+    arrays = {KSymbol("'x"): numpy.asarray(column)}
+    assert vectorize.vectorizable(parser.parse(text), arrays) == expected
+
+def test_vectorized():
+    require_numpy()
+    import numpy
+    handle = kelpy.Engine().compile("{if {> 'x 2} {* 'x 'y} 0}")
+    x = numpy.arange(100000)
+    y = numpy.ones(100000) * 2
+    result = handle.evaluate_columns(x=x, y=y)
+    assert result.shape == (100000,)
+    assert (result == numpy.where(x > 2, x * 2.0, 0)).all()
+
+def test_fallback_for_division_by_zero():
+    handle = kelpy.Engine().compile("{if {== 'x 0} 0 {/ 1.0 'x}}")
+    assert list(handle.evaluate_columns(x=[2, 0, 4])) == [0.5, 0, 0.25]
+    helper.assertRaises(ZeroDivisionError, kelpy.Engine().compile("{/ 1 'x}").evaluate_columns, x=[1, 0])
+
+def test_fallback_for_lists():
+    handle = kelpy.Engine().compile("{if {> 'x 1} {list 1 2} 0}")
+    results = handle.evaluate_columns(x=[1, 2])
+    assert list(results) == [0, [1, 2]]
+
+def test_column_errors():
+    handle = kelpy.Engine().compile("{+ 'x 'y}")
+    helper.assertRaises(UnboundSymbolException, handle.evaluate_columns, x=[1])
+    helper.assertRaises(InterpretException, handle.evaluate_columns, x=[1], y=[1, 2])
+    helper.assertRaises(InvalidFormException, kelpy.Engine().compile, "{< 'x}")
@@ -0,0 +1,77 @@
+from kelpy import parser, interpreter, optimizer, resolver, vm
+from kelpy.types import *
+from kelpy.exceptions import *
+
+from nose2.tools import params
+from nose2.tools.such import helper
+
+from test_compiler import EXPRESSIONS
+
+def run(kexp, env=empty_env):
+    return vm.run(vm.compile_bytecode(kexp), env)
+
+@params(*EXPRESSIONS)
+def test_matches_interpreter(text):
+    kexp = parser.parse(text)
+    expected = interpreter.interpret(kexp, empty_env)
+    assert run(kexp) == expected
+    assert run(resolver.resolve(kexp)) == expected
+
+@params('{- 1 {list}}', '{/ 1 0}', '{< {list} 1}')
+def test_same_exceptions(text):
+    kexp = parser.parse(text)
+    try:
+        interpreter.interpret(kexp, empty_env)
+    except Exception as e:
+        helper.assertRaises(type(e), run, kexp)
+    else:
+        raise AssertionError("{} should not evaluate".format(text))
+
+def test_instructions():
+    bytecode = vm.compile_bytecode(resolver.resolve(parser.parse("{let {'x 2} {if {< 'x 3} {+ 'x 1} 0}}")))
+    ops = [op for _, op, _ in bytecode.instructions()]
+    assert ops == [vm.ENTER, vm.PUSH_CONST, vm.BIND, vm.LOAD_SLOT, vm.PUSH_CONST,
+                   vm.CALL_BUILTIN, vm.JUMP_IF_FALSE, vm.LOAD_SLOT, vm.PUSH_CONST,
+                   vm.CALL_BUILTIN, vm.JUMP, vm.PUSH_CONST, vm.LEAVE]
+    assert bytecode.names == ['<', '+']
+    assert 'JUMP_IF_FALSE' in bytecode.disassemble()
+    assert bytecode() == KNumber(3)
+
+def test_constants_shared():
+    bytecode = vm.compile_bytecode(parser.parse('{+ 1 1 1}'))
+    assert len(bytecode.constants) == 1
+
+def test_deep_nesting():
+    depth = 5000
+    text = '{+ 1 ' * depth + '0' + '}' * depth
+    kexp = parser.parse(text)
+    assert run(kexp) == KNumber(depth)
+    text = ''.join("{let {'v%d %d} " % (i, i) for i in xrange(depth)) + "'v0" + '}' * depth
+    assert run(parser.parse(text)) == KNumber(0)
+
+@params(*EXPRESSIONS)
+def test_serialization(text):
+    kexp = resolver.resolve(parser.parse(text))
+    bytecode = vm.compile_bytecode(kexp)
+    loaded = vm.Bytecode.loads(bytecode.dumps())
+    assert list(loaded.code) == list(bytecode.code)
+    assert loaded.names == bytecode.names
+    assert loaded() == interpreter.interpret(kexp, empty_env)
+
+@params(('{+ 0.1 0.2}',                     KNumber(0.30000000000000004)),
+        ('{* 10000000000.0 10000000000.0}', KNumber(1e20)),
+        ('{- {/ 1.0 3} 1}',                 KNumber(1.0 / 3 - 1)))
+def test_serialization_of_computed_floats(text, expected):
+    kexp, eliminated = optimizer.optimize(parser.parse(text))
+    assert eliminated
+    loaded = vm.Bytecode.loads(vm.compile_bytecode(kexp).dumps())
+    assert loaded() == expected
+
+@params('', 'KELPB\0', 'garbage data')
+def test_invalid_serialization(data):
+    helper.assertRaises(InvalidCacheFileException, vm.Bytecode.loads, data)
+
+def test_truncated_serialization():
+    data = vm.compile_bytecode(parser.parse('{+ 1 2}')).dumps()
+    for end in xrange(len(data)):
+        helper.assertRaises(InvalidCacheFileException, vm.Bytecode.loads, data[:end])